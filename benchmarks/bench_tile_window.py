@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: počet stahovaných dlaždic – původní grid (1.2× buffer, lichý počet)
+vs. minimální okno protínající výstup, pro typické rozměry a DPI.
+
+Spuštění:  python benchmarks/bench_tile_window.py
+"""
+
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.tile_math import tile_window, legacy_grid_size  # noqa: E402
+
+SIZES_CM = [
+    ("10×10 cm", 10.0, 10.0),
+    ("A5", 14.8, 21.0),
+    ("A4", 21.0, 29.7),
+    ("A3", 29.7, 42.0),
+]
+DPIS = [240, 300, 420, 600]
+ZOOM = 18
+SAMPLES = 200  # náhodné středy → průměr přes fázi středu vůči hranám dlaždic
+
+
+def main():
+    rng = random.Random(42)
+    centers = [(49.0 + rng.random(), 16.0 + rng.random()) for _ in range(SAMPLES)]
+
+    print(f"{'formát':<10} {'DPI':>4} {'px':>12} {'původně':>8} {'potřeba':>8} {'ušetřeno':>9}")
+    print("-" * 56)
+    sum_old = sum_new = 0
+    for label, w_cm, h_cm in SIZES_CM:
+        for dpi in DPIS:
+            w = max(1, int(round(w_cm / 2.54 * dpi)))
+            h = max(1, int(round(h_cm / 2.54 * dpi)))
+            gw, gh = legacy_grid_size(w, h)
+            old = gw * gh
+            needed = sum(
+                (lambda win: win['tiles_x'] * win['tiles_y'])(tile_window(lat, lon, ZOOM, w, h))
+                for lat, lon in centers
+            ) / len(centers)
+            sum_old += old
+            sum_new += needed
+            saved = 100.0 * (1.0 - needed / old) if old else 0.0
+            print(f"{label:<10} {dpi:>4} {f'{w}×{h}':>12} {old:>8} {needed:>8.1f} {saved:>8.1f}%")
+    print("-" * 56)
+    print(f"{'celkem':<10} {'':>4} {'':>12} {sum_old:>8} {sum_new:>8.1f} "
+          f"{100.0 * (1.0 - sum_new / sum_old):>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Dávkové (headless) generování map podle manifestu.
+
+Manifest je JSON nebo CSV se seznamem úloh. Každá úloha nese:
+  lat, lon (nebo manual_coordinates), zoom, width_cm, height_cm, dpi,
+  id_lokace, popis, marker_style, marker_size, map_opacity
+  volitelně: cislo_id, photo_filename, watermark_size_mm, output_directory,
+  anonymizovana_lokace, tile_source, tile_source_path, metrics_report,
+  detail_zoom_offset (0–2: dlaždice z vyššího zoomu, zmenšené na DPI) …
+JSON může být seznam úloh, nebo {"defaults": {...}, "jobs": [...]}.
+
+Úlohy běží na ProcessPoolExecutoru (MapEngine bez Qt); dlaždice se sdílí přes
+diskovou cache (atomické zápisy → bezpečné i mezi procesy). Limit požadavků
+na tile server se mezi procesy dělí, aby celková rychlost odpovídala tile_rate.
+Výstupní název dává MapEngine.generate_output_filename_with_gps_and_zoom,
+čísla ID se přidělují předem v hlavním procesu (souběžné procesy by jinak
+našly stejné „další volné“ ID).
+
+Spuštění:
+  python -m core.batch_render manifest.json --out vystup/ --workers 4 --report report.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from core.map_engine import MapEngine
+
+# Výchozí parametry = výchozí hodnoty hlavního okna
+DEFAULT_PARAMS = {
+    'coordinate_mode': 'G',
+    'output_width_cm': 7.1,
+    'output_height_cm': 5.0,
+    'output_dpi': 240,
+    'zoom': 18,
+    'map_opacity': 1.0,
+    'marker_size': 10,
+    'marker_style': 'dot',
+    'watermark_size_mm': 3.0,
+    'request_delay': 0.1,
+    'app_name': 'OSM Map Generator - Čtyřlístky',
+    'contact_email': '',
+    'photo_filename': '',
+    'id_lokace': '',
+    'popis': '',
+    'anonymizovana_lokace': False,
+}
+
+# Krátká jména sloupců manifestu → parametry MapEngine
+_ALIASES = {
+    'width_cm': 'output_width_cm',
+    'height_cm': 'output_height_cm',
+    'dpi': 'output_dpi',
+    'opacity': 'map_opacity',
+    'output_dir': 'output_directory',
+    'photo': 'photo_filename',
+}
+
+_INT_KEYS = ('zoom', 'output_dpi', 'marker_size', 'detail_zoom_offset', 'detail_max_tiles')
+_FLOAT_KEYS = ('output_width_cm', 'output_height_cm', 'map_opacity', 'watermark_size_mm',
+               'request_delay', 'tile_rate', 'lat', 'lon')
+_BOOL_KEYS = ('anonymizovana_lokace', 'tile_cache', 'metrics_report')
+
+
+def format_manual_coordinates(lat, lon):
+    """(lat, lon) → '49.23091° S, 17.65691° V' (formát parse_manual_coordinates)."""
+    return f"{abs(lat):.6f}° {'S' if lat >= 0 else 'J'}, {abs(lon):.6f}° {'V' if lon >= 0 else 'Z'}"
+
+
+def _coerce(key, value):
+    if isinstance(value, str):
+        value = value.strip()
+        if value == "":
+            return None
+    if key in _INT_KEYS:
+        return int(float(value))
+    if key in _FLOAT_KEYS:
+        return float(str(value).replace(',', '.'))
+    if key in _BOOL_KEYS:
+        return str(value).lower() in ('1', 'true', 'ano', 'yes', 'y')
+    return value
+
+
+def load_manifest(path):
+    """Načte manifest (JSON / CSV) → (defaults, [job dict, ...])."""
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        with path.open(newline='', encoding='utf-8-sig') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            return {}, [dict(row) for row in csv.DictReader(f, dialect=dialect)]
+
+    data = json.loads(path.read_text(encoding='utf-8'))
+    if isinstance(data, list):
+        return {}, data
+    return dict(data.get('defaults') or {}), list(data.get('jobs') or [])
+
+
+def job_to_params(job, defaults=None, output_directory=None):
+    """Úloha manifestu → kompletní parametry MapEngine (bez přiděleného ID)."""
+    params = dict(DEFAULT_PARAMS)
+    for src in (defaults or {}, job):
+        for key, value in src.items():
+            key = _ALIASES.get(key, key)
+            value = _coerce(key, value)
+            if value is not None:
+                params[key] = value
+
+    lat, lon = params.pop('lat', None), params.pop('lon', None)
+    if lat is not None and lon is not None:
+        params['manual_coordinates'] = format_manual_coordinates(lat, lon)
+        params['coordinate_mode'] = 'G'
+    elif not params.get('manual_coordinates') and params.get('coordinate_mode') != 'F':
+        raise ValueError("Úloha nemá souřadnice (lat/lon nebo manual_coordinates)")
+
+    if output_directory and not params.get('output_directory'):
+        params['output_directory'] = str(output_directory)
+    if not params.get('output_directory'):
+        raise ValueError("Úloha nemá výstupní složku (output_directory / --out)")
+    return params
+
+
+def assign_ids(jobs_params):
+    """
+    Předem přidělí Cislo_ID: explicitní cislo_id z manifestu se použije,
+    ostatní dostanou další volná ID pro danou výstupní složku.
+    """
+    next_ids = {}
+    for params in jobs_params:
+        manual = params.pop('cislo_id', None)
+        if manual not in (None, ''):
+            params['auto_generate_id'] = False
+            params['manual_cislo_id'] = str(manual)
+            continue
+        out = str(Path(params['output_directory']).resolve())
+        if out not in next_ids:
+            probe = MapEngine({'output_directory': out, 'tile_cache': False})
+            next_ids[out] = int(probe.find_next_auto_id(out, params.get('id_lokace', '')))
+        params['auto_generate_id'] = False
+        params['manual_cislo_id'] = f"{next_ids[out]:05d}"
+        next_ids[out] += 1
+    return jobs_params
+
+
+def render_job(index, params):
+    """Vykreslí jednu úlohu (běží v procesu workeru). Vrací záznam reportu."""
+    engine = MapEngine(params)
+    result = {
+        'index': index,
+        'id_lokace': params.get('id_lokace', ''),
+        'cislo_id': params.get('manual_cislo_id', ''),
+        'zoom': params.get('zoom'),
+        'status': 'error',
+        'output': None,
+        'error': None,
+        'seconds': None,
+        'pid': os.getpid(),
+    }
+    errors = []
+    engine.finished.connect(lambda path: result.update(status='ok', output=path))
+    engine.error.connect(errors.append)
+
+    t0 = time.perf_counter()
+    try:
+        engine.run()
+    except Exception as e:
+        errors.append(str(e))
+    result['seconds'] = round(time.perf_counter() - t0, 3)
+    result['metrics'] = engine.metrics.to_dict()
+    if result['status'] != 'ok':
+        result['error'] = errors[-1] if errors else "Neznámá chyba"
+    return result
+
+
+def run_batch(jobs_params, workers=None, on_result=None):
+    """Spustí úlohy na process poolu, vrací report seřazený podle pořadí v manifestu."""
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    workers = min(workers, max(1, len(jobs_params)))
+
+    # Limiter je per-proces → rozpočet požadavků se mezi workery rozdělí
+    for params in jobs_params:
+        rate = params.get('tile_rate')
+        if rate is None:
+            delay = float(params.get('request_delay') or 0.0)
+            rate = (1.0 / delay) if delay > 0 else 0.0
+        params['tile_rate'] = float(rate) / workers if rate else 0.0
+
+    report = []
+    if workers == 1:
+        for i, params in enumerate(jobs_params):
+            res = render_job(i, params)
+            report.append(res)
+            if on_result:
+                on_result(res)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(render_job, i, params) for i, params in enumerate(jobs_params)]
+            for fut in as_completed(futures):
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    res = {'index': futures.index(fut), 'status': 'error', 'error': str(e)}
+                report.append(res)
+                if on_result:
+                    on_result(res)
+    report.sort(key=lambda r: r.get('index', 0))
+    return report
+
+
+def write_report(report, path, total_seconds=None):
+    """Report do JSON (se souhrnem) nebo CSV (podle přípony)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == '.csv':
+        fields = ['index', 'id_lokace', 'cislo_id', 'zoom', 'status', 'seconds', 'output', 'error', 'pid']
+        with path.open('w', newline='', encoding='utf-8') as f:
+            w = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            w.writeheader()
+            w.writerows(report)
+        return
+    ok = sum(1 for r in report if r.get('status') == 'ok')
+    summary = {
+        'jobs': len(report),
+        'ok': ok,
+        'failed': len(report) - ok,
+        'total_seconds': round(total_seconds, 3) if total_seconds is not None else None,
+        'job_seconds_sum': round(sum(r.get('seconds') or 0 for r in report), 3),
+    }
+    path.write_text(json.dumps({'summary': summary, 'jobs': report}, indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Dávkové generování map podle manifestu (JSON / CSV)")
+    ap.add_argument("manifest", help="Manifest úloh (.json nebo .csv)")
+    ap.add_argument("--out", help="Výstupní složka (pokud ji úloha neurčuje)")
+    ap.add_argument("--workers", type=int, default=None, help="Počet procesů (výchozí = počet CPU)")
+    ap.add_argument("--report", default=None, help="Report úloh (.json nebo .csv); výchozí <out>/batch_report.json")
+    args = ap.parse_args(argv)
+
+    defaults, jobs = load_manifest(args.manifest)
+    jobs_params = []
+    for i, job in enumerate(jobs):
+        try:
+            jobs_params.append(job_to_params(job, defaults, args.out))
+        except (ValueError, TypeError) as e:
+            print(f"❌ Úloha {i}: {e}")
+            return 2
+    if not jobs_params:
+        print("Manifest neobsahuje žádné úlohy")
+        return 1
+    assign_ids(jobs_params)
+
+    print(f"🗺️ Úloh: {len(jobs_params)}")
+    t0 = time.perf_counter()
+
+    def _on_result(res):
+        mark = "✅" if res.get('status') == 'ok' else "❌"
+        detail = res.get('output') if res.get('status') == 'ok' else res.get('error')
+        print(f"{mark} [{res.get('index')}] {res.get('seconds')} s – {detail}")
+
+    report = run_batch(jobs_params, args.workers, _on_result)
+    total = time.perf_counter() - t0
+
+    report_path = args.report or str(Path(args.out or jobs_params[0]['output_directory']) / "batch_report.json")
+    write_report(report, report_path, total)
+    failed = sum(1 for r in report if r.get('status') != 'ok')
+    print(f"Hotovo za {total:.1f} s: {len(report) - failed} OK, {failed} chyb – report: {report_path}")
+    return 0 if failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
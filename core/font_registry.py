@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Procesově sdílený registr fontů pro PIL.
+
+- Řetězce preferovaných fontů (vodoznak, počítadlo čtyřlístků) se vyhodnotí
+  jen jednou – první načitatelná cesta se zapamatuje, další volání už
+  neprochází souborový systém.
+- Načtené FreeTypeFont objekty se cachují podle (cesta, px, layout engine).
+- diagnostics() vrací, co bylo vyřešeno (pro log / ladění chybějící diakritiky).
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import ImageFont
+
+_CORE_DIR = Path(__file__).resolve().parent
+_FONTS_DIR = _CORE_DIR / "assets" / "fonts"
+
+# Volba #1 z náhledu vodoznaku – tučné varianty s plnou diakritikou (bez NotoSans)
+_SELECTED_WATERMARK_CHAIN = [
+    # 1) Bundlované TTF (pokud je přibalené)
+    str(_FONTS_DIR / "Arial.ttf"),
+    str(_FONTS_DIR / "SegoeUI-Bold.ttf"),
+    str(_FONTS_DIR / "Ubuntu-Bold.ttf"),
+    str(_FONTS_DIR / "PTSans-Bold.ttf"),
+    str(_FONTS_DIR / "LiberationSans-Bold.ttf"),
+    str(_FONTS_DIR / "Roboto-Bold.ttf"),
+    str(_FONTS_DIR / "Inter-SemiBold.ttf"),
+    str(_FONTS_DIR / "SourceSans3-SemiBold.ttf"),
+    str(_FONTS_DIR / "DejaVuSansCondensed-Bold.ttf"),
+    str(_FONTS_DIR / "DejaVuSans-Bold.ttf"),
+    # 2) Známé systémové cesty
+    "C:/Windows/Fonts/arial.ttf",
+    "C:/Windows/Fonts/segoeuib.ttf",
+    "/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf",
+    "/usr/share/fonts/truetype/ptfonts/PTSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/truetype/roboto/Roboto-Bold.ttf",
+    "/usr/share/fonts/truetype/inter/Inter-SemiBold.ttf",
+    "/usr/share/fonts/truetype/source-sans-3/SourceSans3-SemiBold.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansCondensed-Bold.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "/Library/Fonts/Segoe UI Bold.ttf",
+    "/Library/Fonts/Ubuntu-B.ttf",
+    "/Library/Fonts/Roboto Bold.ttf",
+    # 3) Podle rodinného názvu
+    "Arial", "Segoe UI", "Ubuntu", "PT Sans", "Liberation Sans", "Roboto", "Inter",
+    "Source Sans 3", "DejaVu Sans Condensed", "DejaVu Sans",
+]
+
+CHAINS = {
+    # Vodoznak mapy: LiberationSerif-Bold (přibalený v kořeni projektu), pak volba #1 z náhledu
+    "watermark": ["LiberationSerif-Bold.ttf", str(_CORE_DIR.parent / "LiberationSerif-Bold.ttf")]
+                 + _SELECTED_WATERMARK_CHAIN,
+    "watermark_selected": _SELECTED_WATERMARK_CHAIN,
+    # Počítadlo čtyřlístků (bezpečné fallbacky na macOS)
+    "counter": ["Menlo.ttf", "Menlo.ttc", "Helvetica.ttc", "Arial.ttf"],
+}
+
+_FONT_CACHE_MAX = 512
+
+_lock = threading.RLock()
+_resolved = {}              # chain -> cesta | None
+_fonts = OrderedDict()      # (cesta, px, layout) -> FreeTypeFont
+_stats = {"hits": 0, "misses": 0, "failed": 0}
+
+
+def _layout_key(layout):
+    return int(layout) if layout is not None else int(ImageFont.Layout.BASIC)
+
+
+def get_font(path, px, layout=None):
+    """FreeTypeFont pro (path, px, layout) – načte se jen poprvé. Chyby propagují (OSError)."""
+    key = (str(path), max(1, int(px)), _layout_key(layout))
+    with _lock:
+        font = _fonts.get(key)
+        if font is not None:
+            _fonts.move_to_end(key)
+            _stats["hits"] += 1
+            return font
+        _stats["misses"] += 1
+        try:
+            font = ImageFont.truetype(key[0], key[1], layout_engine=key[2])
+        except Exception:
+            _stats["failed"] += 1
+            raise
+        _fonts[key] = font
+        while len(_fonts) > _FONT_CACHE_MAX:
+            _fonts.popitem(last=False)
+        return font
+
+
+def resolve_chain(name):
+    """První načitatelný font z řetězce `name` (vyhodnoceno jednou za proces), jinak None."""
+    with _lock:
+        if name in _resolved:
+            return _resolved[name]
+        found = None
+        for cand in CHAINS.get(name, ()):
+            if ("/" in cand or "\\" in cand) and not Path(cand).exists():
+                continue
+            try:
+                ImageFont.truetype(cand, 12)
+            except Exception:
+                continue
+            found = cand
+            break
+        _resolved[name] = found
+        return found
+
+
+def get_chain_font(name, px, layout=None):
+    """Font z řetězce `name` v dané velikosti; bez nalezeného fontu ImageFont.load_default()."""
+    path = resolve_chain(name)
+    if path is not None:
+        try:
+            return get_font(path, px, layout)
+        except Exception:
+            pass
+    return ImageFont.load_default()
+
+
+def preload(names=None):
+    """Vyhodnotí řetězce předem (při startu aplikace), aby první render nečekal na probing."""
+    for name in (names or CHAINS):
+        resolve_chain(name)
+    return diagnostics()
+
+
+def diagnostics():
+    """Vyřešené fonty a statistiky cache: {'chains': {...}, 'cached_fonts': n, 'hits': .., ...}."""
+    with _lock:
+        return {
+            "chains": {name: _resolved.get(name, "<nevyhodnoceno>") for name in CHAINS},
+            "cached_fonts": len(_fonts),
+            **_stats,
+        }
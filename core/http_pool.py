@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Sdílený pool HTTP sessions pro stahování dlaždic (keep-alive, retry s backoffem).
+
+requests.Session není zaručeně thread-safe, proto pool drží několik sessions
+ve frontě a každé vlákno si jednu na dobu požadavku „vypůjčí“. Spojení
+(TCP + TLS) zůstávají otevřená mezi požadavky, takže odpadá handshake
+na každou dlaždici.
+"""
+
+import queue
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'MapGenerator/1.0 (Python)',
+    'Accept': 'image/png,image/*,*/*',
+    'Accept-Language': 'cs,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+
+class SessionPool:
+    """
+    Pool `size` sessions; každá má HTTPAdapter s `size` spojeními na host
+    a retry politikou (connect/read chyby + 429/5xx, exponenciální backoff,
+    respektuje Retry-After).
+    """
+
+    def __init__(self, size=8, retries=3, backoff=0.5, connect_timeout=5.0, read_timeout=10.0):
+        self.size = max(1, int(size))
+        self.timeout = (float(connect_timeout), float(read_timeout))
+        self.retry = Retry(
+            total=max(0, int(retries)),
+            connect=max(0, int(retries)),
+            read=max(0, int(retries)),
+            status=max(0, int(retries)),
+            backoff_factor=max(0.0, float(backoff)),
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self._sessions = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.size, pool_maxsize=self.size, max_retries=self.retry)
+        s.mount('https://', adapter)
+        s.mount('http://', adapter)
+        s.headers.update(DEFAULT_HEADERS)
+        return s
+
+    @contextmanager
+    def session(self):
+        """Vypůjčí session z poolu (případně vytvoří novou, max. `size`)."""
+        s = None
+        try:
+            s = self._sessions.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    s = self._new_session()
+            if s is None:
+                s = self._sessions.get()
+        try:
+            yield s
+        finally:
+            self._sessions.put(s)
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        """GET přes vypůjčenou session; výchozí timeout = (connect, read) z poolu."""
+        with self.session() as s:
+            return s.get(url, headers=headers, timeout=timeout or self.timeout, **kwargs)
+
+    def close(self):
+        while True:
+            try:
+                self._sessions.get_nowait().close()
+            except queue.Empty:
+                break
+            except Exception:
+                continue
+        with self._lock:
+            self._created = 0
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_session_pool(size=8, retries=3, backoff=0.5, connect_timeout=5.0, read_timeout=10.0):
+    """Sdílený pool pro danou konfiguraci (stejná konfigurace = stejná spojení)."""
+    key = (int(size), int(retries), float(backoff), float(connect_timeout), float(read_timeout))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = SessionPool(*key)
+            _POOLS[key] = pool
+        return pool
+
+
+def session_pool_from_params(params):
+    """Pool podle parametrů renderu (http_pool_size, http_retries, http_backoff, timeouty)."""
+    p = params or {}
+    return get_session_pool(
+        size=p.get('http_pool_size', 8),
+        retries=p.get('http_retries', 3),
+        backoff=p.get('http_backoff', 0.5),
+        connect_timeout=p.get('http_connect_timeout', 5.0),
+        read_timeout=p.get('http_read_timeout', 10.0),
+    )
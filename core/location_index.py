@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Index metadat lokačních map (bez Qt).
+
+Z textových metadat PNG (AOI_POLYGON, AOI_AREA_M2, Anonymizovaná lokace,
+GPS_Latitude/GPS_Longitude, Zoom_Level, ID_Lokace) a rozměrů mapy drží
+jeden záznam LocationMapInfo na soubor včetně předpočteného polygonu ve WGS84.
+Záznam platí, dokud se nezmění podpis souboru (velikost, mtime) – strom,
+překryvy i generování PDF tak mapu neotevírají znovu.
+
+  info = get_location_index().get(path)   → LocationMapInfo | None
+  get_location_index().invalidate(path)   – po zápisu metadat
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+from core.png_chunks import read_png_text_and_size
+from core.tile_math import TILE_SIZE, lat_lon_to_tile_float, tile_float_to_lat_lon
+
+KEY_POLYGON = "AOI_POLYGON"
+KEY_AREA = "AOI_AREA_M2"
+KEY_ANONYMIZED = "Anonymizovaná lokace"
+KEY_ANONYMIZED_ASCII = "Anonymizovana lokace"
+KEY_LAT = "GPS_Latitude"
+KEY_LON = "GPS_Longitude"
+KEY_ZOOM = "Zoom_Level"
+KEY_LOCATION_ID = "ID_Lokace"
+
+_TRUE_VALUES = ("ano", "yes", "true", "1")
+
+
+def _lookup(text, key):
+    """Hodnota klíče – přesně, jinak bez ohledu na okolní mezery a velikost písmen."""
+    if key in text:
+        return text[key]
+    wanted = key.strip().lower()
+    for k, v in text.items():
+        if str(k).strip().lower() == wanted:
+            return v
+    return None
+
+
+def _to_float(value):
+    try:
+        return float(str(value).strip().replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_lat_lon_zoom_from_name(name):
+    """(lat, lon, zoom) z názvu mapy '…+GPS49.23173S+17.65707V+Z18+…' (české i anglické značky)."""
+    lat = lon = zoom = None
+    m = re.search(
+        r'(?:GPS\s*)?([0-9]+(?:[.,][0-9]+)?)\s*([SJNVEWZ])\s*[\+\s_,;:-]?\s*([0-9]+(?:[.,][0-9]+)?)\s*([SJNVEWZ])',
+        name, re.IGNORECASE,
+    )
+    if m:
+        lat_val = float(m.group(1).replace(',', '.'))
+        lat_dir = m.group(2).upper()
+        lon_val = float(m.group(3).replace(',', '.'))
+        lon_dir = m.group(4).upper()
+        if any(d in {'N', 'E', 'W'} for d in (lat_dir, lon_dir)):
+            lat = -lat_val if lat_dir == 'S' else lat_val
+            lon = -lon_val if lon_dir == 'W' else lon_val
+        else:
+            lat = -lat_val if lat_dir == 'J' else lat_val
+            lon = -lon_val if lon_dir == 'Z' else lon_val
+    mz = re.search(r'(?:^|[+\-_\s])Z(\d{1,2})(?=$|[+\-_\s])', name, re.IGNORECASE)
+    if mz:
+        zoom = max(0, min(22, int(mz.group(1))))
+    return lat, lon, zoom
+
+
+def pixels_to_wgs84(points, center_lat, center_lon, zoom, width_px, height_px, tile_size=TILE_SIZE):
+    """Pixelové body mapy → [(lat, lon), …] (střed mapy = GPS střed, Web Mercator)."""
+    cx, cy = lat_lon_to_tile_float(center_lat, center_lon, zoom)
+    out = []
+    for p in points:
+        x, y = float(p[0]), float(p[1])
+        out.append(tile_float_to_lat_lon(
+            cx + (x - width_px * 0.5) / tile_size,
+            cy + (y - height_px * 0.5) / tile_size,
+            zoom,
+        ))
+    return out
+
+
+@dataclass(frozen=True)
+class LocationMapInfo:
+    path: str
+    size: int
+    mtime_ns: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    text: dict = field(default_factory=dict)        # všechna textová metadata PNG
+    polygon_raw: Optional[str] = None               # surová hodnota AOI_POLYGON
+    polygon: Optional[dict] = None                  # JSON AOI_POLYGON s ≥ 3 body
+    polygon_wgs84: Optional[tuple] = None           # ((lat, lon), …)
+    area_m2: Optional[float] = None
+    area_raw: Optional[str] = None
+    anonymized: bool = False
+    gps_center: Optional[Tuple[float, float]] = None  # z metadat (PNG text / EXIF), ne z názvu
+    zoom: Optional[int] = None
+    location_id: Optional[str] = None
+
+    @property
+    def has_polygon(self):
+        """Neprázdný klíč AOI_POLYGON (bez ohledu na platnost JSON)."""
+        return bool(str(self.polygon_raw or "").strip())
+
+    @property
+    def polygon_points(self):
+        return self.polygon.get('points') if self.polygon else None
+
+
+def read_map_text(path):
+    """(textová metadata dict[str, str], (šířka, výška)) lokační mapy; PNG jen po chunkách do IDAT."""
+    if str(path).lower().endswith(".png"):
+        try:
+            text, size = read_png_text_and_size(path)
+            return text, size or (None, None)
+        except ValueError:
+            pass
+    from PIL import Image
+    meta = {}
+    with Image.open(str(path)) as im:
+        size = im.size
+        try:
+            for k, v in (getattr(im, "text", None) or {}).items():
+                meta[str(k)] = str(v)
+        except Exception:
+            pass
+        for k, v in (getattr(im, "info", None) or {}).items():
+            if isinstance(v, (bytes, bytearray)):
+                v = v.decode("utf-8", "ignore")
+            if isinstance(v, str):
+                meta.setdefault(str(k), v)
+    return meta, size
+
+
+def build_location_info(path, st=None):
+    path = str(path)
+    st = st or os.stat(path)
+    text, size = {}, (None, None)
+    try:
+        text, size = read_map_text(path)
+    except Exception:
+        pass
+    width, height = size
+
+    polygon_raw = _lookup(text, KEY_POLYGON)
+    polygon = None
+    if polygon_raw and str(polygon_raw).strip():
+        try:
+            data = json.loads(polygon_raw)
+            if isinstance(data, dict) and isinstance(data.get('points'), list) and len(data['points']) >= 3:
+                polygon = data
+        except (TypeError, ValueError):
+            polygon = None
+
+    area_raw = _lookup(text, KEY_AREA)
+    anon = _lookup(text, KEY_ANONYMIZED)
+    if anon is None:
+        anon = _lookup(text, KEY_ANONYMIZED_ASCII)
+
+    gps_center = None
+    lat, lon = _to_float(_lookup(text, KEY_LAT)), _to_float(_lookup(text, KEY_LON))
+    if lat is not None and lon is not None:
+        gps_center = (lat, lon)
+    else:
+        # EXIF GPS (u PNG chunk eXIf, čte se jen do IDAT) – jako dřívější getexif() pro všechny formáty
+        try:
+            from core.photo_metadata import read_gps
+            gps_center = read_gps(path)
+        except Exception:
+            gps_center = None
+
+    zoom_f = _to_float(_lookup(text, KEY_ZOOM))
+    zoom = int(zoom_f) if zoom_f is not None else None
+    location_id = _lookup(text, KEY_LOCATION_ID)
+
+    polygon_wgs84 = None
+    if polygon and width and height:
+        n_lat, n_lon, n_zoom = parse_lat_lon_zoom_from_name(os.path.splitext(os.path.basename(path))[0])
+        c_lat, c_lon = gps_center if gps_center else (n_lat, n_lon)
+        c_zoom = zoom if zoom is not None else n_zoom
+        if c_lat is not None and c_lon is not None and c_zoom is not None:
+            try:
+                polygon_wgs84 = tuple(pixels_to_wgs84(polygon['points'], c_lat, c_lon, c_zoom, width, height))
+            except (TypeError, ValueError, IndexError):
+                polygon_wgs84 = None
+
+    return LocationMapInfo(
+        path=path, size=int(st.st_size), mtime_ns=int(st.st_mtime_ns),
+        width=width, height=height, text=text,
+        polygon_raw=polygon_raw, polygon=polygon, polygon_wgs84=polygon_wgs84,
+        area_m2=_to_float(area_raw), area_raw=area_raw,
+        anonymized=str(anon or "").strip().lower() in _TRUE_VALUES,
+        gps_center=gps_center, zoom=zoom,
+        location_id=str(location_id) if location_id is not None else None,
+    )
+
+
+class LocationMapIndex:
+    """Procesová cache LocationMapInfo podle cesty, platná pro (velikost, mtime) souboru."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max(1, int(max_entries))
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Záznam mapy; při změně podpisu se metadata načtou znovu. None, pokud soubor neexistuje."""
+        key = os.path.abspath(str(path))
+        try:
+            st = os.stat(key)
+        except OSError:
+            self.invalidate(key)
+            return None
+        with self._lock:
+            info = self._items.get(key)
+            if info is not None and (info.size, info.mtime_ns) == (int(st.st_size), int(st.st_mtime_ns)):
+                self._items.move_to_end(key)
+                return info
+        info = build_location_info(key, st)
+        with self._lock:
+            self._items[key] = info
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return info
+
+    def invalidate(self, path=None):
+        """Zahodí záznam souboru (nebo všechny při path=None)."""
+        with self._lock:
+            if path is None:
+                self._items.clear()
+            else:
+                self._items.pop(os.path.abspath(str(path)), None)
+
+
+_LOCATION_INDEX = LocationMapIndex()
+
+
+def get_location_index():
+    """Jediná (procesová) instance indexu lokačních map."""
+    return _LOCATION_INDEX
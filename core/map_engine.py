@@ -0,0 +1,2022 @@
+# -*- coding: utf-8 -*-
+"""
+Renderovací jádro map bez závislosti na Qt.
+
+MapEngine obsahuje celý pipeline (GPS, dlaždice, skládání, překryvy,
+vodoznak, metadata, uložení) a hlásí průběh přes EngineSignal – jednoduché
+callbacky se stejným API jako Qt signály (connect / emit). Díky tomu běží
+headless i v procesech ProcessPoolExecutoru (instance jde pickle-ovat;
+sdílené zdroje jako HTTP pool a cache se v cílovém procesu vytvoří znovu).
+Qt adaptér pro GUI je core.map_processor.MapProcessor.
+"""
+
+import math
+from PIL import Image, ImageDraw
+from PIL.ExifTags import TAGS, GPSTAGS
+from io import BytesIO
+import os
+from pathlib import Path
+import threading
+from collections import OrderedDict
+import time
+import hashlib
+from sys import exit
+import numpy as np
+from PIL.PngImagePlugin import PngInfo
+import re
+
+from core.tile_fetcher import TileFetcher, get_host_limiter
+from core.tile_cache import get_disk_cache, get_memory_cache, decode_tile
+from core.http_pool import session_pool_from_params
+from core.tile_sources import create_tile_source
+from core.tile_math import tile_window, legacy_grid_size
+from core import font_registry
+from core import output_encoder
+from core.render_metrics import RenderMetrics, ORIGIN_MEMORY, report_path_for
+from core.photo_metadata import read_photo_metadata
+from core.png_chunks import read_png_text
+
+
+class EngineSignal:
+    """Minimální náhrada Qt signálu: seznam callbacků, emit() je volá synchronně."""
+
+    def __init__(self):
+        self._slots = []
+        self._lock = threading.Lock()
+
+    def connect(self, slot):
+        with self._lock:
+            if slot not in self._slots:
+                self._slots.append(slot)
+
+    def disconnect(self, slot=None):
+        with self._lock:
+            if slot is None:
+                self._slots.clear()
+            elif slot in self._slots:
+                self._slots.remove(slot)
+
+    def emit(self, *args):
+        with self._lock:
+            slots = list(self._slots)
+        for slot in slots:
+            slot(*args)
+
+    # Posluchači (lambdy, Qt sloty) se nepřenáší mezi procesy
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+
+class MapEngine:
+    """Hlavní třída pro zpracování map - obsahuje váš původní kód"""
+
+    # Události (stejná jména a argumenty jako signály Qt adaptéru):
+    #   finished(str) – cesta k výslednému souboru
+    #   error(str)    – chybová zpráva
+    #   progress(int) – průběh 0-100
+    #   log(str, str) – zpráva, typ
+    #   status(str, str) – status typ, zpráva
+    EVENTS = ("finished", "error", "progress", "log", "status")
+
+    TILE_URL_TEMPLATE = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+    
+    # Sdílené prostředky procesu – při pickle se nepřenáší, v cílovém procesu se vytvoří znovu
+    _RUNTIME_ATTRS = ("tile_cache", "memory_cache", "http_pool", "tile_source")
+
+    def __init__(self, parameters):
+        self.params = parameters
+        self.should_stop = False
+        for name in self.EVENTS:
+            setattr(self, name, EngineSignal())
+        
+        # Nastavení konstant z vašeho kódu
+        self.CACHE_DIR = Path(parameters.get('tile_cache_dir') or (Path.home() / ".cache" / "osm_tiles"))
+        self._init_runtime()
+        self.REQUEST_DELAY = parameters.get('request_delay', 1.0)
+        self.TILE_SIZE = 256
+
+        # Souběžné stahování: počet workerů a limit požadavků/s na jeden tile server.
+        # Bez 'tile_rate' se limit odvodí z REQUEST_DELAY (1 / delay).
+        self.TILE_WORKERS = max(1, int(parameters.get('tile_workers', 4)))
+        rate = parameters.get('tile_rate')
+        if rate is None:
+            delay = float(self.REQUEST_DELAY or 0.0)
+            rate = (1.0 / delay) if delay > 0 else 0.0
+        self.TILE_RATE = max(0.0, float(rate))
+        self.TILE_BURST = max(1.0, float(parameters.get('tile_burst', self.TILE_WORKERS)))
+
+        # Metriky posledního renderu (latence/původ dlaždic, čas fází) – viz core.render_metrics
+        self.metrics = RenderMetrics()
+
+    def _init_runtime(self):
+        """Disková / paměťová cache, HTTP pool a zdroj dlaždic (sdílené v rámci procesu)."""
+        parameters = self.params
+        self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Disková cache dlaždic (source/z/x/y + HTTP validátory, LRU dle velikosti)
+        self.tile_cache = None
+        if parameters.get('tile_cache', True):
+            max_mb = float(parameters.get('tile_cache_max_mb', 512))
+            self.tile_cache = get_disk_cache(self.CACHE_DIR, int(max_mb * 1024 * 1024))
+        # Paměťová LRU dekódovaných dlaždic – sdílená všemi renderery v procesu
+        self.memory_cache = get_memory_cache()
+        # Sdílené HTTP sessions (keep-alive, retry/backoff dle parametrů)
+        self.http_pool = session_pool_from_params(parameters)
+        # Zdroj dlaždic (tile_source = http | mbtiles | dir, tile_source_path, tile_url_template)
+        self.tile_source = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self._RUNTIME_ATTRS:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_runtime()
+        
+    def haversine_distance(self, lat1, lon1, lat2, lon2):
+        """
+        Vypočítá vzdálenost mezi dvěma GPS souřadnicemi v metrech pomocí Haversinova vzorce.
+        """
+        R = 6371000  # Poloměr Země v metrech
+        phi1 = math.radians(lat1)
+        phi2 = math.radians(lat2)
+        delta_phi = math.radians(lat2 - lat1)
+        delta_lambda = math.radians(lon2 - lon1)
+        a = math.sin(delta_phi / 2.0) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2.0) ** 2
+        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1.0 - a))
+        distance = R * c
+        return distance
+
+    def gps_to_pixel(self, target_lat, target_lon, center_lat, center_lon, zoom, map_width_px, map_height_px):
+        """
+        Převede GPS souřadnice na pixelové souřadnice na finální vycentrované mapě.
+        """
+        # Pomocná funkce pro převod stupňů na čísla dlaždic (včetně desetinné části)
+        def deg2num(lat_deg, lon_deg, zoom):
+            lat_rad = math.radians(lat_deg)
+            n = 2.0 ** zoom
+            xtile = (lon_deg + 180.0) / 360.0 * n
+            ytile = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
+            return (xtile, ytile)
+
+        center_tile_x, center_tile_y = deg2num(center_lat, center_lon, zoom)
+        target_tile_x, target_tile_y = deg2num(target_lat, target_lon, zoom)
+
+        # Rozdíl v pixelech od středové dlaždice
+        pixel_dx = (target_tile_x - center_tile_x) * self.TILE_SIZE
+        pixel_dy = (target_tile_y - center_tile_y) * self.TILE_SIZE
+
+        # Finální pixelové souřadnice relativně k centru mapy
+        pixel_x = (map_width_px / 2) + pixel_dx
+        pixel_y = (map_height_px / 2) + pixel_dy
+
+        return pixel_x, pixel_y
+
+    def is_point_in_polygon(self, x, y, polygon_points):
+        """
+        Zjistí, zda je bod uvnitř daného polygonu pomocí Ray Casting algoritmu.
+        `polygon_points` je seznam (x, y) n-tic.
+        """
+        n = len(polygon_points)
+        if n < 3:
+            return False
+        inside = False
+        p1x, p1y = polygon_points[0]
+        for i in range(n + 1):
+            p2x, p2y = polygon_points[i % n]
+            if y > min(p1y, p2y):
+                if y <= max(p1y, p2y):
+                    if x <= max(p1x, p2x):
+                        if p1y != p2y:
+                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+                        if p1x == p2x or x <= xinters:
+                            inside = not inside
+            p1x, p1y = p2x, p2y
+        return inside
+
+        
+    def read_polygon_metadata_from_png(self, image_path):
+        """
+        Vrátí dict {'points': [[x,y],...], 'alpha': 0.15, 'color': '#FF0000'} načtený z PNG tEXt klíče 'AOI_POLYGON',
+        nebo None, pokud klíč neexistuje nebo je neplatný. 
+        """
+        try:
+            import json
+            p = Path(image_path)
+            if not p.exists() or p.suffix.lower() != ".png":
+                return None
+            raw = read_png_text(p).get('AOI_POLYGON')  # jen chunky před IDAT
+            if not raw:
+                return None
+            data = json.loads(raw)
+            pts = data.get('points') or []
+            if not isinstance(pts, list) or len(pts) < 3:
+                return None
+            alpha = float(data.get('alpha', 0.15))
+            color = str(data.get('color', '#FF0000'))
+            return {'points': pts, 'alpha': alpha, 'color': color}
+        except Exception:
+            return None
+
+    def draw_polygon_overlay(self, base_image, poly):
+        """
+        Vykreslí polygon na base_image podle metadat poly a vrátí image s přidaným overlayem.
+        Očekává tvar poly: {'points': [[x,y],...], 'alpha': 0.15, 'color': '#FF0000'}.
+        Skládá se jen v obdélníku kolem polygonu (maska v NumPy), RGB zůstává RGB
+        a RGBA zůstává RGBA – obrázek se upravuje na místě.
+        """
+        from PIL import Image, ImageDraw
+    
+        # RGB / RGBA se zpracují přímo, ostatní módy přes RGBA
+        img = base_image if base_image.mode in ('RGB', 'RGBA') else base_image.convert('RGBA')
+        W, H = img.size
+    
+        # 1) Body → seznam dvojic floatů (x, y), min. 3 body
+        raw_pts = poly.get('points') or []
+        pts = []
+        for p in raw_pts:
+            try:
+                x, y = p  # očekává se 2-prvková sekvence
+                x = float(x)
+                y = float(y)
+                # volitelné ořezání do plochy (zabraňuje chybám mimo obraz)
+                x = max(0.0, min(x, float(W - 1)))
+                y = max(0.0, min(y, float(H - 1)))
+                pts.append((x, y))
+            except Exception:
+                continue
+    
+        if len(pts) < 3:
+            return img  # nic nekreslit, pokud polygon není platný
+    
+        # 2) Alfa 0..1
+        try:
+            alpha = float(poly.get('alpha', 0.15))
+        except Exception:
+            alpha = 0.15
+        alpha = max(0.0, min(1.0, alpha))
+    
+        # 3) Barva z hex kódu (#RRGGBB nebo RRGGBB)
+        color_hex = str(poly.get('color', '#FF0000')).strip().lstrip('#')
+        try:
+            if len(color_hex) == 6:
+                r = int(color_hex[0:2], 16)
+                g = int(color_hex[2:4], 16)
+                b = int(color_hex[4:6], 16)
+            elif len(color_hex) == 3:
+                r = int(color_hex * 2, 16)
+                g = int(color_hex[2] * 2, 16)
+                b = int(color_hex[1] * 2, 16)
+            else:
+                r, g, b = 255, 0, 0
+        except Exception:
+            r, g, b = 255, 0, 0
+    
+        # 4) Obdélník polygonu (+ rezerva na obrys šířky 2 px), souřadnice v něm lokálně
+        line_w = 2
+        x0 = max(0, int(math.floor(min(p[0] for p in pts))) - line_w)
+        y0 = max(0, int(math.floor(min(p[1] for p in pts))) - line_w)
+        x1 = min(W, int(math.ceil(max(p[0] for p in pts))) + line_w + 1)
+        y1 = min(H, int(math.ceil(max(p[1] for p in pts))) + line_w + 1)
+        local = [(x - x0, y - y0) for x, y in pts]
+    
+        # 5) Masky: výplň (alfa polygonu) a obrys (plně krycí) – obrys přepisuje výplň
+        #    Obrys: UZAVŘÍT polyline přidáním PRVNÍHO bodu (NE celý seznam!)
+        fill_mask = Image.new('L', (x1 - x0, y1 - y0), 0)
+        ImageDraw.Draw(fill_mask).polygon(local, fill=int(round(255 * alpha)))
+        stroke_mask = Image.new('L', fill_mask.size, 0)
+        ImageDraw.Draw(stroke_mask).line(local + [local[0]], fill=255, width=line_w)
+        a = np.maximum(np.asarray(fill_mask), np.asarray(stroke_mask)).astype(np.float32) / 255.0
+        a = a[..., None]
+    
+        # 6) Sloučení jen ve výřezu (stejná matematika jako Image.alpha_composite)
+        box = (x0, y0, x1, y1)
+        region = np.asarray(img.crop(box), dtype=np.float32)
+        color = np.array([r, g, b], dtype=np.float32)
+        if img.mode == 'RGBA':
+            base_rgb = region[..., :3]
+            base_a = region[..., 3:4] / 255.0
+            out_a = a + base_a * (1.0 - a)
+            safe = np.where(out_a > 0, out_a, 1.0)
+            out_rgb = (color * a + base_rgb * base_a * (1.0 - a)) / safe
+            out = np.concatenate([out_rgb, out_a * 255.0], axis=-1)
+        else:
+            out = color * a + region * (1.0 - a)
+        out = np.clip(np.rint(out), 0, 255).astype(np.uint8)
+        img.paste(Image.fromarray(out, img.mode), box[:2])
+        return img
+
+    def get_selected_watermark_font(self, px: int, layout=None):
+        """
+        Vybraný font pro finální vodoznak podle volby #1 z náhledu.
+        Preferuje tučné systémové/bundlované varianty s plnou diakritikou (bez NotoSans).
+        px = velikost v pixelech (ne body); layout = ImageFont.Layout.BASIC/RAQM.
+        Řetězec kandidátů se vyhodnocuje jednou za proces (core.font_registry).
+        """
+        return font_registry.get_chain_font("watermark_selected", px, layout)
+
+    # Cache hotových spritů vodoznaku: (text, size_mm, dpi, font, ss) -> (RGBA sprite, dx, dy)
+    _WATERMARK_SPRITES = OrderedDict()
+    _WATERMARK_SPRITES_MAX = 256
+    _WATERMARK_SPRITES_LOCK = threading.Lock()
+
+    def add_watermark_text_NOVY(self, image, text, size_mm=3.0, dpi=300):
+        """
+        Vodoznak (upraveno):
+        - Černý okraj textu zmenšen na polovinu.
+        - Text posunut o 40 % blíže dolnímu okraji.
+        - Font zmenšen o 2 px (po přepočtu z mm na px).
+        - Stále používá RAQM (pokud je k dispozici), supersampling a LANCZOS.
+        - Supersampluje se jen malý sprite kolem textu (ne celý obrázek); sprite se
+          cachuje podle (text, size_mm, dpi, font, ss) a skládá jen do svého výřezu.
+        """
+        try:
+            from PIL import Image, ImageDraw, ImageFont, features
+            import unicodedata
+    
+            safe_text = unicodedata.normalize('NFC', text or "")
+            if not safe_text.strip():
+                self.log.emit("⚠️ Text vodoznaku je prázdný", "warning")
+                return image
+    
+            # Supersampling 1..4 (výchozí 2)
+            ss = int(self.params.get('watermark_supersample', 2)) if hasattr(self, 'params') else 2
+            ss = max(1, min(4, ss))
+    
+            # mm -> px a zmenšení fontu o 2 px
+            target_px_base = max(1, int(round(float(size_mm or 0.0) * dpi / 25.4)))
+            target_px = max(1, target_px_base - 2)
+            scaled_px = max(1, target_px * ss)
+    
+            # Okraj a zvednutí
+            margin_mm = 1.0
+            raise_mm = 0.3
+            margin_px = int(round(margin_mm * dpi / 25.4))
+            raise_px = int(round(raise_mm * dpi / 25.4))
+    
+            W, H = image.size
+    
+            # RAQM pokud je k dispozici
+            layout = ImageFont.Layout.BASIC
+            try:
+                if features.check("raqm"):
+                    layout = ImageFont.Layout.RAQM
+            except Exception:
+                pass
+    
+            # Volba fontu (LiberationSerif-Bold, jinak volba #1 z náhledu) – cachováno v registru
+            font = font_registry.get_chain_font("watermark", scaled_px, layout)
+    
+            # Korekce metrik
+            try:
+                d = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+                bb = d.textbbox((0, 0), safe_text, font=font, anchor='la')
+                measured = max(1, bb - bb[1])
+                expected = scaled_px
+                if abs(measured - expected) > 1:
+                    adj_px = max(1, int(round(scaled_px * (expected / measured))))
+                    font = font_registry.get_chain_font("watermark", adj_px, layout)
+            except Exception:
+                pass
+    
+            # 40 % blíže ke spodní hraně (offset * 0.6)
+            total_offset_px = margin_px + raise_px
+            new_offset_px = max(0, int(round(total_offset_px * 0.6)))
+    
+            # Kotva textu (pravý dolní roh, anchor 'rb') ve výsledných px
+            anchor_x = W - margin_px
+            anchor_y = H - new_offset_px
+    
+            font_id = (getattr(font, 'path', None) or type(font).__name__, getattr(font, 'size', None), int(layout))
+            key = (safe_text, float(size_mm or 0.0), int(dpi), font_id, ss)
+            with self._WATERMARK_SPRITES_LOCK:
+                cached = self._WATERMARK_SPRITES.get(key)
+                if cached is not None:
+                    self._WATERMARK_SPRITES.move_to_end(key)
+            if cached is None:
+                cached = self._render_watermark_sprite(safe_text, font, scaled_px, ss)
+                with self._WATERMARK_SPRITES_LOCK:
+                    self._WATERMARK_SPRITES[key] = cached
+                    while len(self._WATERMARK_SPRITES) > self._WATERMARK_SPRITES_MAX:
+                        self._WATERMARK_SPRITES.popitem(last=False)
+            sprite, dx, dy = cached
+    
+            # Výřez spritu oříznutý na hranice obrázku
+            x0, y0 = anchor_x - dx, anchor_y - dy
+            x1, y1 = x0 + sprite.width, y0 + sprite.height
+            cx0, cy0, cx1, cy1 = max(0, x0), max(0, y0), min(W, x1), min(H, y1)
+            if cx0 >= cx1 or cy0 >= cy1:
+                return image
+            part = sprite.crop((cx0 - x0, cy0 - y0, cx1 - x0, cy1 - y0))
+    
+            # Kompozice jen v oblasti vodoznaku (obrázek se upravuje na místě)
+            box = (cx0, cy0, cx1, cy1)
+            region = image.crop(box)
+            region = region.convert('RGBA') if region.mode != 'RGBA' else region
+            region = Image.alpha_composite(region, part)
+            if image.mode != 'RGBA':
+                try:
+                    region = region.convert(image.mode)
+                except Exception:
+                    image = image.convert('RGB')
+                    region = region.convert('RGB')
+            image.paste(region, box[:2])
+            return image
+    
+        except Exception as e:
+            try:
+                self.log.emit(f"❌ Chyba ve vodoznaku (UPR): {e}", "error")
+            except Exception:
+                pass
+            return image
+
+    def _render_watermark_sprite(self, safe_text, font, scaled_px, ss):
+        """
+        Supersamplovaný text vodoznaku zmenšený LANCZOSem na výslednou velikost.
+        Vrací (RGBA sprite, dx, dy) – dx/dy = poloha kotvy 'rb' uvnitř spritu.
+        Sprite je zarovnaný na mřížku ss, takže odpovídá výřezu celoplošného supersamplu.
+        """
+        from PIL import Image, ImageDraw
+    
+        # Poloviční stroke (původně ~0.14, nyní ~0.07)
+        stroke_w = max(1, int(round(scaled_px * 0.07)))
+    
+        probe = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+        l, t, r, b = probe.textbbox((0, 0), safe_text, font=font, anchor='rb', stroke_width=stroke_w)
+        pad = 3  # rezerva pro jádro LANCZOS (~3 px ve výsledném měřítku)
+        dx = int(math.ceil(max(0, -l) / ss)) + pad
+        dy = int(math.ceil(max(0, -t) / ss)) + pad
+        w = dx + int(math.ceil(max(0, r) / ss)) + pad
+        h = dy + int(math.ceil(max(0, b) / ss)) + pad
+    
+        overlay = Image.new('RGBA', (w * ss, h * ss), (0, 0, 0, 0))
+        d = ImageDraw.Draw(overlay)
+        d.text(
+            (dx * ss, dy * ss),
+            safe_text,
+            fill=(255, 255, 255, 255),
+            font=font,
+            stroke_width=stroke_w,
+            stroke_fill=(0, 0, 0, 255),
+            anchor='rb',
+        )
+        sprite = overlay.resize((w, h), Image.Resampling.LANCZOS) if ss > 1 else overlay
+        return sprite, dx, dy
+
+    def stop(self):
+        """Zastavení zpracování"""
+        self.should_stop = True
+        
+    def run(self):
+        """Hlavní funkce pro spuštění zpracování – s logikou pro anonymizaci a přepočet AOI plochy."""
+        try:
+            from pathlib import Path
+            from PIL import Image
+            import json
+
+            self.log.emit("🚀 Spouštím generování mapy...", "info")
+            self.status.emit("processing", "Inicializace...")
+            metrics = self.metrics
+            metrics.reset()
+
+            # Číselné ID
+            cislo_id = self.generate_cislo_id()
+            self.log.emit(f"🔢 Použité ID: {cislo_id}", "info")
+
+            # GPS souřadnice (střed mapy)
+            self.progress.emit(10)
+            self.status.emit("processing", "Získávám GPS souřadnice...")
+            if self.params.get('coordinate_mode') == 'F':
+                coords = self.get_gps_from_photo(self.params.get('photo_filename'))
+                if not coords:
+                    raise Exception("Nepodařilo se získat GPS souřadnice ze souboru")
+                lat, lon = coords
+                self.log.emit(f"📍 GPS ze souboru (střed mapy): {lat:.6f}°, {lon:.6f}°", "success")
+            else:
+                coords = self.parse_manual_coordinates(self.params.get('manual_coordinates', ''))
+                if not coords:
+                    raise Exception("Nepodařilo se parsovat ruční GPS souřadnice")
+                lat, lon = coords
+
+            # Rozměry
+            self.progress.emit(20)
+            self.status.emit("processing", "Počítám rozměry...")
+            width_cm = float(self.params.get('output_width_cm'))
+            height_cm = float(self.params.get('output_height_cm'))
+            dpi = int(self.params.get('output_dpi'))
+            width_px = max(1, int(round(width_cm / 2.54 * dpi)))
+            height_px = max(1, int(round(height_cm / 2.54 * dpi)))
+            self.log.emit(f"📏 Rozměry výstupu: {width_px}×{height_px} px ({width_cm}×{height_cm} cm @ {dpi} DPI)", "info")
+            metrics.lap("gps")
+
+            # Stahování map
+            self.progress.emit(30)
+            self.status.emit("processing", "Stahuji mapové dlaždice...")
+            zoom = int(self.params.get('zoom'))
+            tile_zoom = self.choose_tile_zoom(lat, lon, zoom, width_px, height_px)
+            if tile_zoom > zoom:
+                map_image = self.download_supersampled_map(lat, lon, zoom, tile_zoom, width_px, height_px)
+            else:
+                map_image = self.download_map_tiles(lat, lon, zoom, width_px, height_px)
+            if map_image is None:
+                raise Exception("Nepodařilo se stáhnout mapové dlaždice")
+
+            # Přesná velikost (pojištění)
+            if map_image.size != (width_px, height_px):
+                map_image = map_image.resize((width_px, height_px), Image.Resampling.LANCZOS)
+                self.log.emit(f"✓ Mapa změněna na velikost: {map_image.size}", "info")
+            metrics.lap("tiles")
+
+            # Podklad
+            self.progress.emit(60)
+            photo_path = (self.params.get('photo_filename') or "").strip()
+            if photo_path and Path(photo_path).exists():
+                input_image = Image.open(photo_path)
+            else:
+                input_image = Image.new('RGB', (width_px, height_px), color='white')
+            metrics.lap("base")
+
+            # Transparentnost a kombinování
+            self.progress.emit(70)
+            map_opacity = max(0.0, min(1.0, float(self.params.get('map_opacity', 1.0))))
+            combined_image = self.combine_images(input_image, map_image, map_opacity)
+            metrics.lap("composite")
+
+            # --- KRESLENÍ / OVERLAYE ---
+            self.progress.emit(80)
+
+            # 1) Polygon z metadat (pokud existuje)
+            poly_meta = self.read_polygon_metadata_from_png(photo_path) if photo_path else None
+            if poly_meta:
+                self.log.emit(f"🔺 Kreslím polygon z metadat (AOI_POLYGON), {len(poly_meta.get('points', []))} bodů", "info")
+                combined_image = self.draw_polygon_overlay(combined_image, poly_meta)
+
+            # 2) GPS marker/text
+            self.status.emit("processing", "Přidávám GPS značku a text...")
+            combined_image = self.draw_central_marker(combined_image)
+
+            # 3) Vodoznak
+            self.progress.emit(85)
+            self.status.emit("processing", "Přidávám vodoznak...")
+            watermark_size = float(self.params.get('watermark_size_mm', 3.0))
+            watermark_text = (self.params.get('id_lokace') or '').strip() or str(cislo_id)
+            combined_image = self.add_watermark_text_NOVY(combined_image, watermark_text, watermark_size, dpi)
+            metrics.lap("overlays")
+
+            # --- METADATA PNG ---
+            self.progress.emit(90)
+            self.status.emit("processing", "Přidávám metadata...")
+            metadata = {}  # textová metadata → tEXt/iTXt (PNG) nebo EXIF/XMP (WebP/JPEG)
+            metadata["GPS_Latitude"] = f"{lat}"
+            metadata["GPS_Longitude"] = f"{lon}"
+            metadata["GPS_Source"] = self.params.get('coordinate_mode', 'G')
+            metadata["Zoom_Level"] = f"{zoom}"
+            if tile_zoom != zoom:
+                metadata["Tile_Zoom_Level"] = f"{tile_zoom}"
+            metadata["ID_Lokace"] = self.params.get('id_lokace', '')
+            metadata["Popis"] = self.params.get('popis', '')
+            metadata["Cislo_ID"] = f"{cislo_id}"
+            metadata["Generator"] = f"{self.params.get('app_name','')} - {self.params.get('contact_email','')}"
+            try:
+                ms_val = max(2, int(self.params.get('marker_size', 10)))
+                ms_style = str(self.params.get('marker_style', 'dot')).lower()
+                metadata["Marker_Size_Px"] = f"{ms_val}"
+                metadata["Marker_Style"] = ms_style
+            except Exception:
+                pass
+
+            # Anonymizace (z GUI/params)
+            try:
+                if bool(self.params.get('anonymizovana_lokace')):
+                    metadata["Anonymizovaná lokace"] = "Ano"
+                    metadata["Anonymizovana lokace"] = "Ano"  # ASCII fallback
+            except Exception:
+                pass
+
+            # Polygon metadata
+            if poly_meta:
+                try:
+                    metadata["AOI_POLYGON"] = json.dumps(poly_meta)
+                except Exception:
+                    pass
+
+            # AOI_AREA_M2 – přepočet přes m/px (Web Mercator) pokud polygon existuje
+            try:
+                if poly_meta and isinstance(poly_meta.get('points'), (list, tuple)):
+                    W, H = combined_image.size
+                    pts = []
+                    for p in (poly_meta.get('points') or []):
+                        try:
+                            x, y = float(p[0]), float(p[1])
+                            x = max(0.0, min(x, float(W - 1)))
+                            y = max(0.0, min(y, float(H - 1)))
+                            pts.append((x, y))
+                        except Exception:
+                            continue
+                    if len(pts) >= 3:
+                        area_px2 = 0.0
+                        for i in range(len(pts)):
+                            x1, y1 = pts[i]
+                            x2, y2 = pts[(i + 1) % len(pts)]
+                            area_px2 += (x1 * y2 - x2 * y1)
+                        area_px2 = abs(area_px2) * 0.5
+                        mpp = self._meters_per_pixel(lat, zoom)
+                        area_m2 = area_px2 * (mpp * mpp)
+                        try:
+                            metadata["AOI_AREA_M2"] = f"{area_m2:.2f}"
+                        except Exception:
+                            pass
+            except Exception:
+                pass
+
+            # Doplňková metadata od volajícího (např. Output_Width_cm/Output_Height_cm/Output_DPI)
+            for k, v in (self.params.get('extra_text_meta') or {}).items():
+                metadata[str(k)] = str(v)
+            metrics.lap("metadata")
+
+            self._maybe_draw_scale(combined_image)
+            metrics.lap("overlays")
+
+            # Výstupní název a uložení
+            output_filename = self.generate_output_filename_with_gps_and_zoom(
+                self.params.get('id_lokace', ''),
+                self.params.get('popis', ''),
+                lat, lon, zoom, cislo_id
+            )
+            output_dir = Path(self.params.get('output_directory'))
+            output_dir.mkdir(parents=True, exist_ok=True)
+            # Profil ukládání (png | png_fast | png_archival | webp | jpeg) určuje i příponu
+            output_profile = self.params.get('output_profile') or output_encoder.DEFAULT_PROFILE
+            output_path = output_encoder.output_path_for(output_dir / output_filename, output_profile)
+            self.log.emit(f"💾 Ukládám do: {output_path} ({output_encoder.get_profile(output_profile)['label']})", "info")
+            output_path = output_encoder.save_image(
+                combined_image, output_path, output_profile,
+                text_meta=metadata, dpi=dpi, lat=lat, lon=lon,
+            )
+            metrics.lap("save")
+
+            self.log.emit(metrics.summary_line(), "info")
+            if self.params.get('metrics_report'):
+                try:
+                    report = metrics.write_json(report_path_for(output_path), extra={
+                        "output": str(output_path),
+                        "size_px": [width_px, height_px],
+                        "zoom": zoom,
+                        "tile_source": self.get_tile_source().name,
+                    })
+                    self.log.emit(f"📊 Report výkonu: {report}", "info")
+                except Exception as e:
+                    self.log.emit(f"⚠️ Report výkonu nelze uložit: {e}", "warning")
+
+            self.progress.emit(100)
+            self.status.emit("success", "Dokončeno!")
+            self.log.emit(f"✅ Mapa úspěšně uložena: {output_path}", "success")
+            self.finished.emit(str(output_path))
+
+        except Exception as e:
+            import traceback
+            self.log.emit(f"❌ Kritická chyba: {e}", "error")
+            self.log.emit(f"❌ Traceback: {traceback.format_exc()}", "error")
+            self.error.emit(str(e))
+    
+    import math
+    from PIL import Image, ImageDraw, ImageFont
+    
+    def _meters_per_pixel(self, lat_deg: float, zoom: int, tile_size: int = 256, R: float = 6378137.0) -> float:
+        """Web Mercator ground resolution in meters per pixel."""
+        return (2.0 * math.pi * R * math.cos(math.radians(float(lat_deg)))) / (tile_size * (2 ** int(zoom)))
+    
+    def _nice_scale_length_m(self, max_meters: float) -> float:
+        """Choose a 'nice' length (1,2,5 * 10^n) <= max_meters."""
+        if max_meters <= 0:
+            return 0.0
+        exp = math.floor(math.log10(max_meters))
+        for m in (5.0, 2.0, 1.0):
+            cand = m * (10 ** exp)
+            if cand <= max_meters + 1e-9:
+                return cand
+        # fallback
+        return (10 ** exp)
+    
+    def _format_length_label(self, meters: float) -> str:
+        return f"{meters:.0f} m" if meters < 1000 else f"{meters/1000.0:.1f} km"
+    
+    def _extract_lat_lon_from_params(self) -> tuple[float | None, float | None]:
+        """
+        Try to get center (lat, lon) from self.params.
+        Supports:
+          - params['center_lat']/['center_lon'] if present
+          - params['manual_coordinates'] like '49.23091° S, 17.65691° V' or EN 'N/E/W'
+        """
+        p = self.params or {}
+        lat = p.get('center_lat', None)
+        lon = p.get('center_lon', None)
+        if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+            return float(lat), float(lon)
+        txt = str(p.get('manual_coordinates', '')).strip()
+        if not txt:
+            return None, None
+        import re
+        m = re.search(r'([0-9]+(?:[.,][0-9]+)?)\s*°?\s*([SJNVEWZ])\s*[, ]+\s*([0-9]+(?:[.,][0-9]+)?)\s*°?\s*([SJNVEWZ])', txt, re.IGNORECASE)
+        if not m:
+            return None, None
+        lat_val = float(m.group(1).replace(',', '.'))
+        lat_dir = m.group(2).upper()
+        lon_val = float(m.group(3).replace(',', '.'))
+        lon_dir = m.group(4).upper()
+        english = any(d in {'N', 'E', 'W'} for d in {lat_dir, lon_dir})
+        if english:
+            lat = -lat_val if lat_dir == 'S' else lat_val
+            lon = -lon_val if lon_dir == 'W' else lon_val
+        else:
+            lat = -lat_val if lat_dir == 'J' else lat_val  # CZ: J = South
+            lon = -lon_val if lon_dir == 'Z' else lon_val  # CZ: Z = West
+        return lat, lon
+    
+    def _draw_scale_bar(self, img: Image.Image, lat_deg: float, zoom: int, output_dpi: int, margin_px: int = 16) -> None:
+        """
+        Draw small black/white scale bar with label in the bottom-left corner.
+        Modifies 'img' in place.
+        """
+        if img is None or lat_deg is None or zoom is None:
+            return
+
+        W, H = img.size
+        if W <= 0 or H <= 0:
+            return
+
+        # meters per pixel at given latitude/zoom
+        mpp = self._meters_per_pixel(lat_deg, zoom)
+
+        # scale bar size
+        max_bar_px = max(40, min(int(W * 0.25), 240)) # up to 25% width, cap ~240 px
+        max_meters = mpp * max_bar_px
+        nice_m = self._nice_scale_length_m(max_meters)
+        if nice_m <= 0:
+            return
+        
+        bar_px = max(1, int(round(nice_m / mpp)))
+
+        # ÚPRAVA: Zdvojnásobení výšky měřítka
+        bar_h = max(4, min(8, int(round(output_dpi / 60))))
+
+        margin_bottom = int(margin_px * 0.125)
+        margin_left = int(margin_px * 0.5) 
+
+        x0 = margin_left
+        y0 = H - margin_bottom - bar_h - 12 
+        x1 = x0 + bar_px
+        y1 = y0 + bar_h
+
+        draw = ImageDraw.Draw(img)
+
+        # 4 alternating segments (improves contrast on noisy backgrounds)
+        segs = 4
+        seg_w = max(1, bar_px // segs)
+        for i in range(segs):
+            sx0 = x0 + i * seg_w
+            sx1 = x0 + (i + 1) * seg_w if i < segs - 1 else x1
+            fill = (0, 0, 0) if (i % 2 == 0) else (255, 255, 255)
+            draw.rectangle([sx0, y0, sx1, y1], fill=fill)
+
+        # thin black outline
+        draw.rectangle([x0, y0, x1, y1], outline=(0, 0, 0), width=1)
+
+        # label (black text with white "halo" for legibility, still B/W)
+        label = self._format_length_label(nice_m)
+        try:
+            # default PIL font
+            font = ImageFont.load_default()
+        except Exception:
+            font = None
+        
+        tw, th = draw.textbbox((0, 0), label, font=font)[2:]
+        tx = x0
+        ty = max(0, y0 - th - 3)
+        
+        # white halo
+        for dx, dy in ((-1,0),(1,0),(0,-1),(0,1)):
+            draw.text((tx+dx, ty+dy), label, fill=(255,255,255), font=font)
+        draw.text((tx, ty), label, fill=(0,0,0), font=font)
+
+
+    def _maybe_draw_scale(self, img: Image.Image) -> None:
+        """Entry point: read params and draw the scale unless explicitly disabled."""
+        if not isinstance(self.params, dict):
+            return
+        if self.params.get('scale_bar') is False:
+            return
+        zoom = int(self.params.get('zoom', 18))
+        dpi = int(self.params.get('output_dpi', 300))
+        lat, _ = self._extract_lat_lon_from_params()
+        if lat is None:
+            return
+        self._draw_scale_bar(img, lat_deg=float(lat), zoom=zoom, output_dpi=dpi)
+
+    def download_map_tiles(self, lat, lon, zoom, width_px, height_px):
+        """Hlavní funkce pro stažení mapových dlaždic – stahuje jen dlaždice protínající výstup."""
+        try:
+            self.log.emit(f"🗺️ Parametry mapy: GPS({lat:.6f}, {lon:.6f}), zoom {zoom}, {width_px}×{height_px}px", "info")
+            
+            # Minimální okno dlaždic (bez 1.2× bufferu a vynuceného lichého gridu)
+            window = self.calculate_tile_window(lat, lon, zoom, width_px, height_px)
+            grid_width, grid_height = window['tiles_x'], window['tiles_y']
+            self.log.emit(
+                f"📐 Grid dlaždic: {grid_width}×{grid_height} "
+                f"(od dlaždice {window['left_tile']}, {window['top_tile']})", "info"
+            )
+            
+            # Výchozí režim: dlaždice se vkládají rovnou do plátna výstupní velikosti
+            if str(self.params.get('stitch_mode', 'canvas')).lower() == 'canvas':
+                final_image = self.stitch_tiles_to_canvas(window, width_px, height_px, zoom)
+                if final_image is None:
+                    self.log.emit("❌ Nepodařilo se stáhnout žádné dlaždice", "error")
+                    return None
+                self.log.emit(
+                    f"✅ Finální mapa: {final_image.size[0]}×{final_image.size[1]}px, "
+                    f"GPS: ({width_px // 2}, {height_px // 2})", "success"
+                )
+                return final_image
+            
+            # Režim 'mosaic': celá mozaika dlaždic a teprve potom výřez
+            tiles, start_x, start_y = self.download_tile_range(
+                window['left_tile'], window['top_tile'], grid_width, grid_height, zoom
+            )
+            
+            if not tiles:
+                self.log.emit("❌ Nepodařilo se stáhnout žádné dlaždice", "error")
+                return None
+            
+            self.log.emit(f"📥 Staženo {len(tiles)} dlaždic, start pozice: ({start_x}, {start_y})", "info")
+            
+            # Složení dlaždic
+            t_stitch = time.perf_counter()
+            large_image = self.stitch_tiles(tiles, grid_width, grid_height)
+            self.metrics.add_time("stitch", time.perf_counter() - t_stitch)
+            
+            if not large_image:
+                self.log.emit("❌ Nepodařilo se složit dlaždice", "error")
+                return None
+            
+            self.log.emit(f"🧩 Složený obrázek: {large_image.size[0]}×{large_image.size[1]}px", "info")
+            
+            # Přesný výřez – okno je spočítané tak, aby výstup vždy pokrylo
+            crop_left, crop_top = window['crop_left'], window['crop_top']
+            final_image = large_image.crop((crop_left, crop_top, crop_left + width_px, crop_top + height_px))
+            
+            self.log.emit(
+                f"✅ Finální mapa: {final_image.size[0]}×{final_image.size[1]}px, "
+                f"GPS: ({width_px // 2}, {height_px // 2})", "success"
+            )
+            
+            return final_image
+            
+        except Exception as e:
+            self.log.emit(f"❌ Chyba v download_map_tiles: {e}", "error")
+            import traceback
+            self.log.emit(f"❌ Traceback: {traceback.format_exc()}", "error")
+            return None
+    
+    # Nejvyšší zoom, který OSM tile server poskytuje
+    MAX_TILE_ZOOM = 19
+    # Bez výslovného limitu se detailní zoom použije, jen pokud stažení nepřesáhne tolik dlaždic
+    DETAIL_MAX_DOWNLOADS = 1024
+
+    def estimate_tile_cost(self, lat, lon, zoom, width_px, height_px, tile_zoom=None):
+        """
+        Odhad ceny výstupu složeného z dlaždic `tile_zoom` pro stejný výřez terénu
+        jako `zoom` (plátno 2^k × větší): počet dlaždic, kolik je v cache
+        (paměť / disk / lokální zdroj), kolik se stáhne a kolik to při limitu zabere.
+        """
+        tile_zoom = int(zoom if tile_zoom is None else tile_zoom)
+        scale = 2 ** max(0, tile_zoom - int(zoom))
+        base = self.calculate_tile_window(lat, lon, zoom, width_px, height_px)
+        win = self.calculate_tile_window(lat, lon, tile_zoom, width_px * scale, height_px * scale)
+        requests_list = self._tile_requests(win['left_tile'], win['top_tile'], win['tiles_x'], win['tiles_y'], tile_zoom)
+
+        source = self.get_tile_source()
+        cached = 0
+        for _key, x, y, z in requests_list:
+            if self.memory_cache.contains((source.name, int(z), int(x), int(y))) or source.is_cached(z, x, y):
+                cached += 1
+        to_download = len(requests_list) - cached
+        seconds = None
+        if source.rate_limited and self.TILE_RATE > 0:
+            seconds = max(0.0, (to_download - self.TILE_BURST) / self.TILE_RATE)
+        return {
+            'zoom': int(zoom),
+            'tile_zoom': tile_zoom,
+            'scale': scale,
+            'tiles': len(requests_list),
+            'base_tiles': base['tiles_x'] * base['tiles_y'],
+            'cached': cached,
+            'to_download': to_download,
+            'est_seconds': seconds,
+        }
+
+    def choose_tile_zoom(self, lat, lon, zoom, width_px, height_px):
+        """
+        Zoom dlaždic pro výstup: zoom + detail_zoom_offset (0–2), omezený MAX_TILE_ZOOM.
+        Před stažením zaloguje odhad ceny; pokud by se stáhlo víc než detail_max_tiles
+        dlaždic, sníží se offset (cache-aware – dlaždice v cache se nepočítají).
+        """
+        try:
+            offset = max(0, min(2, int(self.params.get('detail_zoom_offset') or 0)))
+        except (TypeError, ValueError):
+            offset = 0
+        max_zoom = max(int(zoom), int(self.params.get('max_tile_zoom', self.MAX_TILE_ZOOM)))
+        offset = min(offset, max_zoom - int(zoom))
+        if offset <= 0:
+            return int(zoom)
+
+        limit = int(self.params.get('detail_max_tiles', self.DETAIL_MAX_DOWNLOADS))
+        while offset > 0:
+            cost = self.estimate_tile_cost(lat, lon, zoom, width_px, height_px, int(zoom) + offset)
+            eta = f", ~{cost['est_seconds']:.0f} s" if cost['est_seconds'] is not None else ""
+            self.log.emit(
+                f"🔍 Detail ze zoomu {cost['tile_zoom']} (plátno {cost['scale']}×): {cost['tiles']} dlaždic "
+                f"místo {cost['base_tiles']}, v cache {cost['cached']}, ke stažení {cost['to_download']}{eta}", "info"
+            )
+            if limit <= 0 or cost['to_download'] <= limit:
+                return int(zoom) + offset
+            self.log.emit(f"⚠️ Ke stažení víc než {limit} dlaždic – snižuji detail o 1 zoom", "warning")
+            offset -= 1
+        return int(zoom)
+
+    def download_supersampled_map(self, lat, lon, zoom, tile_zoom, width_px, height_px):
+        """
+        Stejný výřez terénu jako `zoom`, ale z dlaždic `tile_zoom`: složí se plátno
+        2^k × větší a zmenší na tiskové rozlišení (LANCZOS) – ostřejší než zvětšení.
+        """
+        scale = 2 ** (int(tile_zoom) - int(zoom))
+        big = self.download_map_tiles(lat, lon, tile_zoom, width_px * scale, height_px * scale)
+        if big is None:
+            return None
+        t0 = time.perf_counter()
+        result = big.resize((width_px, height_px), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        self.metrics.add_time("downsample", time.perf_counter() - t0)
+        self.log.emit(f"✓ Převzorkováno {big.size[0]}×{big.size[1]} → {width_px}×{height_px} px", "info")
+        return result
+
+    def calculate_marker_position(self, lat, lon, zoom, width_px, height_px):
+        """Výpočet pozice GPS markeru - GPS je ve středu"""
+        return width_px // 2, height_px // 2
+    
+    # Výška pásu řádků pro skládání – omezuje velikost pracovních bufferů
+    COMPOSITE_BAND_ROWS = 256
+
+    def combine_images(self, input_image, map_image, opacity=1.0):
+        """Kombinování vstupního obrázku s mapou (mapa s průhledností `opacity` přes podklad)"""
+        try:
+            return self.composite_map_over_base(input_image, map_image, opacity)
+        except Exception as e:
+            self.log.emit(f"❌ Chyba při kombinování: {e}", "error")
+            return map_image
+
+    def composite_map_over_base(self, input_image, map_image, opacity=1.0):
+        """
+        Jeden průchod: podklad (změněný na velikost mapy) + mapa s krytím `opacity`.
+        Odpovídá putalpha + Image.alpha_composite, ale počítá se po pásech řádků
+        v předalokovaných bufferech (uint16 pro neprůhledný podklad) bez mezilehlých
+        celoplošných RGBA obrázků. Výsledek je RGB, pokud podklad ani mapa nemají
+        průhlednost, jinak RGBA.
+        """
+        W, H = map_image.size
+        A = int(round(255 * max(0.0, min(1.0, float(opacity)))))
+    
+        map_has_alpha = map_image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in map_image.info
+        # Plně krycí mapa → podklad nemá vliv
+        if A == 255 and not map_has_alpha:
+            return map_image if map_image.mode == 'RGB' else map_image.convert('RGB')
+    
+        base = input_image
+        base_has_alpha = base.mode in ('RGBA', 'LA', 'PA') or 'transparency' in base.info
+        base = base.convert('RGBA' if base_has_alpha else 'RGB') if base.mode not in ('RGB', 'RGBA') else base
+        if base.size != (W, H):
+            base = base.resize((W, H), Image.Resampling.LANCZOS)
+        map_src = map_image.convert('RGBA' if map_has_alpha else 'RGB') if map_image.mode not in ('RGB', 'RGBA') else map_image
+    
+        m_all = np.asarray(map_src)
+        b_all = np.asarray(base)
+        band = max(1, int(self.COMPOSITE_BAND_ROWS))
+    
+        if not base_has_alpha and not map_has_alpha:
+            # Neprůhledný podklad: out = (m*A + b*(255-A) + 127) // 255, celočíselně
+            out = np.empty((H, W, 3), dtype=np.uint8)
+            acc = np.empty((band, W, 3), dtype=np.uint16)
+            tmp = np.empty((band, W, 3), dtype=np.uint16)
+            for y0 in range(0, H, band):
+                y1 = min(H, y0 + band)
+                n = y1 - y0
+                a_buf, t_buf = acc[:n], tmp[:n]
+                np.multiply(m_all[y0:y1, :, :3], A, out=a_buf, dtype=np.uint16)
+                np.multiply(b_all[y0:y1, :, :3], 255 - A, out=t_buf, dtype=np.uint16)
+                a_buf += t_buf
+                a_buf += 127
+                a_buf //= 255
+                out[y0:y1] = a_buf
+            return Image.fromarray(out, 'RGB')
+    
+        # Obecný případ (průhledný podklad nebo mapa): Porter-Duff „over“ ve float32
+        out = np.empty((H, W, 4), dtype=np.uint8)
+        for y0 in range(0, H, band):
+            y1 = min(H, y0 + band)
+            m = m_all[y0:y1].astype(np.float32)
+            b = b_all[y0:y1].astype(np.float32)
+            ma = (m[..., 3:4] / 255.0 if map_has_alpha else 1.0) * (A / 255.0)
+            ba = b[..., 3:4] / 255.0 if base_has_alpha else np.ones_like(ma)
+            oa = ma + ba * (1.0 - ma)
+            safe = np.where(oa > 0, oa, 1.0)
+            rgb = (m[..., :3] * ma + b[..., :3] * ba * (1.0 - ma)) / safe
+            out[y0:y1, :, :3] = np.clip(np.rint(rgb), 0, 255)
+            out[y0:y1, :, 3:4] = np.clip(np.rint(oa * 255.0), 0, 255)
+        return Image.fromarray(out, 'RGBA')
+    
+    def get_gps_from_photo(self, photo_path):
+        """Wrapper pro get_gps_from_image - pro konzistenci názvů"""
+        return self.get_gps_from_image(photo_path)
+    
+    def validate_coordinate_mode_settings(self):
+        """Validace nastavení režimu souřadnic"""
+        coordinate_mode = self.params['coordinate_mode']
+        
+        if coordinate_mode == 'F':
+            if not self.params['photo_filename'] or not Path(self.params['photo_filename']).exists():
+                self.error.emit("Soubor fotky neexistuje nebo není zadán")
+                return False
+            self.log.emit("✓ Režim F: Souřadnice budou načteny ze souboru fotky", "info")
+        elif coordinate_mode == 'G':
+            if not self.params['manual_coordinates']:
+                self.error.emit("Pro režim G musíte zadat ruční souřadnice")
+                return False
+            self.log.emit("✓ Režim G: Použijí se ručně zadané souřadnice", "info")
+        else:
+            self.error.emit(f"Neplatný režim souřadnic: {coordinate_mode}")
+            return False
+            
+        return True
+
+    def get_coordinates_based_on_mode(self):
+        """Získání souřadnic podle zvoleného režimu"""
+        coordinate_mode = self.params['coordinate_mode']
+        
+        if coordinate_mode == 'F':
+            self.log.emit("📁 Načítám GPS souřadnice ze souboru fotky...", "info")
+            return self.get_gps_from_image(self.params['photo_filename'])
+        elif coordinate_mode == 'G':
+            self.log.emit("📍 Používám ručně zadané souřadnice...", "info")
+            return self.parse_manual_coordinates(self.params['manual_coordinates'])
+        
+        return None
+
+    def get_gps_from_image(self, image_path):
+        """Extrakce GPS souřadnic z EXIF – jen z hlaviček souboru (core.photo_metadata), bez dekódování obrázku"""
+        try:
+            self.log.emit(f"📷 Načítám GPS data z: {os.path.basename(image_path)}", "info")
+            meta = read_photo_metadata(image_path)
+            self.log.emit(f"📷 Formát obrázku: {meta.format or 'neznámý'}", "info")
+
+            if meta.gps is None:
+                self.log.emit("❌ Obrázek neobsahuje GPS data", "error")
+                return self.try_alternative_gps_extraction(None, image_path)
+
+            lat, lon = meta.gps
+            self.log.emit(f"✓ GPS souřadnice načteny ze souboru: {lat:.6f}°, {lon:.6f}°", "success")
+            return lat, lon
+
+        except Exception as e:
+            self.log.emit(f"❌ Chyba při čtení GPS dat: {e}", "error")
+            import traceback
+            self.log.emit(f"❌ Traceback: {traceback.format_exc()}", "error")
+            return None
+        
+    def try_alternative_gps_extraction(self, image, image_path):
+        """Alternativní metody pro extrakci GPS dat"""
+        try:
+            self.log.emit("🔄 Zkouším alternativní metody extrakce GPS...", "info")
+            
+            # Metoda 1: Použití exiftool (pokud je dostupný)
+            try:
+                import subprocess
+                import json
+                
+                self.log.emit("🔧 Zkouším exiftool...", "info")
+                result = subprocess.run([
+                    'exiftool', '-json', '-GPS*', str(image_path)
+                ], capture_output=True, text=True, timeout=10)
+                
+                if result.returncode == 0:
+                    data = json.loads(result.stdout)[0]
+                    
+                    # Hledání GPS dat v různých formátech
+                    lat = None
+                    lon = None
+                    
+                    # Formát 1: GPSLatitude/GPSLongitude jako čísla
+                    if 'GPSLatitude' in data and 'GPSLongitude' in data:
+                        lat = float(data['GPSLatitude'])
+                        lon = float(data['GPSLongitude'])
+                    
+                    # Formát 2: Composite GPS pozice
+                    elif 'GPSPosition' in data:
+                        pos = data['GPSPosition']
+                        # Parsování "49.23173 N, 17.42791 E" formátu
+                        import re
+                        match = re.search(r'([0-9.]+)\s*([NS]),\s*([0-9.]+)\s*([EW])', pos)
+                        if match:
+                            lat = float(match.group(1))
+                            if match.group(2) == 'S':
+                                lat = -lat
+                            lon = float(match.group(3))
+                            if match.group(4) == 'W':
+                                lon = -lon
+                    
+                    if lat is not None and lon is not None:
+                        self.log.emit(f"✅ ExifTool GPS: {lat:.6f}°, {lon:.6f}°", "success")
+                        return lat, lon
+                    else:
+                        self.log.emit("❌ ExifTool nenašel GPS data", "warning")
+                
+            except FileNotFoundError:
+                self.log.emit("⚠️ ExifTool není nainstalován", "info")
+            except Exception as e:
+                self.log.emit(f"❌ ExifTool chyba: {e}", "warning")
+            
+            # Metoda 2: Pokus o raw EXIF data
+            try:
+                self.log.emit("🔧 Zkouším raw EXIF data...", "info")
+                if hasattr(image, 'info') and 'exif' in image.info:
+                    exif_bytes = image.info['exif']
+                    self.log.emit(f"📷 Nalezena raw EXIF data: {len(exif_bytes)} bytů", "info")
+                    # Zde by bylo potřeba parsovat raw EXIF data, což je složité
+            except Exception as e:
+                self.log.emit(f"❌ Raw EXIF chyba: {e}", "warning")
+            
+            self.log.emit("❌ Všechny alternativní metody selhaly", "error")
+            return None
+            
+        except Exception as e:
+            self.log.emit(f"❌ Chyba v alternativních metodách: {e}", "error")
+            return None
+        
+    def parse_gps_coordinate_heic(self, gps_info, coord_key, ref_key):
+        """Parsování GPS souřadnice pro HEIC - upravená metoda"""
+        try:
+            from PIL.ExifTags import GPSTAGS
+            
+            self.log.emit(f"🔍 Hledám {coord_key} a {ref_key} v GPS datech", "info")
+            
+            # Najít správné klíče v GPS datech
+            coord_value = None
+            ref_value = None
+            
+            # Metoda 1: Přímé klíče (string)
+            if coord_key in gps_info:
+                coord_value = gps_info[coord_key]
+            if ref_key in gps_info:
+                ref_value = gps_info[ref_key]
+            
+            # Metoda 2: Hledání podle GPSTAGS (číselné klíče)
+            if coord_value is None or ref_value is None:
+                for tag_id, tag_name in GPSTAGS.items():
+                    if tag_name == coord_key and tag_id in gps_info:
+                        coord_value = gps_info[tag_id]
+                        self.log.emit(f"📍 Nalezen {coord_key} pod klíčem {tag_id}", "info")
+                    elif tag_name == ref_key and tag_id in gps_info:
+                        ref_value = gps_info[tag_id]
+                        self.log.emit(f"📍 Nalezen {ref_key} pod klíčem {tag_id}", "info")
+            
+            # Metoda 3: Známé číselné klíče pro GPS
+            if coord_value is None or ref_value is None:
+                gps_key_map = {
+                    'GPSLatitude': 2,
+                    'GPSLatitudeRef': 1,
+                    'GPSLongitude': 4,
+                    'GPSLongitudeRef': 3
+                }
+                
+                if coord_key in gps_key_map and gps_key_map[coord_key] in gps_info:
+                    coord_value = gps_info[gps_key_map[coord_key]]
+                    self.log.emit(f"📍 Nalezen {coord_key} pod známým klíčem {gps_key_map[coord_key]}", "info")
+                
+                if ref_key in gps_key_map and gps_key_map[ref_key] in gps_info:
+                    ref_value = gps_info[gps_key_map[ref_key]]
+                    self.log.emit(f"📍 Nalezen {ref_key} pod známým klíčem {gps_key_map[ref_key]}", "info")
+            
+            if coord_value is None or ref_value is None:
+                self.log.emit(f"❌ Nenalezeny GPS data pro {coord_key}/{ref_key}", "error")
+                self.log.emit(f"❌ coord_value: {coord_value}, ref_value: {ref_value}", "error")
+                return None
+            
+            self.log.emit(f"📍 {coord_key}: {coord_value} (typ: {type(coord_value)})", "info")
+            self.log.emit(f"📍 {ref_key}: {ref_value} (typ: {type(ref_value)})", "info")
+            
+            # Konverze na desetinné stupně
+            if isinstance(coord_value, (list, tuple)) and len(coord_value) >= 3:
+                try:
+                    degrees = float(coord_value[0])
+                    minutes = float(coord_value[1])
+                    seconds = float(coord_value[2])
+                    
+                    decimal = degrees + (minutes / 60.0) + (seconds / 3600.0)
+                    
+                    self.log.emit(f"📍 Konverze: {degrees}° {minutes}' {seconds}\" = {decimal:.6f}°", "info")
+                    
+                    # Aplikace směru
+                    if isinstance(ref_value, str) and ref_value in ['S', 'W']:
+                        decimal = -decimal
+                        self.log.emit(f"📍 Aplikován směr {ref_value}: {decimal:.6f}°", "info")
+                    
+                    return decimal
+                    
+                except (ValueError, TypeError) as e:
+                    self.log.emit(f"❌ Chyba při konverzi GPS hodnot: {e}", "error")
+                    return None
+            
+            self.log.emit(f"❌ Neplatný formát GPS souřadnice: {coord_value} (typ: {type(coord_value)})", "error")
+            return None
+            
+        except Exception as e:
+            self.log.emit(f"❌ Chyba při parsování GPS souřadnice: {e}", "error")
+            import traceback
+            self.log.emit(f"❌ Traceback: {traceback.format_exc()}", "error")
+            return None
+        
+    def parse_gps_coordinate(self, gps_info, coord_key, ref_key):
+        """Parsování GPS souřadnice - nová pomocná metoda"""
+        try:
+            from PIL.ExifTags import GPSTAGS
+            
+            # Najít správné klíče v GPS datech
+            coord_value = None
+            ref_value = None
+            
+            # Pokud je gps_info slovník s číselnými klíči (HEIC)
+            if isinstance(gps_info, dict):
+                # Hledání podle GPSTAGS
+                for tag_id, tag_name in GPSTAGS.items():
+                    if tag_name == coord_key and tag_id in gps_info:
+                        coord_value = gps_info[tag_id]
+                    elif tag_name == ref_key and tag_id in gps_info:
+                        ref_value = gps_info[tag_id]
+                
+                # Pokud nenalezeno, zkusit přímé klíče
+                if coord_value is None:
+                    coord_value = gps_info.get(coord_key)
+                if ref_value is None:
+                    ref_value = gps_info.get(ref_key)
+            
+            if coord_value is None or ref_value is None:
+                self.log.emit(f"❌ Nenalezeny GPS data pro {coord_key}/{ref_key}", "error")
+                return None
+            
+            self.log.emit(f"📍 {coord_key}: {coord_value}, {ref_key}: {ref_value}", "info")
+            
+            # Konverze na desetinné stupně
+            if isinstance(coord_value, (list, tuple)) and len(coord_value) >= 3:
+                degrees = float(coord_value[0])
+                minutes = float(coord_value[1])
+                seconds = float(coord_value[2])
+                
+                decimal = degrees + (minutes / 60.0) + (seconds / 3600.0)
+                
+                # Aplikace směru
+                if ref_value in ['S', 'W']:
+                    decimal = -decimal
+                    
+                return decimal
+            
+            self.log.emit(f"❌ Neplatný formát GPS souřadnice: {coord_value}", "error")
+            return None
+            
+        except Exception as e:
+            self.log.emit(f"❌ Chyba při parsování GPS souřadnice: {e}", "error")
+            return None
+
+    def convert_to_degrees(self, value):
+        """Konverze GPS souřadnic na desetinné stupně"""
+        if not value:
+            return None
+        
+        try:
+            d, m, s = value
+            return float(d) + float(m)/60.0 + float(s)/3600.0
+        except:
+            return None
+
+    def parse_manual_coordinates(self, coord_string):
+        """
+        Parsuje ručně zadané souřadnice ve formátu "49,23092° S, 17,65692° V"
+        Podporuje české označení: S=Sever, V=Východ, J=Jih, Z=Západ
+        Vrací tuple (latitude, longitude) v desetinných stupních nebo None
+        """
+        try:
+            # Odstranění mezer a rozdělení podle čárky mezi souřadnicemi
+            coord_string = coord_string.strip()
+            
+            # Rozdělení na dvě části - hledáme čárku, která odděluje lat a lon
+            # Použijeme regex pro přesnější rozdělení
+            coord_parts = re.split(r',\s*(?=\d)', coord_string)
+            
+            if len(coord_parts) != 2:
+                # Pokus o jiné rozdělení - hledáme pattern pro lat a lon
+                pattern = r'([0-9,\.]+°?\s*[NSJZ])\s*,?\s*([0-9,\.]+°?\s*[EWVZ])'
+                match = re.match(pattern, coord_string, re.IGNORECASE)
+                
+                if not match:
+                    self.log.emit(f"❌ Nesprávný formát souřadnic. Očekáván formát: '49,23092° S, 17,65692° V'", "error")
+                    self.log.emit(f"Zadáno: '{coord_string}'", "error")
+                    return None
+                
+                coord_parts = [match.group(1), match.group(2)]
+            
+            # Parsování zeměpisné šířky (latitude)
+            lat_part = coord_parts[0].strip()
+            # Regex pro podporu českých i anglických označení
+            lat_match = re.search(r'([0-9]+[,\.]?[0-9]*)°?\s*([NSJS])', lat_part, re.IGNORECASE)
+            
+            if not lat_match:
+                self.log.emit(f"❌ Nelze parsovat zeměpisnou šířku z: '{lat_part}'", "error")
+                self.log.emit(f"Očekávaný formát: '49,23092° S' (S=Sever, J=Jih)", "error")
+                return None
+            
+            lat_value_str = lat_match.group(1).replace(',', '.')  # Převod čárky na tečku
+            lat_value = float(lat_value_str)
+            lat_direction = lat_match.group(2).upper()
+            
+            # České označení: S=Sever (kladná), J=Jih (záporná)
+            # Anglické označení: N=North (kladná), S=South (záporná)
+            if lat_direction in ['J']:  # J = Jih (záporná)
+                lat_value = -lat_value
+            elif lat_direction in ['S']:  # S = Sever (kladná) v českém systému
+                lat_value = abs(lat_value)  # Zajistíme kladnou hodnotu
+            elif lat_direction in ['N']:  # N = North (kladná) v anglickém systému
+                lat_value = abs(lat_value)
+            # Pro anglické S (South) by byla záporná, ale v českém kontextu S=Sever
+            
+            # Parsování zeměpisné délky (longitude)
+            lon_part = coord_parts[1].strip()
+            # Regex pro podporu českých i anglických označení
+            lon_match = re.search(r'([0-9]+[,\.]?[0-9]*)°?\s*([EWVZ])', lon_part, re.IGNORECASE)
+            
+            if not lon_match:
+                self.log.emit(f"❌ Nelze parsovat zeměpisnou délku z: '{lon_part}'", "error")
+                self.log.emit(f"Očekávaný formát: '17,65692° V' (V=Východ, Z=Západ)", "error")
+                return None
+            
+            lon_value_str = lon_match.group(1).replace(',', '.')  # Převod čárky na tečku
+            lon_value = float(lon_value_str)
+            lon_direction = lon_match.group(2).upper()
+            
+            # České označení: V=Východ (kladná), Z=Západ (záporná)
+            # Anglické označení: E=East (kladná), W=West (záporná)
+            if lon_direction in ['Z', 'W']:  # Z=Západ, W=West (záporná)
+                lon_value = -lon_value
+            elif lon_direction in ['V', 'E']:  # V=Východ, E=East (kladná)
+                lon_value = abs(lon_value)  # Zajistíme kladnou hodnotu
+            
+            self.log.emit(f"✓ Souřadnice úspěšně parsovány (ruční zadání)", "success")
+            self.log.emit(f"  Zeměpisná šířka: {lat_value:.6f}° ({'J' if lat_value < 0 else 'S'})", "info")
+            self.log.emit(f"  Zeměpisná délka: {lon_value:.6f}° ({'Z' if lon_value < 0 else 'V'})", "info")
+            
+            return lat_value, lon_value
+            
+        except Exception as e:
+            self.log.emit(f"❌ Chyba při parsování souřadnic: {e}", "error")
+            self.log.emit(f"Očekávaný formát: '49,23092° S, 17,65692° V'", "error")
+            self.log.emit(f"České označení: S=Sever, V=Východ, J=Jih, Z=Západ", "info")
+            self.log.emit(f"Zadáno: '{coord_string}'", "error")
+            return None
+        
+    def calculate_pixel_dimensions(self):
+        """Výpočet rozměrů v pixelech"""
+        width_cm = self.params['output_width_cm']
+        height_cm = self.params['output_height_cm']
+        dpi = self.params['output_dpi']
+        
+        # Konverze cm na palce (1 palec = 2.54 cm)
+        width_inches = width_cm / 2.54
+        height_inches = height_cm / 2.54
+        
+        # Výpočet pixelů
+        width_pixels = int(width_inches * dpi)
+        height_pixels = int(height_inches * dpi)
+        
+        return width_pixels, height_pixels
+
+    def generate_id(self):
+        """Generování ID"""
+        if self.params['auto_generate_id']:
+            # Automatické generování na základě času
+            from datetime import datetime
+            return datetime.now().strftime("%Y%m%d_%H%M%S")
+        else:
+            return self.params['manual_cislo_id']
+
+    def generate_output_filename_with_gps_and_zoom(self, id_lokace, popis, lat, lon, zoom, cislo_id):
+        """Generování názvu výstupního souboru s + jako oddělovači"""
+        # Formátování GPS souřadnic
+        lat_formatted = f"{abs(lat):.5f}{'S' if lat >= 0 else 'J'}"
+        lon_formatted = f"{abs(lon):.5f}{'V' if lon >= 0 else 'Z'}"
+        
+        # OPRAVENO: použití + jako oddělovače místo _
+        filename = f"{id_lokace}+{popis}+GPS{lat_formatted}+{lon_formatted}+Z{zoom}+{cislo_id}.png"
+        
+        # Sanitizace názvu souboru (zachování + jako validního znaku)
+        filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+        
+        return filename
+
+    def calculate_tile_grid(self, target_width, target_height):
+        """Výpočet gridu dlaždic (původní varianta s 1.2× bufferem a lichým počtem)"""
+        return legacy_grid_size(target_width, target_height, self.TILE_SIZE)
+
+    def calculate_tile_window(self, lat, lon, zoom, width_px, height_px):
+        """Minimální rozsah dlaždic protínající výstupní obdélník (viz core.tile_math.tile_window)."""
+        return tile_window(lat, lon, zoom, width_px, height_px, self.TILE_SIZE)
+
+    def lat_lon_to_tile_int(self, lat, lon, zoom):
+        """Převod GPS souřadnic na čísla dlaždic"""
+        lat_rad = math.radians(lat)
+        n = 2.0 ** zoom
+        
+        x = int((lon + 180.0) / 360.0 * n)
+        y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+        
+        return x, y
+
+    def download_tile_grid(self, center_x, center_y, grid_width, grid_height):
+        """Stažení gridu dlaždic se středem v (center_x, center_y)."""
+        start_x = center_x - grid_width // 2
+        start_y = center_y - grid_height // 2
+        return self.download_tile_range(start_x, start_y, grid_width, grid_height, self.params['zoom'])
+
+    def _tile_requests(self, start_x, start_y, grid_width, grid_height, zoom):
+        """Seznam požadavků [(dx, dy), x, y, z] s wrapem x a bez řádků mimo svět."""
+        n = 2 ** int(zoom)
+        return [
+            ((dx, dy), (start_x + dx) % n, start_y + dy, zoom)
+            for dy in range(grid_height)
+            for dx in range(grid_width)
+            if 0 <= start_y + dy < n
+        ]
+
+    def _make_tile_fetcher(self):
+        def _on_progress(done, total):
+            self.progress.emit(30 + int((done / total) * 40))  # 30-70%
+        
+        return TileFetcher(
+            self.get_tile_image,
+            max_workers=self.TILE_WORKERS,
+            should_stop=lambda: self.should_stop,
+            on_progress=_on_progress,
+        )
+
+    def stitch_tiles_to_canvas(self, window, width_px, height_px, zoom):
+        """
+        Skládání přímo do plátna výstupní velikosti: z každé dlaždice se vloží jen
+        viditelný podobdélník hned po jejím stažení, bez mezimozaiky grid×256 px.
+        Špička paměti ≈ výstup + dlaždice rozpracované ve workerech.
+        """
+        try:
+            ts = self.TILE_SIZE
+            canvas = Image.new('RGB', (width_px, height_px), color='white')
+            crop_left, crop_top = window['crop_left'], window['crop_top']
+            requests_list = self._tile_requests(
+                window['left_tile'], window['top_tile'], window['tiles_x'], window['tiles_y'], zoom
+            )
+            self.log.emit(
+                f"🧩 Skládám {len(requests_list)} dlaždic přímo do plátna {width_px}×{height_px} px "
+                f"({self.TILE_WORKERS} workerů, limit {self.TILE_RATE:g} req/s)", "info"
+            )
+            
+            pasted = 0
+            
+            def _paste(key, tile_image):
+                nonlocal pasted
+                t_paste = time.perf_counter()
+                dx, dy = key
+                if tile_image.size != (ts, ts):
+                    tile_image = tile_image.resize((ts, ts), Image.Resampling.LANCZOS)
+                # Poloha dlaždice v plátně a její viditelná část
+                ox = dx * ts - crop_left
+                oy = dy * ts - crop_top
+                sx0, sy0 = max(0, -ox), max(0, -oy)
+                sx1, sy1 = min(ts, width_px - ox), min(ts, height_px - oy)
+                if sx1 <= sx0 or sy1 <= sy0:
+                    return
+                canvas.paste(tile_image.crop((sx0, sy0, sx1, sy1)), (ox + sx0, oy + sy0))
+                pasted += 1
+                self.metrics.add_time("stitch", time.perf_counter() - t_paste)
+            
+            result = self._make_tile_fetcher().fetch(requests_list, on_tile=_paste)
+            if result is None or pasted == 0:
+                return None
+            
+            self.log.emit(f"✓ Vloženo {pasted}/{len(requests_list)} dlaždic", "success")
+            return canvas
+        
+        except Exception as e:
+            self.log.emit(f"❌ Chyba při skládání do plátna: {e}", "error")
+            import traceback
+            self.log.emit(f"❌ Traceback: {traceback.format_exc()}", "error")
+            return None
+
+    def download_tile_range(self, start_x, start_y, grid_width, grid_height, zoom):
+        """
+        Stažení obdélníku dlaždic – souběžně, s limitem požadavků na tile server.
+        Klíče výsledku jsou relativní pozice (dx, dy); x se přes antimeridián
+        zalamuje, dlaždice mimo rozsah y se přeskočí (zůstanou bílé).
+        """
+        total_tiles = grid_width * grid_height
+        requests_list = self._tile_requests(start_x, start_y, grid_width, grid_height, zoom)
+        
+        self.log.emit(
+            f"📥 Stahování {len(requests_list)} dlaždic ({self.TILE_WORKERS} workerů, "
+            f"limit {self.TILE_RATE:g} req/s)...", "info"
+        )
+        
+        fetcher = self._make_tile_fetcher()
+        tiles = fetcher.fetch(requests_list)
+        if tiles is None:
+            return None, None, None
+        
+        self.log.emit(f"✓ Staženo {len(tiles)}/{total_tiles} dlaždic", "success")
+        return tiles, start_x, start_y
+
+    def get_tile_image(self, x, y, z):
+        """
+        Dekódovaná dlaždice (RGB PIL.Image) přes paměťovou LRU; při miss se stáhne
+        (disková cache / síť) a dekóduje jen jednou za běh aplikace.
+        """
+        t0 = time.perf_counter()
+        key = (self.get_tile_source().name, int(z), int(x), int(y))
+        img = self.memory_cache.get(key)
+        if img is not None:
+            self.metrics.record_origin(ORIGIN_MEMORY)
+            self.metrics.record_tile(time.perf_counter() - t0)
+            return img
+        try:
+            data = self.download_tile(x, y, z)
+            if not data:
+                return None
+            t_decode = time.perf_counter()
+            img = decode_tile(data)
+            self.metrics.add_time("decode", time.perf_counter() - t_decode)
+            if img is None:
+                self.log.emit(f"⚠️ Nelze dekódovat dlaždici {x},{y}", "warning")
+                return None
+            self.memory_cache.put(key, img)
+            return img
+        finally:
+            self.metrics.record_tile(time.perf_counter() - t0)
+
+    def get_tile_source(self):
+        """Zdroj dlaždic dle parametrů (HTTP / MBTiles / složka) – vytváří se při prvním použití."""
+        if self.tile_source is None:
+            params = dict(self.params)
+            params['tile_url_template'] = params.get('tile_url_template') or self.TILE_URL_TEMPLATE
+            source = create_tile_source(params, http_pool=self.http_pool, disk_cache=self.tile_cache)
+            # Sdílený token-bucket hostu jen pro síťové požadavky; lokální zdroje (MBTiles, složka) bez omezení
+            if source.rate_limited and self.TILE_RATE > 0:
+                source.limiter = get_host_limiter(source.limiter_key, self.TILE_RATE, self.TILE_BURST)
+            self.tile_source = source
+        return self.tile_source
+
+    def download_tile(self, x, y, z, retries=1):
+        """Surová data dlaždice z vybraného zdroje (HTTP s diskovou cache, MBTiles, složka)."""
+        return self.get_tile_source().get_tile(z, x, y, log=self.log.emit, retries=retries, metrics=self.metrics)
+
+    def stitch_tiles(self, tiles, grid_width, grid_height):
+        """Složení dlaždic do jednoho obrázku - OPRAVENÁ VERZE"""
+        if not tiles:
+            self.log.emit("❌ Žádné dlaždice k složení", "error")
+            return None
+        
+        try:
+            # Vytvoření velkého obrázku
+            total_width = grid_width * self.TILE_SIZE
+            total_height = grid_height * self.TILE_SIZE
+            
+            self.log.emit(f"🧩 Skládám dlaždice: {grid_width}×{grid_height} = {total_width}×{total_height} px", "info")
+            
+            large_image = Image.new('RGB', (total_width, total_height), color='white')
+            
+            successful_tiles = 0
+            
+            for (dx, dy), tile_data in tiles.items():
+                try:
+                    # Kontrola pozice
+                    if dx >= grid_width or dy >= grid_height:
+                        self.log.emit(f"⚠️ Dlaždice mimo grid: ({dx},{dy})", "warning")
+                        continue
+                    
+                    # Konverze tile_data na PIL Image
+                    if isinstance(tile_data, bytes):
+                        tile_image = Image.open(BytesIO(tile_data))
+                    elif isinstance(tile_data, Image.Image):
+                        tile_image = tile_data
+                    else:
+                        self.log.emit(f"⚠️ Neplatný typ dlaždice: {type(tile_data)}", "warning")
+                        continue
+                    
+                    # Kontrola velikosti dlaždice
+                    if tile_image.size != (self.TILE_SIZE, self.TILE_SIZE):
+                        self.log.emit(f"⚠️ Nesprávná velikost dlaždice: {tile_image.size}, očekáváno: ({self.TILE_SIZE}, {self.TILE_SIZE})", "warning")
+                        tile_image = tile_image.resize((self.TILE_SIZE, self.TILE_SIZE), Image.Resampling.LANCZOS)
+                    
+                    # Výpočet pozice
+                    x_pos = dx * self.TILE_SIZE
+                    y_pos = dy * self.TILE_SIZE
+                    
+                    # Kontrola, že pozice je v rámci obrázku
+                    if x_pos + self.TILE_SIZE <= total_width and y_pos + self.TILE_SIZE <= total_height:
+                        # OPRAVENO: Použití 4-item box tuple
+                        paste_box = (x_pos, y_pos, x_pos + self.TILE_SIZE, y_pos + self.TILE_SIZE)
+                        large_image.paste(tile_image, paste_box[:2])  # Pouze x,y pozice pro paste
+                        successful_tiles += 1
+                    else:
+                        self.log.emit(f"⚠️ Dlaždice mimo hranice: pozice ({x_pos},{y_pos})", "warning")
+                        
+                except Exception as e:
+                    self.log.emit(f"❌ Chyba při vkládání dlaždice ({dx},{dy}): {e}", "error")
+                    continue
+            
+            self.log.emit(f"✅ Úspěšně složeno {successful_tiles}/{len(tiles)} dlaždic", "success")
+            
+            if successful_tiles == 0:
+                self.log.emit("❌ Žádné dlaždice nebyly úspěšně složeny", "error")
+                return None
+            
+            return large_image
+            
+        except Exception as e:
+            self.log.emit(f"❌ Kritická chyba při skládání dlaždic: {e}", "error")
+            import traceback
+            self.log.emit(f"❌ Traceback: {traceback.format_exc()}", "error")
+            return None
+
+    def calculate_gps_position_in_grid(self, lat, lon, zoom, grid_start_x, grid_start_y):
+        """Výpočet pozice GPS v gridu"""
+        # Převod na přesné souřadnice dlaždice
+        lat_rad = math.radians(lat)
+        n = 2.0 ** zoom
+        
+        tile_x_float = (lon + 180.0) / 360.0 * n
+        tile_y_float = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
+        
+        # Pozice v gridu
+        relative_x = tile_x_float - grid_start_x
+        relative_y = tile_y_float - grid_start_y
+        
+        # Převod na pixely
+        pixel_x = int(relative_x * self.TILE_SIZE)
+        pixel_y = int(relative_y * self.TILE_SIZE)
+        
+        return pixel_x, pixel_y
+
+    # def draw_location_marker(self, image, x, y):
+    #     """
+    #     Kreslí GPS značku do finálního obrázku podle parametrů:
+    #     - params['marker_style']: 'dot' (puntík) nebo 'cross' (křížek)
+    #     - params['marker_size']: velikost značky v pixelech (poloměr pro puntík, půlrameno pro křížek)
+    #     """
+    #     try:
+    #         draw = ImageDraw.Draw(image)
+    #         ms = max(2, int(self.params.get('marker_size', 10)))
+    #         style = str(self.params.get('marker_style', 'dot')).lower()
+    
+    #         if style == 'cross':
+    #             th = max(2, ms // 3)  # tloušťka čar úměrná velikosti
+    #             draw.line([(x - ms, y), (x + ms, y)], fill='black', width=th)
+    #             draw.line([(x, y - ms), (x, y + ms)], fill='black', width=th)
+    #         else:
+    #             # Puntík s bílým okrajem kvůli čitelnosti
+    #             draw.ellipse([x - ms, y - ms, x + ms, y + ms],
+    #                          fill='black', outline='white', width=max(2, ms // 5))
+    #         return image
+    #     except Exception as e:
+    #         # Při chybě fallback na původní puntík
+    #         try:
+    #             r = max(2, int(self.params.get('marker_size', 10)))
+    #             draw = ImageDraw.Draw(image)
+    #             draw.ellipse([x - r, y - r, x + r, y + r], fill='black', outline='white', width=max(2, r // 5))
+    #         except Exception:
+    #             pass
+    #         self.log.emit(f"⚠️ Chyba při kreslení značky: {e}", "warning")
+    #         return image
+    
+    def draw_central_marker(self, image):
+        """
+        Vykreslí pouze centrální GPS značku do obrázku lokační mapy.
+        Žádné texty se zde již nekreslí.
+        """
+        from PIL import ImageDraw
+    
+        W, H = image.size
+        center_x, center_y = W // 2, H // 2
+    
+        draw = ImageDraw.Draw(image)
+    
+        # Parametry značky z nastavení
+        marker_size = int(self.params.get('marker_size', 10))
+        marker_style = self.params.get('marker_style', 'dot')
+    
+        if marker_style == 'cross':
+            # Křížek s tloušťkou úměrnou velikosti
+            thickness = max(2, marker_size // 4)
+            draw.line([(center_x - marker_size, center_y), (center_x + marker_size, center_y)], fill="black", width=thickness)  # ✅ ČERNÁ
+            draw.line([(center_x, center_y - marker_size), (center_x, center_y + marker_size)], fill="black", width=thickness)  # ✅ ČERNÁ
+        else: # 'dot'
+            # Puntík s bílým okrajem pro lepší viditelnost
+            radius = marker_size // 2
+            draw.ellipse(
+                (center_x - radius, center_y - radius, center_x + radius, center_y + radius),
+                fill='black',  # ✅ ČERNÁ
+                outline='white',
+                width=max(1, radius // 4)
+            )
+    
+        return image
+
+
+    def crop_centered_image(self, image, center_x, center_y, target_width, target_height):
+        """Oříznutí obrázku na cílovou velikost - OPRAVENÁ VERZE"""
+        try:
+            img_width, img_height = image.size
+            
+            self.log.emit(f"✂️ Ořezávám obrázek: {img_width}×{img_height} → {target_width}×{target_height}", "info")
+            self.log.emit(f"✂️ Střed GPS: ({center_x}, {center_y})", "info")
+            
+            # Výpočet ořezových souřadnic se středem na GPS pozici
+            half_target_width = target_width // 2
+            half_target_height = target_height // 2
+            
+            left = max(0, center_x - half_target_width)
+            top = max(0, center_y - half_target_height)
+            right = min(img_width, center_x + half_target_width)
+            bottom = min(img_height, center_y + half_target_height)
+            
+            # Úprava pokud je požadovaná oblast větší než dostupný obrázek
+            if right - left < target_width:
+                if left == 0:
+                    right = min(img_width, left + target_width)
+                elif right == img_width:
+                    left = max(0, right - target_width)
+            
+            if bottom - top < target_height:
+                if top == 0:
+                    bottom = min(img_height, top + target_height)
+                elif bottom == img_height:
+                    top = max(0, bottom - target_height)
+            
+            # Zajištění platných souřadnic
+            left = max(0, min(left, img_width - 1))
+            top = max(0, min(top, img_height - 1))
+            right = max(left + 1, min(right, img_width))
+            bottom = max(top + 1, min(bottom, img_height))
+            
+            self.log.emit(f"✂️ Ořezové souřadnice: ({left}, {top}, {right}, {bottom})", "info")
+            
+            # OPRAVENO: Použití 4-item box tuple
+            crop_box = (int(left), int(top), int(right), int(bottom))
+            
+            # Kontrola validity crop_box
+            if crop_box[2] <= crop_box[0] or crop_box[3] <= crop_box[1]:
+                self.log.emit(f"❌ Neplatný crop box: {crop_box}", "error")
+                return None, center_x, center_y
+            
+            cropped = image.crop(crop_box)
+            
+            # Výpočet nové pozice GPS v oříznutém obrázku
+            new_gps_x = center_x - left
+            new_gps_y = center_y - top
+            
+            cropped_width, cropped_height = cropped.size
+            self.log.emit(f"✂️ Oříznutý obrázek: {cropped_width}×{cropped_height}", "info")
+            
+            # Pokud je oříznutý obrázek menší než cíl, doplnění bílou barvou
+            if cropped_width != target_width or cropped_height != target_height:
+                self.log.emit(f"📐 Doplňuji na cílovou velikost: {target_width}×{target_height}", "info")
+                
+                final_image = Image.new('RGB', (target_width, target_height), 'white')
+                
+                # Centrování oříznutého obrázku
+                paste_x = (target_width - cropped_width) // 2
+                paste_y = (target_height - cropped_height) // 2
+                
+                final_image.paste(cropped, (paste_x, paste_y))
+                
+                # Úprava GPS pozice
+                new_gps_x += paste_x
+                new_gps_y += paste_y
+                
+                self.log.emit(f"✅ Finální obrázek: {target_width}×{target_height}, GPS: ({new_gps_x}, {new_gps_y})", "success")
+                
+                return final_image, new_gps_x, new_gps_y
+            
+            self.log.emit(f"✅ Oříznutí dokončeno, GPS: ({new_gps_x}, {new_gps_y})", "success")
+            return cropped, new_gps_x, new_gps_y
+            
+        except Exception as e:
+            self.log.emit(f"❌ Chyba při ořezávání: {e}", "error")
+            import traceback
+            self.log.emit(f"❌ Traceback: {traceback.format_exc()}", "error")
+            return None, center_x, center_y
+
+    def apply_transparency_to_image_precise(self, image, opacity):
+        """Aplikace transparentnosti na obrázek"""
+        if opacity >= 1.0:
+            return image
+            
+        # Konverze na RGBA
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+        
+        # Aplikace transparentnosti
+        alpha = image.split()[-1]
+        alpha = alpha.point(lambda p: int(p * opacity))
+        
+        image.putalpha(alpha)
+        return image
+
+    def add_watermark_text(self, image, text, size_mm, dpi):
+        """Přidání textového vodoznaku"""
+        try:
+            from PIL import ImageFont
+            
+            # Výpočet velikosti fontu v pixelech
+            size_inches = size_mm / 25.4  # mm na palce
+            font_size = int(size_inches * dpi)
+            
+            # Pokus o načtení systémového fontu
+            try:
+                font = ImageFont.truetype("Arial.ttf", font_size)
+            except:
+                try:
+                    font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", font_size)
+                except:
+                    font = ImageFont.load_default()
+            
+            # Vytvoření kopie obrázku
+            watermarked = image.copy()
+            draw = ImageDraw.Draw(watermarked)
+            
+            # Pozice vodoznaku (pravý dolní roh)
+            text_bbox = draw.textbbox((0, 0), text, font=font)
+            text_width = text_bbox[2] - text_bbox[0]
+            text_height = text_bbox[3] - text_bbox[1]
+            
+            margin = 10
+            x = watermarked.width - text_width - margin
+            y = watermarked.height - text_height - margin
+            
+            # Nakreslení textu s obrysem
+            for adj_x in [-1, 0, 1]:
+                for adj_y in [-1, 0, 1]:
+                    if adj_x != 0 or adj_y != 0:
+                        draw.text((x + adj_x, y + adj_y), text, font=font, fill='white')
+            
+            draw.text((x, y), text, font=font, fill='black')
+            
+            return watermarked
+            
+        except Exception as e:
+            self.log.emit(f"⚠️ Chyba při přidávání vodoznaku: {e}", "warning")
+            return image
+
+    def create_output_path(self, filename):
+        """Vytvoření cesty k výstupnímu souboru"""
+        output_dir = Path(self.params['output_directory'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        output_path = output_dir / filename
+        
+        # Pokud soubor existuje, přidání čísla
+        counter = 1
+        original_path = output_path
+        while output_path.exists():
+            stem = original_path.stem
+            suffix = original_path.suffix
+            output_path = output_dir / f"{stem}_{counter:03d}{suffix}"
+            counter += 1
+            
+        return output_path
+    
+    def find_next_auto_id(self, output_directory, id_lokace):
+        """
+        Najde nejvyšší číslo ID v existujících souborech a vrátí další v pořadí
+        Hledá pattern: *+Z*+XXXXX.png kde XXXXX je 5-místné číslo
+        """
+        try:
+            output_path = Path(output_directory)
+            if not output_path.exists():
+                self.log.emit("📁 Výstupní složka neexistuje, začínám s ID 00001", "info")
+                return "00001"
+            
+            # Hledání všech výstupů (PNG + WebP/JPEG z ztrátových profilů)
+            png_files = [f for ext in ("*.png", "*.webp", "*.jpg") for f in output_path.glob(ext)]
+            
+            if not png_files:
+                self.log.emit("📁 Ve výstupní složce nejsou žádné PNG soubory, začínám s ID 00001", "info")
+                return "00001"
+            
+            max_id = 0
+            found_files = []
+            
+            # Regex pattern pro hledání ID na konci názvu souboru
+            # Pattern: cokoliv+Z[číslo]+[5-místné_číslo].png
+            import re
+            pattern = r'.*\+Z\d+\+(\d{5})\.(?:png|webp|jpg)'
+            
+            for file_path in png_files:
+                filename = file_path.name
+                match = re.search(pattern, filename)
+                
+                if match:
+                    file_id = int(match.group(1))
+                    found_files.append((filename, file_id))
+                    if file_id > max_id:
+                        max_id = file_id
+            
+            # Logování nalezených souborů
+            if found_files:
+                self.log.emit(f"🔍 Nalezeno {len(found_files)} souborů s ID:", "info")
+                # Seřazení podle ID pro lepší přehled
+                found_files.sort(key=lambda x: x[1])
+                for filename, file_id in found_files[-5:]:  # Zobrazit posledních 5
+                    self.log.emit(f"  • {filename} (ID: {file_id:05d})", "info")
+                if len(found_files) > 5:
+                    self.log.emit(f"  ... a {len(found_files) - 5} dalších", "info")
+            
+            next_id = max_id + 1
+            next_id_str = f"{next_id:05d}"
+            
+            self.log.emit(f"✅ Nejvyšší nalezené ID: {max_id:05d}", "success")
+            self.log.emit(f"🆕 Nové automatické ID: {next_id_str}", "success")
+            
+            return next_id_str
+            
+        except Exception as e:
+            self.log.emit(f"❌ Chyba při hledání automatického ID: {e}", "error")
+            self.log.emit("🔄 Používám výchozí ID: 00001", "warning")
+            return "00001"
+    
+    def generate_cislo_id(self):
+        """Generování čísla ID podle nastavení"""
+        if self.params.get('auto_generate_id', True):
+            # Automatické generování
+            output_dir = self.params.get('output_directory', './output')
+            id_lokace = self.params.get('id_lokace', '')
+            return self.find_next_auto_id(output_dir, id_lokace)
+        else:
+            # Ruční zadání
+            manual_id = self.params.get('manual_cislo_id', '00001')
+            # Zajištění 5-místného formátu
+            try:
+                id_num = int(manual_id)
+                return f"{id_num:05d}"
+            except ValueError:
+                self.log.emit(f"⚠️ Neplatné ruční ID '{manual_id}', používám 00001", "warning")
+                return "00001"
+
+    def save_image_with_gps_metadata(self, image, output_path, lat, lon, coordinate_mode, dpi, additional_metadata=None):
+        """Uložení obrázku s GPS metadaty"""
+        # Příprava PNG info
+        pnginfo = PngInfo()
+        
+        # Základní metadata
+        pnginfo.add_text("GPS_Latitude", f"{lat:.8f}")
+        pnginfo.add_text("GPS_Longitude", f"{lon:.8f}")
+        pnginfo.add_text("GPS_Source", coordinate_mode)
+        pnginfo.add_text("Creation_Date", time.strftime("%Y-%m-%d %H:%M:%S"))
+        pnginfo.add_text("Generator", f"{self.params['app_name']} v2.0")
+        pnginfo.add_text("Contact", self.params['contact_email'])
+        
+        # Dodatečná metadata
+        if additional_metadata:
+            for key, value in additional_metadata.items():
+                pnginfo.add_text(key, str(value))
+        
+        # Uložení
+        image.save(output_path, "PNG", dpi=(dpi, dpi), pnginfo=pnginfo)
+        
+        self.log.emit(f"💾 Soubor uložen: {output_path}", "success")
+
+    def print_osm_attribution(self):
+        """Výpis informací o OpenStreetMap"""
+        self.log.emit("", "info")
+        self.log.emit("=" * 60, "info")
+        self.log.emit("🗺️  OPENSTREETMAP ATTRIBUTION", "info")
+        self.log.emit("=" * 60, "info")
+        self.log.emit("© OpenStreetMap contributors", "info")
+        self.log.emit("Data jsou dostupná pod Open Database License", "info")
+        self.log.emit("Více informací: https://www.openstreetmap.org/copyright", "info")
+        self.log.emit("", "info")
+        self.log.emit("Dlaždice poskytuje OpenStreetMap Foundation", "info")
+        self.log.emit("Tile usage policy: https://operations.osmfoundation.org/policies/tiles/", "info")
+        self.log.emit("=" * 60, "info")
\ No newline at end of file
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Profily ukládání vygenerovaných map.
+
+  png          – standardní PNG (zlib úroveň 6, dosavadní chování)
+  png_fast     – rychlé PNG (úroveň 1) – výrazně kratší ukládání velkých tisků
+  png_archival – archivní PNG (úroveň 9) – nejmenší soubor, nejpomalejší
+  webp         – ztrátové WebP pro náhledy
+  jpeg         – ztrátové JPEG pro náhledy
+
+Metadata (GPS, AOI, ID …) se nesou vždy ve formátu, který kodek podporuje:
+PNG → tEXt/iTXt, WebP/JPEG → EXIF (GPS IFD + ImageDescription s JSON
+všech textových klíčů) a u WebP navíc XMP se stejnými klíči.
+"""
+
+import json
+import os
+import unicodedata
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+DEFAULT_PROFILE = "png"
+
+ENCODER_PROFILES = {
+    "png":          {"format": "PNG",  "ext": ".png",  "label": "PNG (standardní)",        "options": {"compress_level": 6}},
+    "png_fast":     {"format": "PNG",  "ext": ".png",  "label": "PNG rychlé (úroveň 1)",   "options": {"compress_level": 1}},
+    "png_archival": {"format": "PNG",  "ext": ".png",  "label": "PNG archivní (úroveň 9)", "options": {"compress_level": 9}},
+    "webp":         {"format": "WEBP", "ext": ".webp", "label": "WebP (náhled, ztrátové)", "options": {"quality": 85, "method": 4}},
+    "jpeg":         {"format": "JPEG", "ext": ".jpg",  "label": "JPEG (náhled, ztrátové)", "options": {"quality": 88, "optimize": False, "progressive": False}},
+}
+
+_EXIF_IMAGE_DESCRIPTION = 0x010E
+_EXIF_SOFTWARE = 0x0131
+_EXIF_GPS_IFD = 0x8825
+
+
+def get_profile(name):
+    """Profil podle jména; neznámé jméno → výchozí PNG."""
+    return ENCODER_PROFILES.get(str(name or DEFAULT_PROFILE).lower(), ENCODER_PROFILES[DEFAULT_PROFILE])
+
+
+def png_profile(name):
+    """Jméno PNG profilu pro soubory, které musí zůstat PNG (ztrátové profily → výchozí PNG)."""
+    name = str(name or DEFAULT_PROFILE).lower()
+    return name if get_profile(name)["format"] == "PNG" and name in ENCODER_PROFILES else DEFAULT_PROFILE
+
+
+def png_save_options(name):
+    """Volby PIL pro PNG uložení podle profilu (pro dopisování metadat do existujících PNG)."""
+    return dict(ENCODER_PROFILES[png_profile(name)]["options"])
+
+
+def output_path_for(path, name):
+    """Cesta s příponou odpovídající profilu."""
+    return Path(path).with_suffix(get_profile(name)["ext"])
+
+
+def _is_latin1_printable(s):
+    try:
+        s.encode("latin-1")
+    except UnicodeEncodeError:
+        return False
+    return 0 < len(s) <= 79 and not any(ord(c) < 32 or ord(c) == 127 for c in s)
+
+
+def _png_info(text_meta):
+    info = PngInfo()
+    for k, v in text_meta.items():
+        k, v = str(k), "" if v is None else str(v)
+        if _is_latin1_printable(k):
+            info.add_text(k, v)  # hodnoty mimo latin-1 PIL uloží jako iTXt
+    return info
+
+
+def _to_dms(value):
+    value = abs(float(value))
+    deg = int(value)
+    minutes_f = (value - deg) * 60.0
+    minutes = int(minutes_f)
+    seconds = round((minutes_f - minutes) * 60.0, 4)
+    return (deg, minutes, seconds)
+
+
+def _exif_bytes(text_meta, lat=None, lon=None):
+    exif = Image.Exif()
+    exif[_EXIF_IMAGE_DESCRIPTION] = json.dumps(text_meta, ensure_ascii=True)
+    if text_meta.get("Generator"):
+        exif[_EXIF_SOFTWARE] = str(text_meta["Generator"]).encode("ascii", "replace").decode("ascii")
+    if lat is not None and lon is not None:
+        exif[_EXIF_GPS_IFD] = {
+            0: b"\x02\x03\x00\x00",
+            1: "N" if lat >= 0 else "S",
+            2: _to_dms(lat),
+            3: "E" if lon >= 0 else "W",
+            4: _to_dms(lon),
+        }
+        try:
+            return exif.tobytes()
+        except Exception:
+            # Starší PIL neumí zapsat GPS IFD ze slovníku → GPS zůstane jen v JSON popisu
+            del exif[_EXIF_GPS_IFD]
+    return exif.tobytes()
+
+
+def _xmp_bytes(text_meta):
+    items = "".join(
+        f'<ctl:{_xmp_name(k)}>{escape(str(v))}</ctl:{_xmp_name(k)}>' for k, v in text_meta.items()
+    )
+    return (
+        '<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>'
+        '<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+        '<rdf:Description rdf:about="" xmlns:ctl="https://ctyrlistkoteka.cz/ns/map/1.0/">'
+        f'{items}</rdf:Description></rdf:RDF></x:xmpmeta><?xpacket end="w"?>'
+    ).encode("utf-8")
+
+
+def _xmp_name(key):
+    ascii_key = "".join(ch for ch in unicodedata.normalize("NFKD", str(key)) if not unicodedata.combining(ch))
+    name = "".join(ch if ch.isalnum() or ch in "_-." else "_" for ch in ascii_key)
+    return name if name and (name[0].isalpha() or name[0] == "_") else f"_{name}"
+
+
+def save_image(image, path, profile=DEFAULT_PROFILE, text_meta=None, dpi=None, lat=None, lon=None, atomic=False):
+    """
+    Uloží obrázek podle profilu a vrátí skutečnou cestu (přípona dle formátu).
+    text_meta = dict textových metadat (u PNG jako tEXt/iTXt).
+    lat/lon se u WebP/JPEG zapíší i do standardního EXIF GPS IFD.
+    atomic=True → zápis přes dočasný soubor + os.replace.
+    """
+    prof = get_profile(profile)
+    fmt = prof["format"]
+    out = output_path_for(path, profile)
+    text_meta = dict(text_meta or {})
+    kwargs = dict(prof["options"])
+    if dpi:
+        kwargs["dpi"] = (int(dpi), int(dpi)) if not isinstance(dpi, (tuple, list)) else tuple(dpi)
+
+    img = image
+    if fmt == "PNG":
+        kwargs["pnginfo"] = _png_info(text_meta)
+    else:
+        kwargs["exif"] = _exif_bytes(text_meta, lat, lon)
+        if fmt == "WEBP":
+            kwargs["xmp"] = _xmp_bytes(text_meta)
+            kwargs.pop("dpi", None)  # WebP nemá DPI
+        if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+            if img.mode in ("RGBA", "LA", "PA"):
+                bg = Image.new("RGB", img.size, (255, 255, 255))
+                bg.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+                img = bg
+            else:
+                img = img.convert("RGB")
+
+    target = out.with_name(out.stem + ".tmp" + out.suffix) if atomic else out
+    img.save(target, fmt, **kwargs)
+    if atomic:
+        os.replace(target, out)
+    return out
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Perzistentní index metadat fotek čtyřlístků (SQLite, bez Qt).
+
+Pro každý soubor ve složce s fotkami drží: ID z názvu ('NNNNN+…'), GPS,
+čas pořízení (EXIF DateTimeOriginal), rozměry a orientaci. Záznam platí,
+dokud se nezmění velikost a mtime souboru – první otevření složky ji projde
+celou (core.photo_metadata, jen hlavičky), další otevření stojí jen os.stat.
+
+  index = get_photo_index()
+  index.refresh(folder)          – synchronní přírůstková aktualizace
+  index.refresh_async(folder)    – totéž na pozadí (sloučí souběžné požadavky)
+  index.wait(folder)             – spustí / připojí se k aktualizaci na pozadí a počká na ni
+  index.records(folder)          – [PhotoRecord, …] seřazené podle názvu
+  index.by_id(folder)            – {ID: PhotoRecord} (první soubor podle názvu)
+  index.all_by_id(folder)        – {ID: [PhotoRecord, …]} (všechny soubory s týmž ID)
+  index.get(path)                – jeden soubor (stat + případné načtení)
+
+Dotazy na složku vracejí stav poslední aktualizace (refresh=False). Studená
+aktualizace čte hlavičky všech fotek – u ~15 000 souborů desítky sekund –,
+proto ji spouští GUI na pozadí (refresh_async) a spotřebitelé, kteří potřebují
+úplná data, na ni čekají přes wait() mimo GUI vlákno.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from core.photo_metadata import read_photo_metadata
+
+DEFAULT_DB_PATH = Path.home() / ".cache" / "ctyrlistky" / "photo_index.sqlite"
+PHOTO_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.heif', '.tiff', '.tif', '.bmp'}
+
+_PHOTO_ID_RE = re.compile(r'(\d+)\+', re.ASCII)  # jen ASCII číslice ('²' apod. int() neumí)
+
+_SCHEMA_VERSION = 1
+_COLUMNS = ("path", "folder", "name", "size", "mtime_ns", "photo_id",
+            "lat", "lon", "taken", "width", "height", "orientation", "format")
+
+
+def parse_photo_id(name):
+    """ID nálezu z názvu 'NNNNN+…'; None, pokud název tomuto tvaru neodpovídá."""
+    m = _PHOTO_ID_RE.match(str(name))
+    return int(m.group(1)) if m else None
+
+
+@dataclass(frozen=True)
+class PhotoRecord:
+    path: str
+    name: str
+    size: int
+    mtime_ns: int
+    photo_id: Optional[int] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    taken: Optional[str] = None           # 'YYYY:MM:DD HH:MM:SS' z EXIF
+    width: Optional[int] = None
+    height: Optional[int] = None
+    orientation: Optional[int] = None
+    format: Optional[str] = None
+
+    @property
+    def gps(self) -> Optional[Tuple[float, float]]:
+        if self.lat is None or self.lon is None:
+            return None
+        return (self.lat, self.lon)
+
+    @property
+    def taken_datetime(self):
+        """Čas pořízení jako datetime (nebo None)."""
+        from datetime import datetime
+        if not self.taken:
+            return None
+        for fmt in ("%Y:%m:%d %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S"):
+            try:
+                return datetime.strptime(self.taken[:19], fmt)
+            except ValueError:
+                continue
+        return None
+
+
+def _folder_key(folder):
+    return os.path.normcase(os.path.abspath(str(folder)))
+
+
+def _record_from_row(row):
+    data = dict(zip(_COLUMNS, row))
+    data.pop("folder", None)
+    return PhotoRecord(**data)
+
+
+def _build_record(path, name, st):
+    meta = read_photo_metadata(path)
+    return PhotoRecord(
+        path=str(path), name=name, size=int(st.st_size), mtime_ns=int(st.st_mtime_ns),
+        photo_id=parse_photo_id(name), lat=meta.lat, lon=meta.lon,
+        taken=meta.datetime_original, width=meta.width, height=meta.height,
+        orientation=meta.orientation, format=meta.format,
+    )
+
+
+class PhotoIndex:
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._folder_locks = {}
+        self._async = {}
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != _SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS photos")
+            self.conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS photos (path TEXT PRIMARY KEY, folder TEXT NOT NULL, "
+            "name TEXT NOT NULL, size INTEGER, mtime_ns INTEGER, photo_id INTEGER, lat REAL, lon REAL, "
+            "taken TEXT, width INTEGER, height INTEGER, orientation INTEGER, format TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS photos_folder ON photos (folder, photo_id)")
+        self.conn.commit()
+
+    def _folder_lock(self, key):
+        with self._lock:
+            lock = self._folder_locks.get(key)
+            if lock is None:
+                lock = self._folder_locks[key] = threading.Lock()
+            return lock
+
+    def _store(self, folder_key, records):
+        if not records:
+            return
+        with self._lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO photos ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [(r.path, folder_key, r.name, r.size, r.mtime_ns, r.photo_id, r.lat, r.lon,
+                  r.taken, r.width, r.height, r.orientation, r.format) for r in records],
+            )
+            self.conn.commit()
+
+    # --- aktualizace -----------------------------------------------------
+
+    def refresh(self, folder, should_stop=None, batch=64):
+        """
+        Přírůstková aktualizace složky (nerekurzivně): nové / změněné soubory
+        (velikost, mtime) se načtou, smazané se z indexu odeberou.
+        Vrací {'scanned', 'updated', 'removed'}.
+        """
+        folder = os.path.abspath(str(folder))
+        key = _folder_key(folder)
+        stats = {"scanned": 0, "updated": 0, "removed": 0}
+        if not os.path.isdir(folder):
+            return stats
+        with self._folder_lock(key):
+            with self._lock:
+                known = {
+                    path: (size, mtime)
+                    for path, size, mtime in self.conn.execute(
+                        "SELECT path, size, mtime_ns FROM photos WHERE folder = ?", (key,))
+                }
+            seen, pending = set(), []
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if should_stop and should_stop():
+                        break
+                    if os.path.splitext(entry.name)[1].lower() not in PHOTO_EXTENSIONS:
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    stats["scanned"] += 1
+                    seen.add(entry.path)
+                    if known.get(entry.path) == (int(st.st_size), int(st.st_mtime_ns)):
+                        continue
+                    pending.append(_build_record(entry.path, entry.name, st))
+                    if len(pending) >= batch:
+                        self._store(key, pending)
+                        stats["updated"] += len(pending)
+                        pending = []
+                else:
+                    gone = [p for p in known if p not in seen]
+                    if gone:
+                        with self._lock:
+                            self.conn.executemany("DELETE FROM photos WHERE path = ?", [(p,) for p in gone])
+                            self.conn.commit()
+                        stats["removed"] = len(gone)
+            self._store(key, pending)
+            stats["updated"] += len(pending)
+        return stats
+
+    def refresh_async(self, folder, on_done=None):
+        """refresh() ve vlákně na pozadí; běžící aktualizace téže složky se nespouští znovu."""
+        key = _folder_key(folder)
+        with self._lock:
+            thread = self._async.get(key)
+            if thread is not None and thread.is_alive():
+                return thread
+
+            def _run():
+                try:
+                    stats = self.refresh(folder)
+                except Exception:
+                    stats = None
+                if on_done:
+                    try:
+                        on_done(folder, stats)
+                    except Exception:
+                        pass
+
+            thread = threading.Thread(target=_run, name="photo-index-refresh", daemon=True)
+            self._async[key] = thread
+            thread.start()
+            return thread
+
+    def wait(self, folder, timeout=None):
+        """
+        Počká na aktualizaci složky na pozadí (běžící se nespouští znovu, jinak se spustí).
+        Vrací True, pokud doběhla do timeout. Blokuje – nevolat z GUI vlákna.
+        """
+        thread = self.refresh_async(folder)
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    # --- dotazy ----------------------------------------------------------
+
+    def records(self, folder, refresh=False):
+        """Záznamy složky seřazené podle názvu (refresh=True → nejdřív synchronní refresh())."""
+        if refresh:
+            self.refresh(folder)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM photos WHERE folder = ? ORDER BY name",
+                (_folder_key(folder),),
+            ).fetchall()
+        return [_record_from_row(r) for r in rows]
+
+    def all_by_id(self, folder, refresh=False, extensions=None):
+        """{ID nálezu: [PhotoRecord, …]} – všechny soubory s týmž ID seřazené podle názvu."""
+        out = {}
+        for rec in self.records(folder, refresh=refresh):
+            if rec.photo_id is None:
+                continue
+            if extensions and os.path.splitext(rec.name)[1].lower() not in extensions:
+                continue
+            out.setdefault(rec.photo_id, []).append(rec)
+        return out
+
+    def by_id(self, folder, refresh=False, extensions=None):
+        """{ID nálezu: PhotoRecord}; při více souborech s týmž ID vyhrává první podle názvu."""
+        return {k: v[0] for k, v in self.all_by_id(folder, refresh, extensions).items()}
+
+    def get(self, path):
+        """Záznam jednoho souboru (i mimo indexovanou složku); None, pokud soubor nejde přečíst."""
+        path = os.path.abspath(str(path))
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM photos WHERE path = ?", (path,)
+            ).fetchone()
+        if row is not None:
+            rec = _record_from_row(row)
+            if (rec.size, rec.mtime_ns) == (int(st.st_size), int(st.st_mtime_ns)):
+                return rec
+        rec = _build_record(path, os.path.basename(path), st)
+        self._store(_folder_key(os.path.dirname(path)), [rec])
+        return rec
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_photo_index(db_path=DEFAULT_DB_PATH):
+    """Sdílená instance indexu pro daný soubor databáze (jedna na proces)."""
+    key = str(Path(db_path).expanduser().resolve())
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = PhotoIndex(db_path)
+            _INDEXES[key] = index
+        return index
@@ -0,0 +1,659 @@
+# -*- coding: utf-8 -*-
+"""
+Čtení EXIF/GPS metadat fotek jen z hlaviček kontejneru – bez dekódování pixelů.
+
+Podporované kontejnery:
+  JPEG  – segment APP1 „Exif“ + rozměry ze SOFn (čte se jen do SOS)
+  HEIC  – ISO BMFF: meta → iinf (položka 'Exif'), iloc (umístění), pitm/ipma/ispe (rozměry)
+  PNG   – chunk eXIf + IHDR (čte se jen do IDAT)
+  WebP  – RIFF chunky EXIF + VP8X/VP8/VP8L
+Ostatní formáty (TIFF …) nebo neobvyklá struktura → fallback přes Pillow
+(pillow-heif se registruje jednou za proces, Image.open čte jen hlavičku).
+
+read_photo_metadata(path) -> PhotoMetadata (lat, lon, datetime_original,
+orientation, width, height); read_gps(path) -> (lat, lon) | None.
+replace_heif_exif(path, exif) vymění EXIF položku HEIC bez překódování obrazu.
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+HEIF_EXTENSIONS = {".heic", ".heif", ".hif", ".avif"}
+
+_MAX_META_BOX = 16 * 1024 * 1024   # rozumný strop pro box 'meta' (obvykle desítky kB)
+_MAX_EXIF = 4 * 1024 * 1024
+
+# TIFF / EXIF tagy
+_TAG_IMAGE_WIDTH = 0x0100
+_TAG_IMAGE_LENGTH = 0x0101
+_TAG_ORIENTATION = 0x0112
+_TAG_DATETIME = 0x0132
+_TAG_EXIF_IFD = 0x8769
+_TAG_GPS_IFD = 0x8825
+_TAG_DATETIME_ORIGINAL = 0x9003
+_TAG_DATETIME_DIGITIZED = 0x9004
+_TAG_PIXEL_X = 0xA002
+_TAG_PIXEL_Y = 0xA003
+
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+
+@dataclass(frozen=True)
+class PhotoMetadata:
+    path: str
+    format: Optional[str] = None          # 'JPEG' | 'HEIF' | 'PNG' | 'WEBP' | formát z Pillow
+    width: Optional[int] = None
+    height: Optional[int] = None
+    orientation: Optional[int] = None     # EXIF Orientation 1–8
+    datetime_original: Optional[str] = None  # 'YYYY:MM:DD HH:MM:SS' (DateTimeOriginal → Digitized → DateTime)
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+    @property
+    def gps(self) -> Optional[Tuple[float, float]]:
+        if self.lat is None or self.lon is None:
+            return None
+        return (self.lat, self.lon)
+
+
+# --- TIFF (EXIF) ----------------------------------------------------------
+
+def _read_ifd(buf, offset, endian):
+    """IFD na offsetu → {tag: hodnota}. Hodnoty: int, str, tuple racionálů (num, den) …"""
+    out = {}
+    if offset <= 0 or offset + 2 > len(buf):
+        return out
+    (count,) = struct.unpack_from(endian + "H", buf, offset)
+    pos = offset + 2
+    for _ in range(min(count, 512)):
+        if pos + 12 > len(buf):
+            break
+        tag, typ, n, raw = struct.unpack_from(endian + "HHI4s", buf, pos)
+        pos += 12
+        size = _TYPE_SIZES.get(typ)
+        if size is None or n == 0:
+            continue
+        total = size * n
+        if total <= 4:
+            data = raw[:total]
+        else:
+            (voff,) = struct.unpack(endian + "I", raw)
+            if voff + total > len(buf):
+                continue
+            data = buf[voff:voff + total]
+        try:
+            if typ == 2:
+                out[tag] = data.split(b"\x00", 1)[0].decode("ascii", "replace").strip()
+            elif typ in (1, 6, 7):
+                out[tag] = data if typ == 7 else tuple(data)
+            elif typ in (3, 8):
+                out[tag] = struct.unpack(endian + ("H" if typ == 3 else "h") * n, data)
+            elif typ in (4, 9):
+                out[tag] = struct.unpack(endian + ("I" if typ == 4 else "i") * n, data)
+            elif typ in (5, 10):
+                vals = struct.unpack(endian + ("I" if typ == 5 else "i") * (2 * n), data)
+                out[tag] = tuple((vals[i], vals[i + 1]) for i in range(0, len(vals), 2))
+        except struct.error:
+            continue
+    return out
+
+
+def _first(value):
+    if isinstance(value, (tuple, list)):
+        return value[0] if value else None
+    return value
+
+
+def _rational(value):
+    num, den = value
+    return float(num) / float(den) if den else 0.0
+
+
+def _dms_to_deg(dms, ref):
+    if not dms or len(dms) < 3:
+        return None
+    try:
+        deg = _rational(dms[0]) + _rational(dms[1]) / 60.0 + _rational(dms[2]) / 3600.0
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    if isinstance(ref, (bytes, bytearray)):
+        ref = ref.decode("ascii", "ignore")
+    if str(ref or "").strip().upper()[:1] in ("S", "W"):
+        deg = -deg
+    return deg
+
+
+def parse_exif(buf):
+    """
+    Raw EXIF (TIFF hlavička, případně s prefixem 'Exif\\0\\0') → dict:
+    orientation, datetime_original, lat, lon, width, height (co se najde).
+    """
+    if not buf:
+        return {}
+    buf = bytes(buf)
+    if buf.startswith(b"Exif\x00\x00"):
+        buf = buf[6:]
+    if buf[:2] == b"II":
+        endian = "<"
+    elif buf[:2] == b"MM":
+        endian = ">"
+    else:
+        return {}
+    try:
+        magic, ifd0_off = struct.unpack_from(endian + "HI", buf, 2)
+    except struct.error:
+        return {}
+    if magic != 42:
+        return {}
+
+    ifd0 = _read_ifd(buf, ifd0_off, endian)
+    exif_ifd = _read_ifd(buf, _first(ifd0.get(_TAG_EXIF_IFD)) or 0, endian)
+    gps_ifd = _read_ifd(buf, _first(ifd0.get(_TAG_GPS_IFD)) or 0, endian)
+
+    out = {}
+    orientation = _first(ifd0.get(_TAG_ORIENTATION))
+    if isinstance(orientation, int) and 1 <= orientation <= 8:
+        out["orientation"] = orientation
+    for src, tag in ((exif_ifd, _TAG_DATETIME_ORIGINAL), (exif_ifd, _TAG_DATETIME_DIGITIZED), (ifd0, _TAG_DATETIME)):
+        value = src.get(tag)
+        if isinstance(value, str) and value.strip("0: "):
+            out["datetime_original"] = value
+            break
+    w = _first(exif_ifd.get(_TAG_PIXEL_X)) or _first(ifd0.get(_TAG_IMAGE_WIDTH))
+    h = _first(exif_ifd.get(_TAG_PIXEL_Y)) or _first(ifd0.get(_TAG_IMAGE_LENGTH))
+    if isinstance(w, int) and isinstance(h, int) and w > 0 and h > 0:
+        out["width"], out["height"] = w, h
+
+    lat = _dms_to_deg(gps_ifd.get(2), gps_ifd.get(1))
+    lon = _dms_to_deg(gps_ifd.get(4), gps_ifd.get(3))
+    if lat is not None and lon is not None and abs(lat) <= 90.0 and abs(lon) <= 180.0:
+        out["lat"], out["lon"] = lat, lon
+    return out
+
+
+# --- JPEG -----------------------------------------------------------------
+
+def _read_jpeg(f):
+    exif, dims = None, None
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        b = f.read(1)
+        if not b:
+            break
+        if b != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            break
+        m = marker[0]
+        if m in (0x01, 0xD8) or 0xD0 <= m <= 0xD7:
+            continue
+        if m in (0xD9, 0xDA):  # EOI / SOS – dál už jsou jen obrazová data
+            break
+        raw_len = f.read(2)
+        if len(raw_len) < 2:
+            break
+        (seg_len,) = struct.unpack(">H", raw_len)
+        if seg_len < 2:
+            break
+        if m == 0xE1 and exif is None and seg_len - 2 <= _MAX_EXIF:
+            data = f.read(seg_len - 2)
+            if data.startswith(b"Exif\x00\x00"):
+                exif = data[6:]
+            continue
+        if 0xC0 <= m <= 0xCF and m not in (0xC4, 0xC8, 0xCC):
+            data = f.read(seg_len - 2)
+            if len(data) >= 5:
+                h, w = struct.unpack_from(">HH", data, 1)
+                dims = (w, h)
+            continue
+        f.seek(seg_len - 2, 1)
+    return {"format": "JPEG", "exif": exif, "dims": dims}
+
+
+# --- PNG ------------------------------------------------------------------
+
+def _read_png(f):
+    if f.read(8) != b"\x89PNG\r\n\x1a\n":
+        return None
+    exif, dims = None, None
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            break
+        length, ctype = struct.unpack(">I4s", head)
+        if ctype == b"IDAT" or ctype == b"IEND":
+            break
+        if ctype == b"IHDR":
+            data = f.read(length)
+            if len(data) >= 8:
+                dims = struct.unpack_from(">II", data, 0)
+            f.seek(4, 1)
+        elif ctype == b"eXIf" and length <= _MAX_EXIF:
+            exif = f.read(length)
+            f.seek(4, 1)
+        else:
+            f.seek(length + 4, 1)
+    return {"format": "PNG", "exif": exif, "dims": dims}
+
+
+# --- WebP -----------------------------------------------------------------
+
+def _read_webp(f):
+    head = f.read(12)
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+        return None
+    exif, dims = None, None
+    while True:
+        ch = f.read(8)
+        if len(ch) < 8:
+            break
+        ctype, size = struct.unpack("<4sI", ch)
+        padded = size + (size & 1)
+        if ctype == b"VP8X" and size >= 10:
+            data = f.read(padded)
+            w = int.from_bytes(data[4:7], "little") + 1
+            h = int.from_bytes(data[7:10], "little") + 1
+            dims = (w, h)
+        elif ctype == b"VP8 " and dims is None and size >= 10:
+            data = f.read(padded)
+            w, h = struct.unpack_from("<HH", data, 6)
+            dims = (w & 0x3FFF, h & 0x3FFF)
+        elif ctype == b"VP8L" and dims is None and size >= 5:
+            data = f.read(padded)
+            bits = int.from_bytes(data[1:5], "little")
+            dims = ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+        elif ctype == b"EXIF" and size <= _MAX_EXIF:
+            exif = f.read(padded)[:size]
+        else:
+            f.seek(padded, 1)
+    return {"format": "WEBP", "exif": exif, "dims": dims}
+
+
+# --- HEIF / HEIC (ISO BMFF) ----------------------------------------------
+
+def _iter_boxes(buf, start, end):
+    """(typ, začátek obsahu, konec boxu) pro boxy v buf[start:end]."""
+    pos = start
+    while pos + 8 <= end:
+        size, btype = struct.unpack_from(">I4s", buf, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            (size,) = struct.unpack_from(">Q", buf, pos + 8)
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield btype, pos + header, pos + size
+        pos += size
+
+
+def _uint(buf, pos, nbytes):
+    if nbytes == 0:
+        return 0, pos
+    return int.from_bytes(buf[pos:pos + nbytes], "big"), pos + nbytes
+
+
+def _parse_iloc(buf, start, end, fields=None):
+    """
+    item_ID → (construction_method, [(offset, délka), …]).
+    fields (dict) se navíc naplní item_ID → (base, offset_size, length_size,
+    [(pozice pole offsetu, pozice pole délky), …]) pro zápis na místě.
+    """
+    version = buf[start]
+    pos = start + 4
+    offset_size, length_size = buf[pos] >> 4, buf[pos] & 0x0F
+    base_offset_size = buf[pos + 1] >> 4
+    index_size = (buf[pos + 1] & 0x0F) if version in (1, 2) else 0
+    pos += 2
+    count, pos = _uint(buf, pos, 2 if version < 2 else 4)
+    items = {}
+    for _ in range(count):
+        if pos >= end:
+            break
+        item_id, pos = _uint(buf, pos, 2 if version < 2 else 4)
+        method = 0
+        if version in (1, 2):
+            cm, pos = _uint(buf, pos, 2)
+            method = cm & 0x0F
+        pos += 2  # data_reference_index
+        base, pos = _uint(buf, pos, base_offset_size)
+        extent_count, pos = _uint(buf, pos, 2)
+        extents, positions = [], []
+        for _e in range(extent_count):
+            if index_size:
+                _idx, pos = _uint(buf, pos, index_size)
+            positions.append((pos, pos + offset_size))
+            off, pos = _uint(buf, pos, offset_size)
+            length, pos = _uint(buf, pos, length_size)
+            extents.append((base + off, length))
+        items[item_id] = (method, extents)
+        if fields is not None:
+            fields[item_id] = (base, offset_size, length_size, positions)
+    return items
+
+
+def _parse_iinf(buf, start, end):
+    """item_ID → item_type (4cc) z boxů 'infe' verze ≥ 2."""
+    version = buf[start]
+    pos = start + 4 + (2 if version == 0 else 4)
+    types = {}
+    for btype, cstart, cend in _iter_boxes(buf, pos, end):
+        if btype != b"infe":
+            continue
+        iv = buf[cstart]
+        if iv < 2:
+            continue
+        p = cstart + 4
+        item_id, p = _uint(buf, p, 2 if iv == 2 else 4)
+        p += 2  # item_protection_index
+        types[item_id] = buf[p:p + 4]
+    return types
+
+
+def _parse_iprp(buf, start, end):
+    """Rozměry položek: ipco (seznam vlastností) + ipma (přiřazení) → {item_ID: (w, h)}."""
+    props, assoc = [], {}
+    for btype, cstart, cend in _iter_boxes(buf, start, end):
+        if btype == b"ipco":
+            for ptype, pstart, pend in _iter_boxes(buf, cstart, cend):
+                if ptype == b"ispe" and pend - pstart >= 12:
+                    props.append(struct.unpack_from(">II", buf, pstart + 4))
+                else:
+                    props.append(None)
+        elif btype == b"ipma":
+            version = buf[cstart]
+            flags = int.from_bytes(buf[cstart + 1:cstart + 4], "big")
+            p = cstart + 4
+            count, p = _uint(buf, p, 4)
+            for _ in range(count):
+                if p >= cend:
+                    break
+                item_id, p = _uint(buf, p, 2 if version < 1 else 4)
+                n = buf[p]
+                p += 1
+                idxs = []
+                for _a in range(n):
+                    if flags & 1:
+                        v, p = _uint(buf, p, 2)
+                        idxs.append(v & 0x7FFF)
+                    else:
+                        v, p = _uint(buf, p, 1)
+                        idxs.append(v & 0x7F)
+                assoc[item_id] = idxs
+    dims = {}
+    for item_id, idxs in assoc.items():
+        for i in idxs:
+            if 1 <= i <= len(props) and props[i - 1]:
+                dims[item_id] = props[i - 1]
+                break
+    return dims
+
+
+def _top_level_boxes(f):
+    """(typ, pozice, velikost v hlavičce) boxů nejvyšší úrovně; velikost 0 = do konce souboru."""
+    file_size = f.seek(0, 2)
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        head = f.read(16)
+        size, btype = struct.unpack_from(">I4s", head, 0)
+        yield btype, pos, size
+        if size == 1 and len(head) >= 16:
+            (size,) = struct.unpack_from(">Q", head, 8)
+        if size < 8:
+            return
+        pos += size
+
+
+def _find_meta_box(f):
+    """(pozice obsahu boxu 'meta' v souboru, obsah) pro ISO BMFF, jinak None."""
+    f.seek(0, 2)
+    file_size = f.tell()
+    f.seek(0)
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        head = f.read(16)
+        if len(head) < 8:
+            break
+        size, btype = struct.unpack_from(">I4s", head, 0)
+        header = 8
+        if size == 1 and len(head) >= 16:
+            (size,) = struct.unpack_from(">Q", head, 8)
+            header = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header:
+            break
+        if pos == 0 and btype != b"ftyp":
+            return None
+        if btype == b"meta":
+            if size - header > _MAX_META_BOX:
+                return None
+            f.seek(pos + header)
+            return pos + header, f.read(size - header)
+        pos += size
+    return None
+
+
+def _read_heif(f):
+    found = _find_meta_box(f)
+    if found is None or len(found[1]) < 4:
+        return None
+    meta = found[1]
+
+    primary, iloc, types, dims, idat = None, {}, {}, {}, None
+    for btype, cstart, cend in _iter_boxes(meta, 4, len(meta)):  # meta je FullBox
+        if btype == b"pitm":
+            primary, _ = _uint(meta, cstart + 4, 2 if meta[cstart] == 0 else 4)
+        elif btype == b"iloc":
+            iloc = _parse_iloc(meta, cstart, cend)
+        elif btype == b"iinf":
+            types = _parse_iinf(meta, cstart, cend)
+        elif btype == b"iprp":
+            dims = _parse_iprp(meta, cstart, cend)
+        elif btype == b"idat":
+            idat = meta[cstart:cend]
+
+    exif = None
+    for item_id, itype in types.items():
+        if itype != b"Exif" or item_id not in iloc:
+            continue
+        method, extents = iloc[item_id]
+        chunks = []
+        for off, length in extents:
+            if length > _MAX_EXIF:
+                break
+            if method == 1 and idat is not None:
+                chunks.append(idat[off:off + length])
+            elif method == 0:
+                f.seek(off)
+                chunks.append(f.read(length))
+        payload = b"".join(chunks)
+        if len(payload) >= 4:
+            (tiff_off,) = struct.unpack_from(">I", payload, 0)
+            exif = payload[4 + tiff_off:] if 4 + tiff_off < len(payload) else payload[4:]
+        break
+
+    size = dims.get(primary) if primary is not None else None
+    if size is None and dims:
+        size = max(dims.values(), key=lambda wh: wh[0] * wh[1])
+    return {"format": "HEIF", "exif": exif, "dims": size}
+
+
+def replace_heif_exif(path, exif):
+    """
+    Nahradí EXIF položku HEIC/HEIF bez překódování obrazu.
+
+    Soubor se zkopíruje bajt po bajtu, nový payload se připojí na konec ve vlastním
+    boxu 'mdat' a v 'iloc' se na místě přepíše offset a délka extentu položky 'Exif'
+    (velikost boxu 'meta' se nemění). Původní EXIF zůstane v souboru jako nepoužitá data.
+    Nahrazení je atomické (dočasný soubor ve stejné složce + os.replace).
+
+    exif – výstup piexif.dump() ('Exif\\0\\0' + TIFF) nebo holé TIFF.
+    Vrací False, když to struktura neumožní (chybí položka 'Exif', leží v 'idat',
+    má víc extentů, offset se nevejde do pole) – volající pak soubor uloží jinak.
+    """
+    path = str(path)
+    tiff = exif[6:] if exif[:6] == b"Exif\0\0" else bytes(exif)
+    payload = struct.pack(">I", 0) + tiff  # exif_tiff_header_offset = 0
+    try:
+        with open(path, "rb") as f:
+            found = _find_meta_box(f)
+            open_ended = any(size == 0 for _t, _p, size in _top_level_boxes(f))
+            file_size = f.seek(0, 2)
+    except OSError:
+        return False
+    if found is None or len(found[1]) < 4 or open_ended:
+        return False
+    meta_pos, meta = found
+
+    iloc, fields, types = {}, {}, {}
+    try:
+        for btype, cstart, cend in _iter_boxes(meta, 4, len(meta)):
+            if btype == b"iloc":
+                iloc = _parse_iloc(meta, cstart, cend, fields)
+            elif btype == b"iinf":
+                types = _parse_iinf(meta, cstart, cend)
+    except (struct.error, IndexError):
+        return False
+    exif_ids = [i for i, t in types.items() if t == b"Exif" and i in fields]
+    if len(exif_ids) != 1:
+        return False
+    method = iloc[exif_ids[0]][0]
+    base, offset_size, length_size, positions = fields[exif_ids[0]]
+    if method != 0 or len(positions) != 1 or not offset_size or not length_size:
+        return False
+    new_offset = file_size + 8 - base
+    if new_offset < 0 or new_offset >> (8 * offset_size) or len(payload) >> (8 * length_size):
+        return False
+    off_pos, len_pos = positions[0]
+
+    target_dir = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=target_dir)
+    os.close(fd)
+    try:
+        shutil.copyfile(path, tmp)
+        with open(tmp, "r+b") as out:
+            out.seek(meta_pos + off_pos)
+            out.write(new_offset.to_bytes(offset_size, "big"))
+            out.seek(meta_pos + len_pos)
+            out.write(len(payload).to_bytes(length_size, "big"))
+            out.seek(file_size)
+            out.write(struct.pack(">I4s", 8 + len(payload), b"mdat") + payload)
+        try:
+            shutil.copymode(path, tmp)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+# --- Pillow fallback --------------------------------------------------------
+
+_heif_lock = threading.Lock()
+_heif_registered = None
+
+
+def _ensure_heif_opener():
+    """Registrace pillow-heif jen jednou za proces."""
+    global _heif_registered
+    with _heif_lock:
+        if _heif_registered is None:
+            try:
+                import pillow_heif
+                pillow_heif.register_heif_opener()
+                _heif_registered = True
+            except Exception:
+                _heif_registered = False
+        return _heif_registered
+
+
+def _read_via_pillow(path):
+    from PIL import Image
+    if Path(path).suffix.lower() in HEIF_EXTENSIONS:
+        _ensure_heif_opener()
+    with Image.open(path) as im:  # otevře jen hlavičku, pixely se nedekódují
+        exif = im.info.get("exif")
+        if not exif:
+            try:
+                exif = im.getexif().tobytes()
+            except Exception:
+                exif = None
+        return {"format": im.format, "exif": exif, "dims": im.size}
+
+
+_READERS = (_read_jpeg, _read_heif, _read_png, _read_webp)
+
+
+def read_photo_metadata(path, use_pillow_fallback=True):
+    """
+    Metadata fotky z hlaviček kontejneru. Nikdy nevyhazuje výjimku – nečitelný
+    soubor vrátí PhotoMetadata jen s cestou.
+    """
+    path = str(path)
+    info = None
+    try:
+        with open(path, "rb") as f:
+            for reader in _READERS:
+                f.seek(0)
+                try:
+                    info = reader(f)
+                except (struct.error, IndexError, ValueError, OSError):
+                    info = None
+                if info is not None:
+                    break
+    except OSError:
+        return PhotoMetadata(path=path)
+
+    parsed = parse_exif(info.get("exif")) if info else {}
+    if use_pillow_fallback and (info is None or (info.get("exif") is None and info.get("format") == "HEIF")):
+        try:
+            info = _read_via_pillow(path)
+            parsed = parse_exif(info.get("exif"))
+        except Exception:
+            pass
+    if info is None:
+        return PhotoMetadata(path=path)
+
+    dims = info.get("dims") or (parsed.get("width"), parsed.get("height"))
+    return PhotoMetadata(
+        path=path,
+        format=info.get("format"),
+        width=int(dims[0]) if dims and dims[0] else None,
+        height=int(dims[1]) if dims and dims[1] else None,
+        orientation=parsed.get("orientation"),
+        datetime_original=parsed.get("datetime_original"),
+        lat=parsed.get("lat"),
+        lon=parsed.get("lon"),
+    )
+
+
+def read_gps(path):
+    """(lat, lon) v desetinných stupních, nebo None."""
+    return read_photo_metadata(path).gps
+
+
+def read_gps_and_time(path):
+    """((lat, lon) | None, 'YYYY:MM:DD HH:MM:SS' | None) – náhrada dřívějšího extract_gps_and_time."""
+    meta = read_photo_metadata(path)
+    return meta.gps, meta.datetime_original
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Čtení a zápis textových metadat PNG po chunkách – bez Pillow a bez dekódování obrazu.
+
+Projde signaturu a chunky tEXt / zTXt / iTXt až k prvnímu IDAT (obrazová data
+se vůbec nenačtou). Dekódování odpovídá PngImagePlugin v Pillow, takže
+read_png_text() vrací totéž co Image.open(...).text pro metadata zapsaná
+před IDAT (tak je ukládá Pillow i tato aplikace):
+  tEXt – klíč i hodnota latin-1 (hodnota s 'replace'), chybějící \\0 → prázdná hodnota
+  zTXt – jen metoda 0 (zlib), chyba dekomprese → prázdná hodnota
+  iTXt – UTF-8, komprimovaný jen metodou 0; neplatný chunk se přeskočí
+Chybné CRC nebo typ chunku → ValueError (Pillow v takové situaci soubor neotevře).
+
+update_png_text() metadata přepíše bez překódování: všechny ostatní chunky
+(IDAT, pHYs, iCCP, …) se zkopírují bajt po bajtu, vymění se jen textové chunky
+a soubor se nahradí atomicky (dočasný soubor ve stejné složce + os.replace).
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+TEXT_CHUNKS = (b"tEXt", b"zTXt", b"iTXt")
+MAX_TEXT_CHUNK = 1024 * 1024  # jako ImageFile.SAFEBLOCK / PngImagePlugin.MAX_TEXT_CHUNK
+
+
+def _is_chunk_type(ctype):
+    return len(ctype) == 4 and all(65 <= c <= 90 or 97 <= c <= 122 for c in ctype)
+
+
+def iter_chunks(fp, stop_at=(b"IDAT",)):
+    """
+    (typ, data) pro chunky od IHDR do prvního chunku z stop_at (ten už se nečte)
+    nebo IEND. fp musí stát na začátku souboru.
+    """
+    if fp.read(8) != PNG_SIGNATURE:
+        raise ValueError("Není PNG soubor")
+    while True:
+        head = fp.read(8)
+        if len(head) < 8:
+            return
+        length, ctype = struct.unpack(">I4s", head)
+        if not _is_chunk_type(ctype):
+            raise ValueError(f"Poškozené PNG (chunk {ctype!r})")
+        if ctype in stop_at:
+            return
+        data = fp.read(length)
+        crc = fp.read(4)
+        if len(data) < length or len(crc) < 4:
+            raise ValueError(f"Zkrácené PNG (chunk {ctype!r})")
+        if zlib.crc32(data, zlib.crc32(ctype)) & 0xFFFFFFFF != struct.unpack(">I", crc)[0]:
+            raise ValueError(f"Poškozené PNG (chybné CRC v {ctype!r})")
+        yield ctype, data
+        if ctype == b"IEND":
+            return
+
+
+def _safe_decompress(data):
+    dobj = zlib.decompressobj()
+    out = dobj.decompress(data, MAX_TEXT_CHUNK)
+    if dobj.unconsumed_tail:
+        raise ValueError("Dekomprimovaný text je příliš velký")
+    return out
+
+
+def decode_text_chunk(ctype, data):
+    """(klíč, hodnota) z chunku tEXt / zTXt / iTXt, nebo None (chunk Pillow ignoruje)."""
+    if ctype == b"tEXt":
+        key, sep, value = data.partition(b"\0")
+        if not key:
+            return None
+        return key.decode("latin-1", "strict"), value.decode("latin-1", "replace")
+
+    if ctype == b"zTXt":
+        key, sep, value = data.partition(b"\0")
+        method = value[0] if value else 0
+        if method != 0:
+            return None
+        try:
+            value = _safe_decompress(value[1:])
+        except (ValueError, zlib.error):
+            value = b""
+        if not key:
+            return None
+        return key.decode("latin-1", "strict"), value.decode("latin-1", "replace")
+
+    if ctype == b"iTXt":
+        key, sep, rest = data.partition(b"\0")
+        if not sep or len(rest) < 2:
+            return None
+        comp_flag, comp_method, rest = rest[0], rest[1], rest[2:]
+        parts = rest.split(b"\0", 2)
+        if len(parts) < 3:
+            return None
+        value = parts[2]
+        if comp_flag != 0:
+            if comp_method != 0:
+                return None
+            try:
+                value = _safe_decompress(value)
+            except (ValueError, zlib.error):
+                return None
+        try:
+            return key.decode("latin-1", "strict"), value.decode("utf-8", "strict")
+        except UnicodeError:
+            return None
+    return None
+
+
+def read_png_text_and_size(path):
+    """(dict textových metadat, (šířka, výška) z IHDR nebo None)."""
+    text, size = {}, None
+    with open(path, "rb") as fp:
+        for ctype, data in iter_chunks(fp):
+            if ctype == b"IHDR" and len(data) >= 8:
+                size = struct.unpack(">II", data[:8])
+            elif ctype in TEXT_CHUNKS:
+                kv = decode_text_chunk(ctype, data)
+                if kv is not None:
+                    text[kv[0]] = kv[1]
+    return text, size
+
+
+def read_png_text(path):
+    """Textová metadata PNG (tEXt/zTXt/iTXt před IDAT) jako dict[str, str] – jako Image.text."""
+    return read_png_text_and_size(path)[0]
+
+
+def _chunk(ctype, data):
+    return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", zlib.crc32(data, zlib.crc32(ctype)) & 0xFFFFFFFF)
+
+
+def png_text_chunk(key, value, itxt=None):
+    """
+    Celý chunk s textovým metadatem (délka + typ + data + CRC), nekomprimovaný.
+    itxt=None → tEXt, pokud je hodnota v latin-1, jinak iTXt (jako PngInfo.add_text).
+    Klíč musí být 1–79 znaků latin-1, jinak ValueError.
+    """
+    key = str(key)
+    value = "" if value is None else str(value)
+    try:
+        bkey = key.encode("latin-1")
+    except UnicodeError:
+        raise ValueError(f"Klíč PNG metadat není latin-1: {key!r}")
+    if not 1 <= len(bkey) <= 79 or b"\0" in bkey:
+        raise ValueError(f"Neplatný klíč PNG metadat: {key!r}")
+    if itxt is None:
+        try:
+            return _chunk(b"tEXt", bkey + b"\0" + value.encode("latin-1"))
+        except UnicodeError:
+            itxt = True
+    if itxt:
+        return _chunk(b"iTXt", bkey + b"\0\0\0\0\0" + value.encode("utf-8"))
+    return _chunk(b"tEXt", bkey + b"\0" + value.encode("latin-1"))
+
+
+def _copy_bytes(src, dst, n, bufsize=1024 * 1024):
+    while n > 0:
+        block = src.read(min(n, bufsize))
+        if not block:
+            raise ValueError("Zkrácené PNG")
+        dst.write(block)
+        n -= len(block)
+
+
+def update_png_text(path, set_text=None, remove_keys=(), ignore_case=False, dst=None, chunks=None):
+    """
+    Přepíše textová metadata PNG bez překódování obrazu.
+
+    set_text    – {klíč: hodnota} k zápisu (stávající chunky se stejným klíčem se zahodí)
+    remove_keys – klíče k odstranění
+    ignore_case – klíče porovnávat bez okolních mezer a velikosti písmen
+    dst         – cílový soubor (výchozí: přepsat path na místě)
+    chunks      – místo set_text hotové chunky z png_text_chunk() (např. iTXt + tEXt fallback);
+                  jejich klíče se zahodí stejně jako u set_text
+
+    Nové chunky se vloží před první IDAT, ostatní chunky se kopírují beze změny.
+    Vrací počet odstraněných textových chunků; beze změny (nic k zápisu ani k odebrání)
+    se soubor nepřepisuje. Poškozené PNG → ValueError, soubor zůstane netknutý.
+    """
+    path = str(path)
+    dst = str(dst) if dst else path
+    set_text = dict(set_text or {})
+    norm = (lambda k: k.strip().casefold()) if ignore_case else (lambda k: k)
+
+    new_chunks = [png_text_chunk(k, v) for k, v in set_text.items()] + list(chunks or ())
+    drop = {norm(str(k)) for k in remove_keys} | {norm(str(k)) for k in set_text}
+    for c in chunks or ():
+        drop.add(norm(c[8:].split(b"\0", 1)[0].decode("latin-1")))
+
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(dst) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(dst)))
+    removed = 0
+    try:
+        with open(path, "rb") as src, os.fdopen(fd, "wb") as out:
+            if src.read(8) != PNG_SIGNATURE:
+                raise ValueError("Není PNG soubor")
+            out.write(PNG_SIGNATURE)
+            inserted = False
+            while True:
+                head = src.read(8)
+                if len(head) < 8:
+                    raise ValueError("Zkrácené PNG (chybí IEND)")
+                length, ctype = struct.unpack(">I4s", head)
+                if not _is_chunk_type(ctype):
+                    raise ValueError(f"Poškozené PNG (chunk {ctype!r})")
+                if ctype in TEXT_CHUNKS:
+                    body = src.read(length + 4)
+                    if len(body) < length + 4:
+                        raise ValueError(f"Zkrácené PNG (chunk {ctype!r})")
+                    key = body[:length].split(b"\0", 1)[0].decode("latin-1")
+                    if norm(key) in drop:
+                        removed += 1
+                        continue
+                    out.write(head + body)
+                    continue
+                if not inserted and ctype in (b"IDAT", b"IEND"):
+                    for c in new_chunks:
+                        out.write(c)
+                    inserted = True
+                out.write(head)
+                _copy_bytes(src, out, length + 4)
+                if ctype == b"IEND":
+                    break
+        if not new_chunks and not removed and dst == path:
+            os.unlink(tmp)
+            return 0
+        try:
+            shutil.copymode(path, tmp)
+        except OSError:
+            pass
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return removed
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Progresivní skládání náhledu mapy (bez Qt).
+
+1) hrubý průchod – okamžitě z toho, co je lokálně: přesné dlaždice z paměťové
+   LRU / diskové cache / offline zdroje, chybějící se nahradí zvětšeným
+   výřezem předka z nižšího zoomu (z-1 … z-3), pokud je v cache;
+2) zpřesnění – chybějící přesné dlaždice se stahují od středu ven a každá se
+   hned vloží do plátna.
+
+Plátno má rovnou výstupní velikost (stejný výřez jako MapEngine.stitch_tiles_to_canvas),
+prázdná místa jsou světle šedá.
+"""
+
+from PIL import Image
+
+from core.tile_math import TILE_SIZE, tile_window
+
+COARSE_MAX_LEVELS = 3
+BACKGROUND = 'lightgray'
+
+
+def cached_tile_image(engine, x, y, z):
+    """Dekódovaná dlaždice jen z lokálních zdrojů (paměť, disk, offline) – bez síťového požadavku."""
+    source = engine.get_tile_source()
+    img = engine.memory_cache.get((source.name, int(z), int(x), int(y)))
+    if img is not None:
+        return img
+    if source.is_cached(z, x, y):
+        return engine.get_tile_image(x, y, z)
+    return None
+
+
+def approximate_tile(engine, x, y, z, max_levels=COARSE_MAX_LEVELS, tile_size=TILE_SIZE):
+    """
+    Náhrada dlaždice (x, y, z) z předka v cache: výřez odpovídajícího kvadrantu
+    dlaždice z-k zvětšený na tile_size. Vrací (image, k) nebo (None, None).
+    """
+    for k in range(1, max_levels + 1):
+        pz = int(z) - k
+        if pz < 0:
+            break
+        parent = cached_tile_image(engine, int(x) >> k, int(y) >> k, pz)
+        if parent is None:
+            continue
+        span = tile_size >> k
+        if span < 1:
+            break
+        ox = (int(x) - ((int(x) >> k) << k)) * span
+        oy = (int(y) - ((int(y) >> k) << k)) * span
+        part = parent.crop((ox, oy, ox + span, oy + span))
+        return part.resize((tile_size, tile_size), Image.Resampling.BILINEAR), k
+    return None, None
+
+
+class ProgressiveCanvas:
+    """
+    Plátno náhledu width_px × height_px pro (lat, lon, zoom).
+      requests      – [((dx, dy), x, y, z), …] seřazené od středu ven
+      coarse_pass() – vloží přesné dlaždice z cache a náhrady z nižších zoomů
+      missing       – požadavky, pro které ještě chybí přesná dlaždice
+      paste()       – vloží přesnou dlaždici (volá se po stažení)
+    """
+
+    def __init__(self, engine, lat, lon, zoom, width_px, height_px, tile_size=TILE_SIZE):
+        self.engine = engine
+        self.zoom = int(zoom)
+        self.width_px = int(width_px)
+        self.height_px = int(height_px)
+        self.tile_size = tile_size
+        self.window = tile_window(lat, lon, self.zoom, self.width_px, self.height_px, tile_size)
+        self.image = Image.new('RGB', (self.width_px, self.height_px), color=BACKGROUND)
+        self.requests = self._ordered_requests()
+        self.exact = set()        # (dx, dy) s přesnou dlaždicí
+        self.approximated = 0
+
+    def _ordered_requests(self):
+        w = self.window
+        n = 2 ** self.zoom
+        cx, cy = (w['tiles_x'] - 1) / 2.0, (w['tiles_y'] - 1) / 2.0
+        reqs = [
+            ((dx, dy), (w['left_tile'] + dx) % n, w['top_tile'] + dy, self.zoom)
+            for dy in range(w['tiles_y'])
+            for dx in range(w['tiles_x'])
+            if 0 <= w['top_tile'] + dy < n
+        ]
+        reqs.sort(key=lambda r: (r[0][0] - cx) ** 2 + (r[0][1] - cy) ** 2)
+        return reqs
+
+    @property
+    def total(self):
+        return len(self.requests)
+
+    @property
+    def missing(self):
+        return [r for r in self.requests if r[0] not in self.exact]
+
+    def _paste_tile(self, key, tile_image):
+        ts = self.tile_size
+        if tile_image.size != (ts, ts):
+            tile_image = tile_image.resize((ts, ts), Image.Resampling.LANCZOS)
+        dx, dy = key
+        ox = dx * ts - self.window['crop_left']
+        oy = dy * ts - self.window['crop_top']
+        sx0, sy0 = max(0, -ox), max(0, -oy)
+        sx1, sy1 = min(ts, self.width_px - ox), min(ts, self.height_px - oy)
+        if sx1 <= sx0 or sy1 <= sy0:
+            return
+        self.image.paste(tile_image.crop((sx0, sy0, sx1, sy1)), (ox + sx0, oy + sy0))
+
+    def paste(self, key, tile_image):
+        """Přesná dlaždice pro relativní pozici key = (dx, dy)."""
+        if tile_image is None:
+            return
+        self._paste_tile(key, tile_image)
+        self.exact.add(key)
+
+    def coarse_pass(self, should_stop=None, max_levels=COARSE_MAX_LEVELS):
+        """Hrubý obraz jen z lokálních dat; vrací počet přesných dlaždic z cache."""
+        hits = 0
+        for key, x, y, z in self.requests:
+            if should_stop and should_stop():
+                break
+            try:
+                img = cached_tile_image(self.engine, x, y, z)
+                if img is not None:
+                    self.paste(key, img)
+                    hits += 1
+                    continue
+                approx, _k = approximate_tile(self.engine, x, y, z, max_levels, self.tile_size)
+                if approx is not None:
+                    self._paste_tile(key, approx)
+                    self.approximated += 1
+            except Exception:
+                continue
+        return hits
+
+    def snapshot(self):
+        """Kopie plátna pro předání do GUI (plátno se dál mění ve vlákně)."""
+        return self.image.copy()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Metriky jednoho renderu mapy (kam odešel čas).
+
+- dlaždice: původ (paměť / disk / revalidace 304 / síť / zastaralá z cache /
+  lokální zdroj / chyba), histogram latence, přenesené bajty, opakování
+- fáze pipeline: wall time (GPS, dlaždice, skládání, překryvy, uložení …)
+  a součty času napříč vlákny (dekódování, vkládání dlaždic)
+
+summary_line() = jeden řádek do logu, to_dict() / write_json() = strukturovaný report.
+Instance je thread-safe (dlaždice se zapisují z workerů TileFetcheru).
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Horní meze košů histogramu latence dlaždic (ms); poslední koš je „víc“
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Původ dlaždice
+ORIGIN_MEMORY = "memory"            # paměťová LRU dekódovaných dlaždic
+ORIGIN_DISK = "disk"                # čerstvá dlaždice z diskové cache
+ORIGIN_REVALIDATED = "revalidated"  # 304 Not Modified → data z diskové cache
+ORIGIN_NETWORK = "network"          # 200 ze serveru
+ORIGIN_STALE = "stale"              # síť selhala, použita zastaralá kopie
+ORIGIN_LOCAL = "local"              # MBTiles / složka
+ORIGIN_FAILED = "failed"
+
+_CACHE_ORIGINS = (ORIGIN_MEMORY, ORIGIN_DISK, ORIGIN_REVALIDATED, ORIGIN_STALE, ORIGIN_LOCAL)
+
+
+class RenderMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.perf_counter()
+            self._lap_t = self.started
+            self.origins = {}
+            self.latency_hist = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            self.latency_sum_ms = 0.0
+            self.latency_max_ms = 0.0
+            self.tiles = 0
+            self.bytes_network = 0
+            self.bytes_total = 0
+            self.retries = 0
+            self.phases = {}            # pořadí prvního výskytu
+            self.timers = {}
+
+    # Metriky se mezi procesy nepřenáší (zámek nejde pickle-ovat)
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    # --- dlaždice --------------------------------------------------------
+
+    def record_origin(self, origin, nbytes=0, retries=0):
+        """Zápis zdroje dlaždice (volá zdroj dlaždic), bajty a počet opakování požadavku."""
+        with self._lock:
+            self.origins[origin] = self.origins.get(origin, 0) + 1
+            self.bytes_total += int(nbytes or 0)
+            if origin == ORIGIN_NETWORK:
+                self.bytes_network += int(nbytes or 0)
+            self.retries += int(retries or 0)
+
+    def record_tile(self, seconds):
+        """Latence jedné dlaždice (get_tile_image – u síťových včetně čekání na limiter, viz fáze 'limiter')."""
+        ms = seconds * 1000.0
+        idx = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                idx = i
+                break
+        with self._lock:
+            self.tiles += 1
+            self.latency_hist[idx] += 1
+            self.latency_sum_ms += ms
+            self.latency_max_ms = max(self.latency_max_ms, ms)
+
+    # --- čas -------------------------------------------------------------
+
+    @contextmanager
+    def phase(self, name):
+        """Wall time fáze pipeline (opakované fáze se sčítají)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_phase(name, time.perf_counter() - t0)
+
+    def lap(self, name):
+        """Uzavře fázi `name` – čas od předchozího lap()/reset() (bez přeodsazení pipeline do with bloků)."""
+        now = time.perf_counter()
+        with self._lock:
+            seconds, self._lap_t = now - self._lap_t, now
+        self._add_phase(name, seconds)
+
+    def _add_phase(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_time(self, name, seconds):
+        """Součet času činnosti napříč vlákny (dekódování, vkládání dlaždic…)."""
+        with self._lock:
+            self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    # --- výstup ----------------------------------------------------------
+
+    def cache_hit_ratio(self):
+        with self._lock:
+            total = sum(self.origins.values())
+            hits = sum(self.origins.get(o, 0) for o in _CACHE_ORIGINS)
+        return (hits / total) if total else 0.0
+
+    def latency_percentile(self, q):
+        """Přibližný percentil latence (horní mez koše) v ms."""
+        with self._lock:
+            hist = list(self.latency_hist)
+            total = self.tiles
+            max_ms = self.latency_max_ms
+        if not total:
+            return 0.0
+        need = q * total
+        acc = 0
+        for i, count in enumerate(hist):
+            acc += count
+            if acc >= need:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else max_ms
+        return max_ms
+
+    def to_dict(self):
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            data = {
+                "total_seconds": round(time.perf_counter() - self.started, 3),
+                "phases_seconds": {k: round(v, 4) for k, v in self.phases.items()},
+                "timers_seconds": {k: round(v, 4) for k, v in self.timers.items()},
+                "tiles": {
+                    "count": self.tiles,
+                    "origins": dict(self.origins),
+                    "bytes_network": self.bytes_network,
+                    "bytes_total": self.bytes_total,
+                    "retries": self.retries,
+                    "latency_ms": {
+                        "mean": round(self.latency_sum_ms / self.tiles, 2) if self.tiles else 0.0,
+                        "max": round(self.latency_max_ms, 2),
+                        "histogram": dict(zip(labels, self.latency_hist)),
+                    },
+                },
+            }
+        data["tiles"]["cache_hit_ratio"] = round(self.cache_hit_ratio(), 4)
+        data["tiles"]["latency_ms"]["p50"] = self.latency_percentile(0.50)
+        data["tiles"]["latency_ms"]["p95"] = self.latency_percentile(0.95)
+        return data
+
+    def summary_line(self):
+        """Jednořádkový souhrn do logu."""
+        d = self.to_dict()
+        t = d["tiles"]
+        phases = " ".join(f"{k}={v:.2f}s" for k, v in d["phases_seconds"].items())
+        return (
+            f"📊 Render {d['total_seconds']:.2f} s | {phases} | dlaždice {t['count']} "
+            f"(cache {t['cache_hit_ratio'] * 100:.0f} %, síť {t['origins'].get(ORIGIN_NETWORK, 0)}, "
+            f"{t['bytes_network'] / 1024:.0f} kB, opakování {t['retries']}, "
+            f"p50 {t['latency_ms']['p50']:.0f} ms, p95 {t['latency_ms']['p95']:.0f} ms)"
+        )
+
+    def write_json(self, path, extra=None):
+        """Report do JSON (např. vedle výstupu jako <mapa>.metrics.json)."""
+        data = self.to_dict()
+        if extra:
+            data.update(extra)
+        path = Path(path)
+        path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        return path
+
+
+def report_path_for(output_path):
+    """<výstup>.metrics.json vedle vygenerované mapy."""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + ".metrics.json")
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+Cache mapových dlaždic – perzistentní na disku a dekódovaná v paměti procesu.
+
+Struktura:  <root>/<source>/<z>/<x>/<y>.tile  + <y>.json (HTTP validátory)
+- ETag / Last-Modified / Expires (příp. Cache-Control: max-age) se ukládají
+  vedle dlaždice a použijí se pro podmíněný požadavek po vypršení platnosti.
+- Velikost je omezená (max_bytes); při překročení se mažou nejdéle
+  nepoužité dlaždice (LRU podle mtime, čtení mtime „osvěží“).
+- Zápis je atomický (temp soubor + os.replace), takže souběžní zapisovatelé
+  (vlákna i procesy) nikdy nevidí rozepsaný soubor.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "osm_tiles"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL_S = 7 * 24 * 3600  # pokud server neposlal Expires ani max-age
+
+
+def _safe_source(source):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(source or "default")) or "default"
+
+
+def _http_date_to_ts(value):
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except Exception:
+        return None
+
+
+def validators_from_headers(headers, default_ttl=DEFAULT_TTL_S):
+    """Z HTTP hlaviček odpovědi vytáhne ETag/Last-Modified a spočítá expiraci (epoch s)."""
+    headers = headers or {}
+    now = time.time()
+    expires_at = None
+    cc = str(headers.get('Cache-Control', '') or '')
+    m = re.search(r'max-age\s*=\s*(\d+)', cc, re.IGNORECASE)
+    if m:
+        expires_at = now + int(m.group(1))
+    if expires_at is None:
+        expires_at = _http_date_to_ts(headers.get('Expires'))
+    if expires_at is None:
+        expires_at = now + float(default_ttl)
+    return {
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'expires': headers.get('Expires'),
+        'expires_at': float(expires_at),
+        'fetched_at': now,
+    }
+
+
+def _atomic_write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class CachedTile:
+    """Dlaždice z cache: data + validátory; `fresh` = lze použít bez revalidace."""
+
+    __slots__ = ('data', 'meta')
+
+    def __init__(self, data, meta):
+        self.data = data
+        self.meta = meta or {}
+
+    @property
+    def fresh(self):
+        try:
+            return float(self.meta.get('expires_at', 0)) > time.time()
+        except Exception:
+            return False
+
+    def conditional_headers(self):
+        """Hlavičky pro podmíněný GET (revalidace)."""
+        h = {}
+        if self.meta.get('etag'):
+            h['If-None-Match'] = self.meta['etag']
+        if self.meta.get('last_modified'):
+            h['If-Modified-Since'] = self.meta['last_modified']
+        return h
+
+
+class DiskTileCache:
+    """Disková LRU cache dlaždic klíčovaná (source, z, x, y)."""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, default_ttl=DEFAULT_TTL_S):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max(0, int(max_bytes))
+        self.default_ttl = float(default_ttl)
+        self._lock = threading.Lock()
+        self._size = None  # zjistí se líně při prvním zápisu
+
+    # --- cesty ---
+    def _paths(self, source, z, x, y):
+        base = self.root / _safe_source(source) / str(int(z)) / str(int(x))
+        return base / f"{int(y)}.tile", base / f"{int(y)}.json"
+
+    # --- čtení ---
+    def get(self, source, z, x, y):
+        """Vrátí CachedTile nebo None. Úspěšné čtení posune dlaždici na konec LRU."""
+        data_p, meta_p = self._paths(source, z, x, y)
+        try:
+            data = data_p.read_bytes()
+        except OSError:
+            return None
+        if not data:
+            return None
+        meta = {}
+        try:
+            meta = json.loads(meta_p.read_text(encoding='utf-8'))
+        except Exception:
+            pass
+        try:
+            os.utime(data_p, None)
+        except OSError:
+            pass
+        return CachedTile(data, meta)
+
+    def contains(self, source, z, x, y):
+        """Je dlaždice na disku (bez čtení dat a bez posunu v LRU)? Pro odhady ceny renderu."""
+        data_p, _meta_p = self._paths(source, z, x, y)
+        try:
+            return data_p.stat().st_size > 0
+        except OSError:
+            return False
+
+    # --- zápis ---
+    def put(self, source, z, x, y, data, headers=None):
+        """Atomicky uloží dlaždici a její validátory; po zápisu případně uvolní místo."""
+        if not data:
+            return
+        data_p, meta_p = self._paths(source, z, x, y)
+        try:
+            old_size = data_p.stat().st_size
+        except OSError:
+            old_size = 0
+        meta = validators_from_headers(headers, self.default_ttl)
+        _atomic_write(data_p, bytes(data))
+        _atomic_write(meta_p, json.dumps(meta).encode('utf-8'))
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - old_size
+        self._maybe_evict()
+
+    def refresh(self, source, z, x, y, headers=None):
+        """Po odpovědi 304 Not Modified: prodlouží platnost, data zůstávají."""
+        data_p, meta_p = self._paths(source, z, x, y)
+        if not data_p.exists():
+            return
+        old = {}
+        try:
+            old = json.loads(meta_p.read_text(encoding='utf-8'))
+        except Exception:
+            pass
+        meta = validators_from_headers(headers, self.default_ttl)
+        # 304 nemusí validátory zopakovat – ponechat původní
+        for k in ('etag', 'last_modified'):
+            if not meta.get(k) and old.get(k):
+                meta[k] = old[k]
+        try:
+            _atomic_write(meta_p, json.dumps(meta).encode('utf-8'))
+            os.utime(data_p, None)
+        except OSError:
+            pass
+
+    # --- LRU úklid ---
+    def _scan(self):
+        entries = []
+        total = 0
+        for dirpath, _dirs, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith('.tile'):
+                    continue
+                p = Path(dirpath) / name
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+        return entries, total
+
+    def size_bytes(self):
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            return self._size
+
+    def _maybe_evict(self):
+        if self.max_bytes <= 0:
+            return
+        if self.size_bytes() <= self.max_bytes:
+            return
+        with self._lock:
+            entries, total = self._scan()
+            target = int(self.max_bytes * 0.9)
+            entries.sort(key=lambda e: e[0])
+            for _mtime, size, p in entries:
+                if total <= target:
+                    break
+                try:
+                    p.unlink()
+                    total -= size
+                except OSError:
+                    continue
+                try:
+                    p.with_suffix('.json').unlink()
+                except OSError:
+                    pass
+            self._size = total
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_disk_cache(root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Sdílená instance cache pro daný adresář (jedna evidence velikosti na proces)."""
+    key = str(Path(root).expanduser().resolve())
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = DiskTileCache(Path(root).expanduser(), max_bytes)
+            _CACHES[key] = cache
+        else:
+            cache.max_bytes = max(0, int(max_bytes))
+        return cache
+
+
+class MemoryTileCache:
+    """
+    LRU dekódovaných dlaždic (PIL.Image, RGB) v paměti procesu, omezená počtem bajtů.
+    Klíč je (source, z, x, y). Vrácené obrázky jsou sdílené – volající je nesmí měnit.
+    """
+
+    def __init__(self, max_bytes=192 * 1024 * 1024):
+        self.max_bytes = max(0, int(max_bytes))
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _image_bytes(img):
+        w, h = img.size
+        return w * h * len(img.getbands())
+
+    def get(self, key):
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def contains(self, key):
+        """Je dlaždice v paměti (bez posunu v LRU)?"""
+        with self._lock:
+            return key in self._items
+
+    def put(self, key, img):
+        if img is None:
+            return
+        size = self._image_bytes(img)
+        if self.max_bytes <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= self._image_bytes(old)
+            self._items[key] = img
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                _k, evicted = self._items.popitem(last=False)
+                self._bytes -= self._image_bytes(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def size_bytes(self):
+        with self._lock:
+            return self._bytes
+
+
+_MEMORY_CACHE = MemoryTileCache()
+
+
+def get_memory_cache():
+    """Jediná (procesová) instance paměťové cache dekódovaných dlaždic."""
+    return _MEMORY_CACHE
+
+
+def decode_tile(data):
+    """Dekóduje bajty dlaždice (PNG/JPEG) na RGB PIL.Image; None při chybě."""
+    from io import BytesIO
+    from PIL import Image
+    try:
+        with Image.open(BytesIO(data)) as im:
+            im.load()
+            return im.convert('RGB')
+    except Exception:
+        return None
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Souběžné stahování mapových dlaždic s omezením rychlosti pro každý tile server.
+
+- TokenBucket: klasický token-bucket (rychlost req/s + kapacita burstu).
+- get_host_limiter(): sdílený limiter pro daný host (platí pro celý proces,
+  takže se více současně běžících renderů dělí o stejný „rozpočet“ požadavků).
+  Token si bere až HTTP zdroj těsně před síťovým požadavkem – dlaždice
+  z paměťové LRU nebo diskové cache limiter nečekají.
+- cancellation(): predikát zrušení pro aktuální vlákno (přeruší čekání na token).
+- TileFetcher: omezený pool workerů, respektuje zrušení (should_stop)
+  a hlásí průběh po každé dokončené dlaždici.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Token-bucket limiter; `rate` = tokeny za sekundu, `capacity` = max. burst."""
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = max(0.0, float(rate or 0.0))
+        self.capacity = max(1.0, float(capacity or 1.0))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, rate, capacity=None):
+        """Změna parametrů za běhu (např. jiný request_delay v dalším renderu)."""
+        with self._lock:
+            self._refill()
+            self.rate = max(0.0, float(rate or 0.0))
+            if capacity is not None:
+                self.capacity = max(1.0, float(capacity))
+                self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, should_stop=None, poll=0.1):
+        """
+        Blokuje, dokud není k dispozici token. Vrací False, pokud bylo čekání
+        přerušeno přes should_stop(), jinak True. Rate <= 0 znamená bez omezení.
+        """
+        while True:
+            with self._lock:
+                if self.rate <= 0:
+                    return True
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait_s = (1.0 - self._tokens) / self.rate
+            if should_stop and should_stop():
+                return False
+            time.sleep(min(poll, wait_s))
+
+
+_HOST_LIMITERS = {}
+_HOST_LIMITERS_LOCK = threading.Lock()
+
+
+def host_of(url_or_template):
+    """Host z URL (nebo z URL šablony s {z}/{x}/{y})."""
+    try:
+        return urlparse(str(url_or_template)).netloc or str(url_or_template)
+    except Exception:
+        return str(url_or_template)
+
+
+def get_host_limiter(host, rate, capacity=1.0):
+    """Vrátí (a případně přenastaví) sdílený TokenBucket pro daný host."""
+    with _HOST_LIMITERS_LOCK:
+        bucket = _HOST_LIMITERS.get(host)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            _HOST_LIMITERS[host] = bucket
+        else:
+            bucket.configure(rate, capacity)
+        return bucket
+
+
+_local = threading.local()
+
+
+@contextmanager
+def cancellation(should_stop):
+    """Po dobu bloku vrací current_should_stop() tento predikát (v aktuálním vlákně)."""
+    previous = getattr(_local, "should_stop", None)
+    _local.should_stop = should_stop
+    try:
+        yield
+    finally:
+        _local.should_stop = previous
+
+
+def current_should_stop():
+    """Predikát zrušení nastavený přes cancellation(), jinak None."""
+    return getattr(_local, "should_stop", None)
+
+
+class TileFetcher:
+    """
+    Stáhne sadu dlaždic pomocí omezeného poolu workerů.
+
+    fetch_fn(x, y, z) -> data | None   (typicky MapEngine.get_tile_image)
+    should_stop()    -> True = zrušit (nové požadavky se už nespouští, čekání na token se přeruší)
+    on_progress(done, total) se volá ve vlákně, které zavolalo fetch().
+    """
+
+    def __init__(self, fetch_fn, max_workers=4, should_stop=None, on_progress=None):
+        self.fetch_fn = fetch_fn
+        self.max_workers = max(1, int(max_workers or 1))
+        self.should_stop = should_stop or (lambda: False)
+        self.on_progress = on_progress
+
+    def _fetch_one(self, x, y, z):
+        if self.should_stop():
+            return None
+        with cancellation(self.should_stop):
+            return self.fetch_fn(x, y, z)
+
+    def fetch(self, requests_list, on_tile=None):
+        """
+        requests_list = [(key, x, y, z), ...]
+        Vrací dict {key: data} (chybějící/neúspěšné dlaždice vynechány),
+        nebo None, pokud bylo stahování zrušeno.
+        S `on_tile(key, data)` se každá dlaždice předá hned po dokončení
+        (ve volajícím vlákně) a do výsledku se neukládá – drží se jen ty rozpracované.
+        """
+        total = len(requests_list)
+        results = {}
+        if total == 0:
+            return results
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total)) as pool:
+            pending = {
+                pool.submit(self._fetch_one, x, y, z): key
+                for key, x, y, z in requests_list
+            }
+            while pending:
+                finished, _ = wait(list(pending), timeout=0.2, return_when=FIRST_COMPLETED)
+                if self.should_stop():
+                    for fut in pending:
+                        fut.cancel()
+                    return None
+                for fut in finished:
+                    key = pending.pop(fut)
+                    try:
+                        data = fut.result()
+                    except Exception:
+                        data = None
+                    if data is not None:
+                        if on_tile is not None:
+                            on_tile(key, data)
+                        else:
+                            results[key] = data
+                    done += 1
+                    if self.on_progress:
+                        self.on_progress(done, total)
+        return results
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Čistě výpočetní pomocné funkce pro Web Mercator dlaždice (bez Qt/PIL závislostí).
+"""
+
+import math
+
+TILE_SIZE = 256
+
+
+def lat_lon_to_tile_float(lat, lon, zoom):
+    """GPS → souřadnice dlaždice včetně desetinné části."""
+    lat_rad = math.radians(lat)
+    n = 2.0 ** zoom
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
+    return x, y
+
+
+def tile_float_to_lat_lon(x, y, zoom):
+    """Souřadnice dlaždice (i desetinné) → GPS (lat, lon); inverze lat_lon_to_tile_float."""
+    n = 2.0 ** zoom
+    lon = x / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / n))))
+    return lat, lon
+
+
+def tile_window(lat, lon, zoom, width_px, height_px, tile_size=TILE_SIZE):
+    """
+    Minimální rozsah dlaždic, který protíná výstupní obdélník width_px × height_px
+    se středem v (lat, lon).
+
+    Vrací dict:
+      left_tile, top_tile, tiles_x, tiles_y  – rozsah dlaždic (x bez wrapu)
+      crop_left, crop_top                    – posun výřezu v mozaice tiles_x×tiles_y
+      left_px, top_px                        – levý horní roh výstupu ve world px
+    Střed je zaokrouhlen stejně jako v původním crop_centered_image
+    (floor(center) - size // 2), takže GPS bod zůstává na stejném pixelu.
+    """
+    fx, fy = lat_lon_to_tile_float(lat, lon, zoom)
+    center_x = int(math.floor(fx * tile_size))
+    center_y = int(math.floor(fy * tile_size))
+    left = center_x - int(width_px) // 2
+    top = center_y - int(height_px) // 2
+    right = left + int(width_px)
+    bottom = top + int(height_px)
+
+    left_tile = left // tile_size
+    top_tile = top // tile_size
+    right_tile = (right - 1) // tile_size
+    bottom_tile = (bottom - 1) // tile_size
+
+    return {
+        'left_tile': left_tile,
+        'top_tile': top_tile,
+        'tiles_x': right_tile - left_tile + 1,
+        'tiles_y': bottom_tile - top_tile + 1,
+        'crop_left': left - left_tile * tile_size,
+        'crop_top': top - top_tile * tile_size,
+        'left_px': left,
+        'top_px': top,
+    }
+
+
+def legacy_grid_size(width_px, height_px, tile_size=TILE_SIZE, buffer_factor=1.2):
+    """Původní výpočet gridu (1.2× buffer + lichý počet) – pro srovnání v benchmarku."""
+    grid_width = max(2, int((width_px * buffer_factor) / tile_size) + 1)
+    grid_height = max(2, int((height_px * buffer_factor) / tile_size) + 1)
+    if grid_width % 2 == 0:
+        grid_width += 1
+    if grid_height % 2 == 0:
+        grid_height += 1
+    return grid_width, grid_height
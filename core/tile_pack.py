@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Offline balíček dlaždic pro oblast sbírky.
+
+Z lokačních PNG (tEXt GPS_Latitude / GPS_Longitude zapsané MapProcessor.run)
+se pro zadaný rozsah zoomů spočítá množina dlaždic, které pokrývají výstup
+kolem každého bodu (+ okraj pro náhled), a ty se jednou stáhnou do MBTiles
+souboru nebo složky z/x/y. Stahování je omezené limiterem a navazuje –
+dlaždice, které už v balíčku jsou, se přeskočí.
+
+Hotový balíček se použije parametry tile_source='mbtiles' / 'dir'
+a tile_source_path (viz core.tile_sources).
+
+Pozor: tile.openstreetmap.org hromadné stahování nepovoluje – pro větší
+balíčky použijte vlastní / komerční tile server (--url) a držte nízký --rate.
+
+Spuštění:
+  python -m core.tile_pack <složka s PNG> --zoom 17-19 --out balicek.mbtiles
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from core.tile_fetcher import TileFetcher, get_host_limiter
+from core.tile_math import TILE_SIZE, tile_window
+from core.tile_sources import OSM_URL_TEMPLATE, create_tile_source
+
+# Výchozí rozměr výstupu = výchozí konfigurace aplikace (7,1 × 5 cm) při nejvyšším DPI náhledu
+DEFAULT_WIDTH_CM = 7.1
+DEFAULT_HEIGHT_CM = 5.0
+DEFAULT_DPI = 420
+DEFAULT_MARGIN_TILES = 1  # stejný okraj jako mozaika náhledu v hlavním okně
+
+
+def read_location_centers(paths):
+    """
+    GPS středy [(lat, lon, path), ...] z lokačních PNG (soubory nebo složky, rekurzivně).
+    Čte se jen info z hlavičkových chunků – pixely se nedekódují.
+    """
+    files = []
+    for p in paths:
+        p = Path(p).expanduser()
+        if p.is_dir():
+            files.extend(sorted(p.rglob("*.png")))
+        elif p.suffix.lower() == ".png":
+            files.append(p)
+
+    centers = []
+    for f in files:
+        try:
+            with Image.open(f) as im:
+                meta = dict(getattr(im, "info", {}) or {})
+                lat_txt = meta.get("GPS_Latitude")
+                lon_txt = meta.get("GPS_Longitude")
+            if lat_txt is None or lon_txt is None:
+                continue
+            lat, lon = float(lat_txt), float(lon_txt)
+        except Exception:
+            continue
+        if -85.0511 <= lat <= 85.0511 and -180.0 <= lon <= 180.0:
+            centers.append((lat, lon, f))
+    return centers
+
+
+def covering_tiles(centers, zooms, width_px, height_px, margin=DEFAULT_MARGIN_TILES, tile_size=TILE_SIZE):
+    """Množina (z, x, y) pokrývající výstup width_px × height_px kolem každého středu."""
+    tiles = set()
+    for z in zooms:
+        n = 2 ** int(z)
+        for lat, lon, *_ in centers:
+            win = tile_window(lat, lon, z, width_px, height_px, tile_size)
+            for ty in range(win['top_tile'] - margin, win['top_tile'] + win['tiles_y'] + margin):
+                if ty < 0 or ty >= n:
+                    continue
+                for tx in range(win['left_tile'] - margin, win['left_tile'] + win['tiles_x'] + margin):
+                    tiles.add((int(z), tx % n, ty))
+    return tiles
+
+
+class MBTilesPackWriter:
+    """Zápis do MBTiles (schéma 1.3, řádky v TMS). Commit po dávkách → přerušení nic neztratí."""
+
+    def __init__(self, path, commit_every=200):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, "
+            "tile_row INTEGER, tile_data BLOB)"
+        )
+        self.conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row)"
+        )
+        self.conn.commit()
+        self.commit_every = max(1, int(commit_every))
+        self._pending = 0
+
+    def existing(self):
+        """Množina (z, x, y) už uložených dlaždic (XYZ schéma)."""
+        out = set()
+        for z, x, row in self.conn.execute("SELECT zoom_level, tile_column, tile_row FROM tiles"):
+            out.add((int(z), int(x), (2 ** int(z)) - 1 - int(row)))
+        return out
+
+    def put(self, z, x, y, data):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+            (int(z), int(x), (2 ** int(z)) - 1 - int(y), sqlite3.Binary(data)),
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.conn.commit()
+            self._pending = 0
+
+    def set_metadata(self, **values):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+            [(k, str(v)) for k, v in values.items()],
+        )
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class DirectoryPackWriter:
+    """Zápis do složky <root>/<z>/<x>/<y>.png (atomicky přes dočasný soubor)."""
+
+    def __init__(self, root, ext=".png"):
+        self.root = Path(root).expanduser()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ext = ext
+
+    def existing(self):
+        out = set()
+        for f in self.root.glob(f"*/*/*{self.ext}"):
+            try:
+                out.add((int(f.parent.parent.name), int(f.parent.name), int(f.stem)))
+            except ValueError:
+                continue
+        return out
+
+    def put(self, z, x, y, data):
+        target = self.root / str(int(z)) / str(int(x)) / f"{int(y)}{self.ext}"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + ".part")
+        tmp.write_bytes(data)
+        tmp.replace(target)
+
+    def set_metadata(self, **values):
+        pass
+
+    def close(self):
+        pass
+
+
+def open_pack_writer(out, fmt=None):
+    """Writer podle formátu ('mbtiles' | 'dir'); bez formátu rozhoduje přípona .mbtiles."""
+    fmt = (fmt or ("mbtiles" if str(out).lower().endswith(".mbtiles") else "dir")).lower()
+    if fmt == "mbtiles":
+        return MBTilesPackWriter(out)
+    if fmt == "dir":
+        return DirectoryPackWriter(out)
+    raise ValueError(f"Neznámý formát balíčku: {fmt}")
+
+
+def _bounds(centers):
+    lats = [c[0] for c in centers]
+    lons = [c[1] for c in centers]
+    return f"{min(lons):.6f},{min(lats):.6f},{max(lons):.6f},{max(lats):.6f}"
+
+
+def build_tile_pack(centers, zooms, out, fmt=None, width_px=None, height_px=None,
+                    margin=DEFAULT_MARGIN_TILES, params=None, should_stop=None, log=print):
+    """
+    Stáhne chybějící dlaždice pro `centers` × `zooms` do balíčku `out`.
+    `params` = parametry renderu pro HTTP zdroj (tile_url_template, tile_rate,
+    tile_workers, http_*…). Vrací dict se statistikou.
+    """
+    p = dict(params or {})
+    p['tile_source'] = 'http'
+    p.setdefault('tile_url_template', OSM_URL_TEMPLATE)
+    if width_px is None:
+        width_px = int(round(DEFAULT_WIDTH_CM / 2.54 * DEFAULT_DPI))
+    if height_px is None:
+        height_px = int(round(DEFAULT_HEIGHT_CM / 2.54 * DEFAULT_DPI))
+
+    wanted = covering_tiles(centers, zooms, width_px, height_px, margin)
+    writer = open_pack_writer(out, fmt)
+    try:
+        have = writer.existing()
+        todo = sorted(wanted - have)
+        log(f"🧩 Dlaždic celkem: {len(wanted)}, v balíčku: {len(wanted & have)}, ke stažení: {len(todo)}")
+
+        source = create_tile_source(p)
+        rate = float(p.get('tile_rate', 1.0))
+        workers = max(1, int(p.get('tile_workers', 2)))
+        if rate > 0:
+            source.limiter = get_host_limiter(source.limiter_key, rate, p.get('tile_burst', workers))
+
+        stats = {'total': len(wanted), 'skipped': len(wanted) - len(todo), 'downloaded': 0, 'failed': 0}
+        t0 = time.monotonic()
+
+        def _on_progress(done, total):
+            if done % 50 == 0 or done == total:
+                log(f"   {done}/{total} ({time.monotonic() - t0:.0f} s)")
+
+        def _on_tile(key, data):
+            writer.put(*key, data)
+            stats['downloaded'] += 1
+
+        fetcher = TileFetcher(
+            lambda x, y, z: source.get_tile(z, x, y, log=lambda msg, level="info": None),
+            max_workers=workers,
+            should_stop=should_stop,
+            on_progress=_on_progress,
+        )
+        result = fetcher.fetch([((z, x, y), x, y, z) for z, x, y in todo], on_tile=_on_tile)
+        stats['cancelled'] = result is None
+        stats['failed'] = len(todo) - stats['downloaded'] if result is not None else 0
+
+        writer.set_metadata(
+            name=Path(str(out)).stem,
+            format="png",
+            type="baselayer",
+            version="1.0",
+            description="Offline balíček dlaždic pro lokace čtyřlístků",
+            attribution="© OpenStreetMap contributors",
+            bounds=_bounds(centers) if centers else "-180,-85.0511,180,85.0511",
+            minzoom=min(zooms),
+            maxzoom=max(zooms),
+        )
+        return stats
+    finally:
+        writer.close()
+
+
+def _parse_zooms(text):
+    """'17-19' | '16,18' | '18' → seřazený seznam zoomů."""
+    zooms = set()
+    for part in str(text).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-", 1)
+            zooms.update(range(int(a), int(b) + 1))
+        else:
+            zooms.add(int(part))
+    return sorted(z for z in zooms if 0 <= z <= 22)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline balíček dlaždic pro lokace čtyřlístků")
+    ap.add_argument("sources", nargs="+", help="Lokační PNG nebo složky s nimi (rekurzivně)")
+    ap.add_argument("--zoom", default="17-19", help="Rozsah zoomů, např. 17-19 nebo 16,18 (výchozí 17-19)")
+    ap.add_argument("--out", required=True, help="Výstupní .mbtiles soubor nebo složka")
+    ap.add_argument("--format", choices=("mbtiles", "dir"), default=None, help="Formát balíčku (výchozí dle přípony)")
+    ap.add_argument("--width-cm", type=float, default=DEFAULT_WIDTH_CM)
+    ap.add_argument("--height-cm", type=float, default=DEFAULT_HEIGHT_CM)
+    ap.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    ap.add_argument("--margin", type=int, default=DEFAULT_MARGIN_TILES, help="Okraj v dlaždicích kolem výstupu")
+    ap.add_argument("--url", default=OSM_URL_TEMPLATE, help="URL šablona tile serveru s {z}/{x}/{y}")
+    ap.add_argument("--rate", type=float, default=1.0, help="Max. požadavků za sekundu (0 = bez omezení)")
+    ap.add_argument("--workers", type=int, default=2)
+    args = ap.parse_args(argv)
+
+    zooms = _parse_zooms(args.zoom)
+    if not zooms:
+        ap.error("Prázdný rozsah zoomů")
+
+    centers = read_location_centers(args.sources)
+    print(f"📍 Lokací s GPS: {len(centers)}")
+    if not centers:
+        return 1
+
+    width_px = max(1, int(round(args.width_cm / 2.54 * args.dpi)))
+    height_px = max(1, int(round(args.height_cm / 2.54 * args.dpi)))
+    params = {
+        'tile_url_template': args.url,
+        'tile_rate': args.rate,
+        'tile_workers': args.workers,
+        'tile_cache': False,  # dlaždice míří rovnou do balíčku
+    }
+    try:
+        stats = build_tile_pack(centers, zooms, args.out, args.format, width_px, height_px, args.margin, params)
+    except KeyboardInterrupt:
+        print("⏹️ Přerušeno – stažené dlaždice zůstávají v balíčku, další běh naváže.")
+        return 130
+    print(f"✅ Hotovo: staženo {stats['downloaded']}, přeskočeno {stats['skipped']}, chyb {stats['failed']}")
+    return 0 if stats['failed'] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
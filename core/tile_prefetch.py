@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Spekulativní přednačítání dlaždic (bez Qt).
+
+Když se souřadnice / zoom v GUI na chvíli ustálí (debounce), jedno nízko-
+prioritní vlákno zahřeje cache (paměťová LRU + disková cache) pro aktuální
+zoom ±1 kolem nového bodu. Každá další změna bodu zruší rozpracovanou práci
+(generace požadavku) – dlaždice se stahují od středu ven, takže i přerušený
+běh pokryje to nejdůležitější.
+
+Síťové požadavky jdou přes stejný limiter jako render (sdílený token-bucket
+hostu, uplatňuje ho zdroj dlaždic) – dlaždice už v cache token nestojí a
+prefetch nikdy nepřekročí nastavený rozpočet požadavků na server.
+O tokeny ale nesoupeří s renderem: po dobu bloku foreground_render() (render,
+náhledy) všechny prefetchery stojí a rozpracovaný požadavek doběhnou až potom.
+"""
+
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from core.tile_fetcher import cancellation
+from core.tile_math import TILE_SIZE, tile_window
+
+DEFAULT_DEBOUNCE_S = 0.8
+DEFAULT_MARGIN_TILES = 1
+
+
+def prefetch_tiles(lat, lon, zooms, width_px, height_px, margin=DEFAULT_MARGIN_TILES, tile_size=TILE_SIZE):
+    """
+    Seznam (x, y, z) k přednačtení: pro každý zoom okno výstupu + okraj,
+    seřazené podle pořadí zoomů a vzdálenosti od středu.
+    """
+    out = []
+    seen = set()
+    for z in zooms:
+        z = int(z)
+        n = 2 ** z
+        win = tile_window(lat, lon, z, width_px, height_px, tile_size)
+        cx = win['left_tile'] + (win['tiles_x'] - 1) / 2.0
+        cy = win['top_tile'] + (win['tiles_y'] - 1) / 2.0
+        ring = []
+        for ty in range(win['top_tile'] - margin, win['top_tile'] + win['tiles_y'] + margin):
+            if ty < 0 or ty >= n:
+                continue
+            for tx in range(win['left_tile'] - margin, win['left_tile'] + win['tiles_x'] + margin):
+                key = (tx % n, ty, z)
+                if key in seen:
+                    continue
+                seen.add(key)
+                ring.append(((tx - cx) ** 2 + (ty - cy) ** 2, key))
+        ring.sort(key=lambda item: item[0])
+        out.extend(key for _, key in ring)
+    return out
+
+
+_PREFETCHERS = weakref.WeakSet()
+_FOREGROUND_LOCK = threading.Lock()
+_foreground = 0
+
+
+@contextmanager
+def foreground_render():
+    """
+    Render / náhled v popředí: po dobu bloku jsou všechny prefetchery pozastavené
+    (rozpracovaný průchod se přeruší a pokračuje po skončení posledního bloku).
+    Bloky se mohou překrývat i běžet z více vláken.
+    """
+    global _foreground
+    with _FOREGROUND_LOCK:  # každý prefetcher je pozastaven právě _foreground-krát
+        _foreground += 1
+        for prefetcher in list(_PREFETCHERS):
+            prefetcher.pause()
+    try:
+        yield
+    finally:
+        with _FOREGROUND_LOCK:
+            _foreground -= 1
+            for prefetcher in list(_PREFETCHERS):
+                prefetcher.resume()
+
+
+class TilePrefetcher:
+    """
+    fetch_fn(x, y, z) – stáhne/načte dlaždici do cache (typicky MapEngine.get_tile_image)
+    log(msg, level)   – volitelné logování (volá se z vlákna prefetcheru)
+    """
+
+    def __init__(self, fetch_fn, debounce_s=DEFAULT_DEBOUNCE_S, log=None):
+        self.fetch_fn = fetch_fn
+        self.debounce_s = max(0.0, float(debounce_s))
+        self.log = log
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._request = None
+        self._deadline = 0.0
+        self._closed = False
+        self._active = None
+        with _FOREGROUND_LOCK:
+            self._paused = _foreground  # vzniklý během renderu začíná pozastavený
+            _PREFETCHERS.add(self)
+        self._thread = threading.Thread(target=self._loop, name="tile-prefetch", daemon=True)
+        self._thread.start()
+
+    def schedule(self, lat, lon, zooms, width_px, height_px, margin=DEFAULT_MARGIN_TILES, fetch_fn=None):
+        """Naplánuje přednačtení po uplynutí debounce; ruší předchozí (i rozpracovaný) požadavek."""
+        with self._cond:
+            self._generation += 1
+            self._request = (float(lat), float(lon), [int(z) for z in zooms], int(width_px), int(height_px),
+                             int(margin), fetch_fn)
+            self._deadline = time.monotonic() + self.debounce_s
+            self._cond.notify_all()
+
+    def cancel(self):
+        """Zruší naplánovaný i rozpracovaný prefetch."""
+        with self._cond:
+            self._generation += 1
+            self._request = None
+            self._active = None
+            self._cond.notify_all()
+
+    def pause(self):
+        """Pozastaví prefetch (vnořitelné); rozpracovaný požadavek se po resume() spustí znovu."""
+        with self._cond:
+            self._paused += 1
+            if self._request is None and self._active is not None:
+                self._request = self._active
+            self._generation += 1
+            self._cond.notify_all()
+
+    def resume(self):
+        with self._cond:
+            self._paused = max(0, self._paused - 1)
+            if not self._paused:
+                self._deadline = time.monotonic() + self.debounce_s
+            self._cond.notify_all()
+
+    def shutdown(self, wait=False):
+        with self._cond:
+            self._closed = True
+            self._generation += 1
+            self._request = None
+            self._active = None
+            self._cond.notify_all()
+        if wait:
+            self._thread.join(timeout=2.0)
+
+    def _cancelled(self, generation):
+        return self._closed or generation != self._generation
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._request is not None and not self._paused:
+                        remaining = self._deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+                generation = self._generation
+                request, self._request = self._request, None
+                self._active = request
+            try:
+                self._run(generation, request)
+            finally:
+                with self._cond:
+                    if self._active is request:
+                        self._active = None
+
+    def _run(self, generation, request):
+        lat, lon, zooms, w, h, margin, fetch_fn = request
+        fetch_fn = fetch_fn or self.fetch_fn
+        tiles = prefetch_tiles(lat, lon, zooms, w, h, margin)
+        should_stop = lambda: self._cancelled(generation)  # noqa: E731
+        done = 0
+        t0 = time.monotonic()
+        for x, y, z in tiles:
+            if should_stop():
+                break
+            try:
+                with cancellation(should_stop):
+                    fetch_fn(x, y, z)
+            except Exception:
+                pass
+            done += 1
+        if self.log and done:
+            state = "přerušeno" if should_stop() else "hotovo"
+            self.log(f"🔥 Prefetch dlaždic (Z{'/'.join(map(str, zooms))}): {done}/{len(tiles)} "
+                     f"za {time.monotonic() - t0:.1f} s ({state})", "info")
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Společný plánovač dlaždic pro více souběžných náhledů (bez Qt).
+
+- jedna prioritní fronta požadavků (x, y, z) pro všechny náhledy,
+- stejné dlaždice se slučují (stáhne se jednou, dostanou ji všichni zájemci),
+- priorita je libovolná porovnatelná hodnota (menší = dřív); reprioritize()
+  přeřadí čekající požadavky, např. po výběru jiného zoomu v dialogu,
+- pevný počet workerů; limiter hostu uplatňuje až zdroj dlaždic při síťovém
+  požadavku, dlaždice z cache tedy na token nečekají.
+"""
+
+import heapq
+import itertools
+import threading
+
+from core.tile_fetcher import cancellation
+
+
+class _Entry:
+    __slots__ = ("priority", "version", "callbacks", "running")
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.version = 0
+        self.callbacks = []
+        self.running = False
+
+
+class TileScheduler:
+    """
+    fetch_fn(x, y, z) -> image | None (typicky MapEngine.get_tile_image)
+    request(key, priority, callback) – callback(key, image) se volá z vlákna workeru
+    """
+
+    def __init__(self, fetch_fn, workers=4, name="tile-scheduler"):
+        self.fetch_fn = fetch_fn
+        self._cond = threading.Condition()
+        self._heap = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self._closed = False
+        self.stats = {"requested": 0, "merged": 0, "fetched": 0, "failed": 0}
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            for i in range(max(1, int(workers)))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _push(self, key, entry):
+        entry.version += 1
+        heapq.heappush(self._heap, (entry.priority, next(self._seq), key, entry.version))
+
+    def request(self, key, priority, callback):
+        """Zařadí dlaždici key = (x, y, z); duplicitní požadavek se sloučí (a případně povýší)."""
+        key = (int(key[0]), int(key[1]), int(key[2]))
+        with self._cond:
+            if self._closed:
+                return
+            self.stats["requested"] += 1
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = _Entry(priority)
+                entry.callbacks.append(callback)
+                self._push(key, entry)
+                self._cond.notify()
+                return
+            self.stats["merged"] += 1
+            entry.callbacks.append(callback)
+            if not entry.running and priority < entry.priority:
+                entry.priority = priority
+                self._push(key, entry)
+
+    def reprioritize(self, fn):
+        """fn(key, priority) -> nová priorita; týká se jen čekajících (ne běžících) požadavků."""
+        with self._cond:
+            for key, entry in self._pending.items():
+                if entry.running:
+                    continue
+                new = fn(key, entry.priority)
+                if new != entry.priority:
+                    entry.priority = new
+                    self._push(key, entry)
+            self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def shutdown(self, wait=False):
+        """Zahodí čekající požadavky a ukončí workery (běžící stažení doběhne)."""
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._pending.clear()
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join(timeout=2.0)
+
+    def _stopped(self):
+        return self._closed
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._heap:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _prio, _seq, key, version = heapq.heappop(self._heap)
+                entry = self._pending.get(key)
+                if entry is None or entry.running or entry.version != version:
+                    continue  # zastaralá položka haldy (přeřazeno / sloučeno)
+                entry.running = True
+
+            try:
+                with cancellation(self._stopped):
+                    image = self.fetch_fn(*key)
+            except Exception:
+                image = None
+
+            with self._cond:
+                self._pending.pop(key, None)
+                callbacks = list(entry.callbacks)
+                self.stats["fetched" if image is not None else "failed"] += 1
+            for cb in callbacks:
+                try:
+                    cb(key, image)
+                except Exception:
+                    pass
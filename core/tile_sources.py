@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Zdroje mapových dlaždic – jednotné rozhraní pro HTTP server, MBTiles a lokální složku.
+
+Každý zdroj má:
+  name          – klíč pro cache (paměťová LRU, disková cache)
+  rate_limited  – zda se na něj má uplatnit limiter požadavků (jen síť)
+  limiter_key   – host pro sdílený token-bucket
+  limiter       – TokenBucket nebo None; HTTP zdroj si token bere až těsně před
+                  síťovým požadavkem (čerstvá dlaždice z diskové cache token nestojí)
+  get_tile(z, x, y, log=None, metrics=None) -> bytes | None
+    (metrics = core.render_metrics.RenderMetrics – zapíše se původ dlaždice)
+  is_cached(z, x, y) – dlaždice je k dispozici bez síťového požadavku (odhad ceny)
+
+Výběr z parametrů renderu (create_tile_source):
+  tile_source       'http' (výchozí) | 'mbtiles' | 'dir'
+  tile_source_path  cesta k .mbtiles souboru nebo kořeni složky z/x/y
+  tile_url_template URL šablona pro HTTP (výchozí OSM)
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from core.tile_cache import get_disk_cache, DEFAULT_CACHE_DIR
+from core.tile_fetcher import host_of, current_should_stop
+from core.http_pool import session_pool_from_params
+from core import render_metrics as rm
+
+OSM_URL_TEMPLATE = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+
+
+def _noop_log(msg, level="info"):
+    pass
+
+
+def _record(metrics, origin, data=None, retries=0):
+    if metrics is not None:
+        metrics.record_origin(origin, len(data) if data else 0, retries)
+
+
+def _transport_retries(response):
+    """Počet opakování, která za požadavek provedla retry politika urllib3."""
+    retry = getattr(getattr(response, "raw", None), "retries", None)
+    return len(getattr(retry, "history", None) or ())
+
+
+def _local_name(prefix, path):
+    """Jednoznačný název lokálního zdroje (dva balíčky se stejným jménem se v cache nepletou)."""
+    digest = hashlib.sha1(str(Path(path).resolve()).encode("utf-8")).hexdigest()[:8]
+    return f"{prefix}_{Path(path).stem}_{digest}"
+
+
+class TileSource:
+    """Společný základ zdrojů dlaždic."""
+
+    name = "tiles"
+    rate_limited = False
+    limiter_key = None
+    limiter = None
+
+    def get_tile(self, z, x, y, log=None, retries=1, metrics=None):
+        raise NotImplementedError
+
+    def is_cached(self, z, x, y):
+        # Lokální zdroje nic nestahují
+        return not self.rate_limited
+
+    def close(self):
+        pass
+
+
+class HttpTileSource(TileSource):
+    """Dlaždice z HTTP serveru přes sdílený pool sessions + disková cache s revalidací."""
+
+    rate_limited = True
+
+    def __init__(self, url_template=OSM_URL_TEMPLATE, http_pool=None, disk_cache=None, limiter=None):
+        self.url_template = url_template or OSM_URL_TEMPLATE
+        self.name = host_of(self.url_template)
+        self.limiter_key = self.name
+        self.http_pool = http_pool or session_pool_from_params({})
+        self.disk_cache = disk_cache
+        self.limiter = limiter
+
+    def is_cached(self, z, x, y):
+        return bool(self.disk_cache) and self.disk_cache.contains(self.name, z, x, y)
+
+    def get_tile(self, z, x, y, log=None, retries=1, metrics=None):
+        """Stažení dlaždice – nejprve z diskové cache, zastaralé dlaždice se revalidují."""
+        log = log or _noop_log
+        url = self.url_template.format(z=z, x=x, y=y)
+        source = self.name
+
+        cached = self.disk_cache.get(source, z, x, y) if self.disk_cache else None
+        if cached is not None and cached.fresh:
+            _record(metrics, rm.ORIGIN_DISK, cached.data)
+            return cached.data
+
+        # Token hostu až pro síťový požadavek (stažení i podmíněný GET)
+        if self.limiter is not None:
+            t_wait = time.perf_counter()
+            if not self.limiter.acquire(current_should_stop()):
+                return cached.data if cached is not None else None  # zrušeno během čekání
+            if metrics is not None:
+                metrics.add_time("limiter", time.perf_counter() - t_wait)
+
+        # Základní hlavičky (User-Agent, keep-alive) nese session z poolu
+        headers = {}
+        if cached is not None:
+            headers.update(cached.conditional_headers())
+
+        # Opakování a backoff řeší retry politika poolu; `retries` = počet vnějších pokusů
+        for attempt in range(max(1, int(retries or 1))):
+            try:
+                response = self.http_pool.get(url, headers=headers)
+                retried = attempt + _transport_retries(response)
+
+                if response.status_code == 304 and cached is not None:
+                    self.disk_cache.refresh(source, z, x, y, response.headers)
+                    _record(metrics, rm.ORIGIN_REVALIDATED, cached.data, retried)
+                    return cached.data
+
+                if response.status_code == 200:
+                    content = response.content
+                    if len(content) > 0:
+                        if self.disk_cache:
+                            try:
+                                self.disk_cache.put(source, z, x, y, content, response.headers)
+                            except Exception as e:
+                                log(f"⚠️ Zápis dlaždice {x},{y} do cache selhal: {e}", "warning")
+                        _record(metrics, rm.ORIGIN_NETWORK, content, retried)
+                        return content
+                    else:
+                        log(f"⚠️ Prázdná dlaždice {x},{y}", "warning")
+                else:
+                    log(f"⚠️ HTTP {response.status_code} pro dlaždici {x},{y}", "warning")
+
+            except requests.exceptions.Timeout:
+                log(f"⏱️ Timeout pro dlaždici {x},{y} (pokus {attempt + 1})", "warning")
+
+            except requests.exceptions.ConnectionError:
+                log(f"🌐 Chyba připojení pro dlaždici {x},{y} (pokus {attempt + 1})", "warning")
+
+            except Exception as e:
+                log(f"❌ Chyba pro dlaždici {x},{y}: {str(e)}", "error")
+
+        if cached is not None:
+            log(f"⚠️ Dlaždici {x},{y} nelze revalidovat, použita verze z cache", "warning")
+            _record(metrics, rm.ORIGIN_STALE, cached.data, max(0, int(retries or 1) - 1))
+            return cached.data
+
+        log(f"❌ Nepodařilo se stáhnout dlaždici {x},{y}", "error")
+        _record(metrics, rm.ORIGIN_FAILED, None, max(0, int(retries or 1) - 1))
+        return None
+
+
+class MBTilesTileSource(TileSource):
+    """
+    Dlaždice z MBTiles (SQLite, tabulka/pohled `tiles`, řádky v TMS schématu –
+    tile_row = 2^z - 1 - y). Spojení je per-vlákno a jen pro čtení.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path).expanduser()
+        if not self.path.is_file():
+            raise FileNotFoundError(f"MBTiles soubor neexistuje: {self.path}")
+        self.name = _local_name("mbtiles", self.path)
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path.as_posix()}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def metadata(self):
+        """Obsah tabulky `metadata` (name, format, bounds, minzoom, maxzoom, …)."""
+        try:
+            return {k: v for k, v in self._conn().execute("SELECT name, value FROM metadata")}
+        except sqlite3.Error:
+            return {}
+
+    def get_tile(self, z, x, y, log=None, retries=1, metrics=None):
+        tms_y = (2 ** int(z)) - 1 - int(y)
+        try:
+            row = self._conn().execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (int(z), int(x), tms_y),
+            ).fetchone()
+        except sqlite3.Error as e:
+            (log or _noop_log)(f"❌ MBTiles chyba pro dlaždici {x},{y}: {e}", "error")
+            _record(metrics, rm.ORIGIN_FAILED)
+            return None
+        if not row or not row[0]:
+            (log or _noop_log)(f"⚠️ Dlaždice {z}/{x}/{y} v MBTiles chybí", "warning")
+            _record(metrics, rm.ORIGIN_FAILED)
+            return None
+        data = bytes(row[0])
+        _record(metrics, rm.ORIGIN_LOCAL, data)
+        return data
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            self._local.conn = None
+
+
+class DirectoryTileSource(TileSource):
+    """Dlaždice z lokální složky <root>/<z>/<x>/<y>.<ext> (png, jpg, jpeg, webp)."""
+
+    EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+    def __init__(self, root):
+        self.root = Path(root).expanduser()
+        if not self.root.is_dir():
+            raise FileNotFoundError(f"Složka s dlaždicemi neexistuje: {self.root}")
+        self.name = _local_name("dir", self.root)
+
+    def get_tile(self, z, x, y, log=None, retries=1, metrics=None):
+        base = self.root / str(int(z)) / str(int(x))
+        for ext in self.EXTENSIONS:
+            p = base / f"{int(y)}{ext}"
+            try:
+                data = p.read_bytes()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                (log or _noop_log)(f"❌ Chyba čtení dlaždice {p}: {e}", "error")
+                _record(metrics, rm.ORIGIN_FAILED)
+                return None
+            _record(metrics, rm.ORIGIN_LOCAL, data)
+            return data
+        (log or _noop_log)(f"⚠️ Dlaždice {z}/{x}/{y} ve složce chybí", "warning")
+        _record(metrics, rm.ORIGIN_FAILED)
+        return None
+
+
+def create_tile_source(params, http_pool=None, disk_cache=None):
+    """
+    Zdroj dlaždic podle parametrů renderu (viz docstring modulu).
+    Pro HTTP lze předat už vytvořený pool / diskovou cache, jinak se vezmou sdílené.
+    """
+    p = params or {}
+    kind = str(p.get('tile_source') or 'http').lower()
+    path = p.get('tile_source_path')
+
+    if kind in ('mbtiles', 'mbt'):
+        if not path:
+            raise ValueError("Zdroj 'mbtiles' vyžaduje parametr tile_source_path")
+        return MBTilesTileSource(path)
+    if kind in ('dir', 'directory', 'folder'):
+        if not path:
+            raise ValueError("Zdroj 'dir' vyžaduje parametr tile_source_path")
+        return DirectoryTileSource(path)
+    if kind != 'http':
+        raise ValueError(f"Neznámý zdroj dlaždic: {kind}")
+
+    if disk_cache is None and p.get('tile_cache', True):
+        max_mb = float(p.get('tile_cache_max_mb', 512))
+        disk_cache = get_disk_cache(p.get('tile_cache_dir') or DEFAULT_CACHE_DIR, int(max_mb * 1024 * 1024))
+    return HttpTileSource(
+        p.get('tile_url_template') or OSM_URL_TEMPLATE,
+        http_pool=http_pool or session_pool_from_params(p),
+        disk_cache=disk_cache,
+    )
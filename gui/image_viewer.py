@@ -14,6 +14,9 @@ from pathlib import Path
 import platform  # PŘIDÁNO pro detekci OS
 import os  # PŘIDÁNO pro smazání souboru
 
+from core.photo_metadata import read_gps, replace_heif_exif
+from core.location_index import get_location_index
+
 
 class ImageViewerDialog(QDialog):
     """Dialog pro zobrazení obrázku s metadaty"""
@@ -2371,7 +2374,6 @@ class PolygonEditorDialog(QDialog):
             from PySide6.QtWidgets import QLabel, QCheckBox, QGroupBox, QVBoxLayout, QWidget
             from PySide6.QtCore import Qt
             from pathlib import Path as _P
-            from PIL import Image as _Image
     
             # --- styling checkboxů (ponechán z původní verze) ---
             checkbox_style = """
@@ -2387,15 +2389,6 @@ class PolygonEditorDialog(QDialog):
             # --- pomocné funkce jen v rámci této metody ---
             TILE_SIZE = 256.0
     
-            def _coerce_xy(p):
-                try:
-                    return float(p[0]), float(p[1])
-                except Exception:
-                    try:
-                        return float(p.x()), float(p.y())
-                    except Exception:
-                        return None
-    
             def _deg2num(lat_deg: float, lon_deg: float, zoom: int):
                 import math
                 lat_rad = math.radians(lat_deg)
@@ -2412,28 +2405,6 @@ class PolygonEditorDialog(QDialog):
                 lat_deg = math.degrees(lat_rad)
                 return lat_deg, lon_deg
     
-            def _parse_lat_lon_zoom_from_name(name: str):
-                import re
-                lat = lon = zoom = None
-                pat_gps = r'(?:GPS\s*)?([0-9]+(?:[.,][0-9]+)?)\s*([SJNVEWZ])\s*[\+\s_,;:-]?\s*([0-9]+(?:[.,][0-9]+)?)\s*([SJNVEWZ])'
-                m = re.search(pat_gps, name, re.IGNORECASE)
-                if m:
-                    lat_val = float(m.group(1).replace(',', '.'))
-                    lat_dir = m.group(2).upper()
-                    lon_val = float(m.group(3).replace(',', '.'))
-                    lon_dir = m.group(4).upper()
-                    english_mode = any(d in {'N','E','W'} for d in {lat_dir, lon_dir})
-                    if english_mode:
-                        lat = -lat_val if lat_dir == 'S' else lat_val
-                        lon = -lon_val if lon_dir == 'W' else lon_val
-                    else:
-                        lat = -lat_val if lat_dir == 'J' else lat_val
-                        lon = -lon_val if lon_dir == 'Z' else lon_val
-                mz = re.search(r'(?:^|[+\-_\s])Z(\d{1,2})(?=$|[+\-_\s])', name, re.IGNORECASE)
-                if mz:
-                    zoom = max(0, min(22, int(mz.group(1))))
-                return lat, lon, zoom
-    
             def _viewport_geo_bounds():
                 # Parametry cílové (aktuální) mapy
                 tgt_lat, tgt_lon, tgt_zoom = self._extract_lat_lon_zoom_from_filename()
@@ -2455,48 +2426,23 @@ class PolygonEditorDialog(QDialog):
                 lon_min = min(lon_left, lon_right); lon_max = max(lon_left, lon_right)
                 return (lat_min, lat_max, lon_min, lon_max, int(tgt_zoom))
     
-            def _polygon_intersects_view(path: _P, pts, bounds):
+            def _polygon_intersects_view(info, bounds):
                 if not bounds:
                     return True
                 lat_min, lat_max, lon_min, lon_max, _tgt_zoom = bounds
     
-                # Georeference zdroje
-                src_lat = src_lon = src_zoom = None
-                try:
-                    src_lat, src_lon, src_zoom = _parse_lat_lon_zoom_from_name(path.stem)
-                except Exception:
-                    return False
-                if src_lat is None or src_lon is None or src_zoom is None:
-                    return False
-    
-                # Rozměry zdrojové mapy
-                try:
-                    with _Image.open(path) as _im:
-                        Ws, Hs = float(_im.width), float(_im.height)
-                except Exception:
-                    return False
-                if not Ws or not Hs:
+                # Polygon ve WGS84 předpočtený v indexu lokačních map (georeference + rozměry zdroje)
+                geo = list(info.polygon_wgs84 or [])
+                n = len(geo)
+                if n == 0:
                     return False
     
-                src_cx, src_cy = _deg2num(float(src_lat), float(src_lon), int(src_zoom))
-    
                 # Podvzorek bodů + extrémy, kvůli rychlosti
-                pts_list = list(pts or [])
-                n = len(pts_list)
-                if n == 0:
-                    return False
                 step = max(1, n // 15)
-                sample = [pts_list[i] for i in range(0, n, step)]
-                sample.append(pts_list[0]); sample.append(pts_list[-1])
+                sample = [geo[i] for i in range(0, n, step)]
+                sample.append(geo[0]); sample.append(geo[-1])
     
-                for p in sample:
-                    xy = _coerce_xy(p)
-                    if xy is None:
-                        continue
-                    x_s, y_s = xy
-                    xt = src_cx + (float(x_s) - Ws * 0.5) / TILE_SIZE
-                    yt = src_cy + (float(y_s) - Hs * 0.5) / TILE_SIZE
-                    lat_deg, lon_deg = _num2deg(xt, yt, int(src_zoom))
+                for lat_deg, lon_deg in sample:
                     if (lat_min <= lat_deg <= lat_max) and (lon_min <= lon_deg <= lon_max):
                         return True
                 return False
@@ -2508,16 +2454,10 @@ class PolygonEditorDialog(QDialog):
                 if w:
                     w.setParent(None)
     
-            # --- vyhledání složky s kandidáty ---
+            # --- vyhledání složky s kandidáty (metadata z indexu lokačních map) ---
             base = self.image_path.parent
-            items = []  # (Path, pts)
-    
-            # použij existující helper read_polygon_metadata, který už máš v souboru
-            def read_polygon_metadata(p):
-                try:
-                    return globals().get('read_polygon_metadata')(p)
-                except Exception:
-                    return None
+            items = []  # (Path, LocationMapInfo)
+            location_index = get_location_index()
     
             if base.exists() and base.is_dir():
                 for p in sorted(base.iterdir(), key=lambda x: x.name.lower()):
@@ -2525,18 +2465,18 @@ class PolygonEditorDialog(QDialog):
                         if p.is_file() and p.suffix.lower() in {'.png', '.jpg', '.jpeg', '.tif', '.tiff', '.heic', '.heif'}:
                             if p == self.image_path:
                                 continue
-                            meta = read_polygon_metadata(p)
-                            if meta and isinstance(meta.get('points'), list) and len(meta['points']) >= 3:
-                                items.append((p, meta['points']))
+                            info = location_index.get(p)
+                            if info is not None and info.polygon is not None:
+                                items.append((p, info))
                     except Exception:
                         continue
     
             # --- spočti bounds aktuální mapy a vyfiltruj relevantní ---
             bounds = _viewport_geo_bounds()
             relevant = []
-            for p, pts in items:
-                if _polygon_intersects_view(_P(str(p)), pts, bounds):
-                    relevant.append((p, pts))
+            for p, info in items:
+                if _polygon_intersects_view(info, bounds):
+                    relevant.append((p, info.polygon_points))
     
             if not relevant:
                 self.overlay_vbox.addWidget(QLabel("Žádné relevantní polygony pro aktuální výřez."))
@@ -2576,26 +2516,14 @@ def read_polygon_metadata(image_path):
     Načte metadata polygonu z PNG tEXt klíče 'AOI_POLYGON' (JSON).
     Vrací dict: {"points": [[x,y],...], "alpha": 0.15, "color": "#FF0000"} nebo None.
     """
-    import json
-    from PIL import Image
-    from pathlib import Path
     try:
-        image_path = Path(image_path)
-        with Image.open(image_path) as im:
-            text_meta = getattr(im, 'text', {}) or {}
-            raw = text_meta.get('AOI_POLYGON')
-            if not raw:
-                info = getattr(im, 'info', {}) or {}
-                raw = info.get('AOI_POLYGON')
-            if not raw:
-                return None
-            data = json.loads(raw)
-            pts = data.get('points') or []
-            if not isinstance(pts, list) or len(pts) < 3:
-                return None
-            alpha = float(data.get('alpha', 0.15))
-            color = data.get('color', '#FF0000')
-            return {'points': pts, 'alpha': alpha, 'color': color}
+        info = get_location_index().get(image_path)
+        if info is None or info.polygon is None:
+            return None
+        data = info.polygon
+        alpha = float(data.get('alpha', 0.15))
+        color = data.get('color', '#FF0000')
+        return {'points': data['points'], 'alpha': alpha, 'color': color}
     except Exception:
         return None
 
@@ -3034,10 +2962,19 @@ class HeicPreviewDialog(QDialog):
     def _read_gps_from_heic(self, path: Path):
         """
         GPS z metadat .HEIC:
+          0) core.photo_metadata – jen hlavičky souboru, bez dekódování obrázku,
           1) MapProcessor.get_gps_from_image (robustní import),
           2) fallback přes piexif: čtení GPS IFD (bez Pillow EXIF offsetů).
         Včetně DEBUG logu.
         """
+        # 0) hlavičky souboru
+        try:
+            gps = read_gps(path)
+            if gps is not None:
+                return gps
+        except Exception as e:
+            self._dbg("GPS HEIC photo_metadata FAIL:", e)
+
         # 1) MapProcessor
         try:
             mp = self._mp()
@@ -3658,7 +3595,8 @@ class HeicPreviewDialog(QDialog):
           - načti existující EXIF,
           - odstraň staré 'AOI_POLYGON=…',
           - vlož nový chunk,
-          - ulož do dočasného souboru a atomicky nahraď.
+          - vyměň jen EXIF položku (bez překódování obrazu, core.photo_metadata.replace_heif_exif),
+          - jinak ulož přes Pillow do dočasného souboru a atomicky nahraď.
         """
         try:
             from PIL import Image
@@ -3694,11 +3632,15 @@ class HeicPreviewDialog(QDialog):
     
                 exif["0th"][piexif.ImageIFD.ImageDescription] = desc.encode("utf-8", "ignore")
                 exif["Exif"][piexif.ExifIFD.UserComment] = ucom.encode("utf-8", "ignore")
+            exif_dump = piexif.dump(exif)
     
-                # ulož
+            # ulož – primárně jen výměna EXIF položky, obraz zůstane bajt po bajtu
+            if replace_heif_exif(path, exif_dump):
+                return True
+            with Image.open(str(path)) as im:
                 with tempfile.NamedTemporaryFile(delete=False, suffix=path.suffix) as tmp:
                     tmp_path = Path(tmp.name)
-                im.save(str(tmp_path), format=im.format, exif=piexif.dump(exif))
+                im.save(str(tmp_path), format=im.format, exif=exif_dump)
             os.replace(str(tmp_path), str(path))
             return True
         except Exception as e:
@@ -3740,10 +3682,14 @@ class HeicPreviewDialog(QDialog):
                     exif["Exif"][piexif.ExifIFD.UserComment] = ucom.encode("utf-8", "ignore")
                 elif piexif.ExifIFD.UserComment in exif["Exif"]:
                     del exif["Exif"][piexif.ExifIFD.UserComment]
+            exif_dump = piexif.dump(exif)
     
+            if replace_heif_exif(path, exif_dump):
+                return True
+            with Image.open(str(path)) as im:
                 with tempfile.NamedTemporaryFile(delete=False, suffix=path.suffix) as tmp:
                     tmp_path = Path(tmp.name)
-                im.save(str(tmp_path), format=im.format, exif=piexif.dump(exif))
+                im.save(str(tmp_path), format=im.format, exif=exif_dump)
             os.replace(str(tmp_path), str(path))
             return True
         except Exception as e:
@@ -33,6 +33,15 @@ from gui.image_viewer import ImageViewerDialog, open_polygon_editor_for_file
 
 from gui.pdf_generator_window import PDFGeneratorWindow
 from core.map_processor import MapProcessor
+from core import font_registry
+from core import output_encoder
+from core.map_engine import MapEngine
+from core.tile_prefetch import TilePrefetcher, foreground_render
+from core.progressive_preview import ProgressiveCanvas
+from core.tile_scheduler import TileScheduler
+from core.photo_metadata import read_gps
+from core.location_index import get_location_index
+from core.png_chunks import png_text_chunk, read_png_text, update_png_text
 
 from gui.web_photos_window import WebPhotosWindow
 
@@ -56,8 +65,9 @@ class ProcessorThread(QThread):
         self.processor.log.connect(self.log)
         self.processor.status.connect(self.status)
         
-        # Spuštění zpracování
-        self.processor.run()
+        # Spuštění zpracování (prefetch dlaždic mezitím stojí – nesoupeří o limiter)
+        with foreground_render():
+            self.processor.run()
         
     def stop(self):
         """Zastavení zpracování"""
@@ -86,6 +96,7 @@ from core.map_processor import MapProcessor
 import time
 import json
 import re
+import threading
 
 class ClickableMapLabel(QFrame):
     """Vlastní widget pro zobrazení klikatelného náhledu mapy s pevnou velikostí."""
@@ -96,6 +107,7 @@ class ClickableMapLabel(QFrame):
         self.zoom = zoom
         self.meta = None
         self.base_image = None
+        self.is_final = False  # False = zobrazen jen průběžný (progresivní) snímek
         self.setFrameShape(QFrame.StyledPanel)
         self.setLineWidth(1)
         self.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
@@ -142,152 +154,155 @@ class ClickableMapLabel(QFrame):
         self.clicked.emit()
         super().mousePressEvent(event)
 
-class MapGenerationThread(QThread):
-    """Vlákno generuje mapu s progress reportingem."""
-    
-    map_generated = Signal(int, object, dict)
-    error_occurred = Signal(int, str)
-    progress_updated = Signal(int, str)  # progress, message
-    finished = Signal()
+class PreviewSchedulerThread(QThread):
+    """
+    Jeden plánovač pro všechny náhledy multi-zoom dialogu (obě DPI řady).
+
+    Nejdřív hrubé snímky z cache (ProgressiveCanvas.coarse_pass), potom všechny
+    chybějící dlaždice do jedné prioritní fronty core.tile_scheduler.TileScheduler:
+    vybraný zoom má přednost, stejné dlaždice obou řad se stáhnou jen jednou.
+    """
+
+    map_generated = Signal(int, int, object, dict)    # row, zoom, obrázek, meta
+    map_progressive = Signal(int, int, object, dict)  # průběžný (hrubý / zpřesňovaný) snímek
+    error_occurred = Signal(int, int, str)            # row, zoom, chyba
+    progress_updated = Signal(int, int, int, str)     # row, zoom, progress, message
 
-    def __init__(self, parameters, zooms_to_generate, main_window, parent=None):
+    # Minimální odstup průběžných snímků (kopie plátna + převod do QPixmap v GUI)
+    PROGRESSIVE_INTERVAL_S = 0.25
+
+    def __init__(self, jobs, main_window, priority_zoom=None, parent=None):
+        """jobs = [(row, zoom, params), …]"""
         super().__init__(parent)
-        self.params = parameters
-        self.zooms = zooms_to_generate if isinstance(zooms_to_generate, list) else [zooms_to_generate]
+        self.jobs = jobs
         self.main_window = main_window
+        self.priority_zoom = priority_zoom
+        self.scheduler = None
         self._is_running = True
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._all_done = threading.Event()
+
+    def _zoom_priority(self, zoom):
+        return 0 if zoom == self.priority_zoom else 1
+
+    def set_priority_zoom(self, zoom):
+        """Vybraný zoom dostane přednost i pro už zařazené dlaždice."""
+        self.priority_zoom = zoom
+        if self.scheduler is not None:
+            self.scheduler.reprioritize(lambda key, prio: (self._zoom_priority(key[2]),) + tuple(prio[1:]))
 
     def run(self):
-        for z in self.zooms:
-            if not self._is_running: 
-                break
-                
-            try:
-                self.progress_updated.emit(5, "Příprava...")
-                
-                local_params = self.params.copy()
-                local_params['zoom'] = z
-                processor = MapProcessor(local_params)
-                
-                coords_text = local_params.get('manual_coordinates', '0 0')
-                parsed_coords = self.main_window.parse_coordinates(coords_text)
-                if not parsed_coords: 
-                    raise ValueError("Neplatné souřadnice")
+        # prefetch dlaždic po dobu náhledů stojí – nesoupeří o limiter
+        with foreground_render():
+            self._run_previews()
+
+    def _run_previews(self):
+        try:
+            first_params = self.jobs[0][2]
+            parsed_coords = self.main_window.parse_coordinates(first_params.get('manual_coordinates', '0 0'))
+            if not parsed_coords:
+                raise ValueError("Neplatné souřadnice")
+            lat, lon = parsed_coords
+
+            # Jeden engine (bez Qt) pro všechny náhledy – sdílí zdroj dlaždic, cache i limiter
+            engine = MapEngine(first_params)
+            engine.get_tile_source()  # chybný offline zdroj → chyba náhledu
+            self.scheduler = TileScheduler(engine.get_tile_image, workers=engine.TILE_WORKERS, name="preview-tiles")
+        except Exception as e:
+            for row, zoom, _params in self.jobs:
+                self.error_occurred.emit(row, zoom, str(e))
+            return
 
-                lat, lon = parsed_coords
+        states = []
+        for row, zoom, params in self.jobs:
+            try:
+                self.progress_updated.emit(row, zoom, 5, "Příprava...")
+                local_params = dict(params, zoom=zoom)
                 width_px = int(local_params.get('output_width_cm', 10) / 2.54 * local_params.get('output_dpi', 300))
                 height_px = int(local_params.get('output_height_cm', 10) / 2.54 * local_params.get('output_dpi', 300))
+                states.append({
+                    'row': row, 'zoom': zoom,
+                    'canvas': ProgressiveCanvas(engine, lat, lon, zoom, width_px, height_px),
+                    'meta': {'zoom': zoom, 'params': local_params, 'dimensions_px': (width_px, height_px)},
+                    'lock': threading.Lock(), 'done': 0, 'last_emit': 0.0, 'finished': False,
+                })
+            except Exception as e:
+                self.error_occurred.emit(row, zoom, str(e))
 
-                self.progress_updated.emit(15, "Stahování dlaždic...")
-                
-                # Modifikovaná verze download_map_tiles s progress callbackem
-                img = self.download_map_tiles_with_progress(processor, lat, lon, z, width_px, height_px)
-                
-                if img is None: 
-                    raise ValueError("Nepodařilo se vygenerovat obrázek.")
+        # Hrubé snímky z cache – nejdřív prioritní zoom
+        states.sort(key=lambda st: (self._zoom_priority(st['zoom']), st['row']))
+        for st in states:
+            if not self._is_running:
+                break
+            canvas = st['canvas']
+            self.progress_updated.emit(st['row'], st['zoom'], 10, "Náhled z cache...")
+            canvas.coarse_pass(lambda: not self._is_running)
+            st['done'] = canvas.total - len(canvas.missing)
+            if canvas.exact or canvas.approximated:
+                self.map_progressive.emit(st['row'], st['zoom'], canvas.snapshot(), st['meta'])
+
+        # Chybějící dlaždice všech náhledů do jedné fronty (duplicitní se sloučí)
+        with self._lock:
+            self._remaining = len(states)
+        for st in states:
+            missing = st['canvas'].missing
+            if not missing:
+                self._finish(st)
+                continue
+            for order, (rel, x, y, z) in enumerate(missing):
+                self.scheduler.request(
+                    (x, y, z), (self._zoom_priority(st['zoom']), order, st['row']),
+                    lambda key, img, st=st, rel=rel: self._on_tile(st, rel, img),
+                )
 
-                meta = {'zoom': z, 'params': local_params, 'dimensions_px': (width_px, height_px)}
-                
-                self.progress_updated.emit(100, "Dokončeno")
-                self.map_generated.emit(z, img, meta)
-                
-            except Exception as e:
-                if self._is_running: 
-                    self.error_occurred.emit(z, str(e))
+        while self._is_running and not self._all_done.wait(0.1):
+            pass
 
-        self.finished.emit()
+        self.scheduler.shutdown()
 
-    def download_map_tiles_with_progress(self, processor, lat, lon, zoom, width_px, height_px):
-        """Stahování dlaždic s progress reportingem."""
-        try:
-            import math, requests, io
-            from PIL import Image as PILImage
-            
-            tile_size = 256
-            n = 2.0 ** zoom
-            
-            # Výpočet potřebných dlaždic
-            lat_rad = math.radians(lat)
-            tile_x_f = (lon + 180.0) / 360.0 * n
-            tile_y_f = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
-            
-            center_px_x = tile_x_f * tile_size
-            center_px_y = tile_y_f * tile_size
-            
-            left = int(math.floor(center_px_x - width_px / 2))
-            top = int(math.floor(center_px_y - height_px / 2))
-            right = left + width_px
-            bottom = top + height_px
-            
-            left_tile = int(math.floor(left / tile_size))
-            top_tile = int(math.floor(top / tile_size))
-            right_tile = int(math.floor((right - 1) / tile_size))
-            bottom_tile = int(math.floor((bottom - 1) / tile_size))
-            
-            tiles_x = right_tile - left_tile + 1
-            tiles_y = bottom_tile - top_tile + 1
-            total_tiles = tiles_x * tiles_y
-            
-            # Vytvoření prázdného obrázku
-            full_width = tiles_x * tile_size
-            full_height = tiles_y * tile_size
-            full_image = PILImage.new('RGB', (full_width, full_height), color='lightgray')
-            
-            downloaded = 0
-            
-            # Stahování dlaždic s progress updatem
-            for tx in range(left_tile, right_tile + 1):
-                for ty in range(top_tile, bottom_tile + 1):
-                    if not self._is_running:
-                        return None
-                        
-                    try:
-                        xt = int(tx % int(n))
-                        if ty < 0 or ty >= int(n):
-                            downloaded += 1
-                            continue
-                            
-                        url = f"https://tile.openstreetmap.org/{zoom}/{xt}/{ty}.png"
-                        headers = {'User-Agent': 'OSM Map Generator - Preview/1.3'}
-                        
-                        r = requests.get(url, headers=headers, timeout=8)
-                        if r.status_code == 200 and r.content:
-                            img = PILImage.open(io.BytesIO(r.content)).convert('RGB')
-                            px = (tx - left_tile) * tile_size
-                            py = (ty - top_tile) * tile_size
-                            full_image.paste(img, (px, py))
-                            
-                    except Exception:
-                        pass  # Ignorovat chyby jednotlivých dlaždic
-                        
-                    downloaded += 1
-                    
-                    # Update progress (15% až 85% pro stahování)
-                    progress = 15 + int((downloaded / total_tiles) * 70)
-                    self.progress_updated.emit(progress, f"Dlaždice {downloaded}/{total_tiles}")
-            
-            # Výřez na požadovanou velikost
-            self.progress_updated.emit(90, "Zpracování...")
-            
-            crop_left = left - left_tile * tile_size
-            crop_top = top - top_tile * tile_size
-            
-            cropped = full_image.crop((
-                crop_left,
-                crop_top,
-                crop_left + width_px,
-                crop_top + height_px
-            ))
-            
-            return cropped
-            
-        except Exception as e:
-            self.progress_updated.emit(0, f"Chyba: {str(e)}")
-            return None
+    def _on_tile(self, st, rel, img):
+        """Callback plánovače (vlákno workeru): vložit dlaždici a ohlásit průběh náhledu."""
+        if not self._is_running:
+            return
+        canvas = st['canvas']
+        with st['lock']:
+            if st['finished']:
+                return
+            canvas.paste(rel, img)
+            st['done'] += 1
+            total = max(1, canvas.total)
+            done = st['done'] >= canvas.total
+            snapshot = None
+            now = time.monotonic()
+            if not done and now - st['last_emit'] >= self.PROGRESSIVE_INTERVAL_S:
+                st['last_emit'] = now
+                snapshot = canvas.snapshot()
+        self.progress_updated.emit(st['row'], st['zoom'], 15 + int((st['done'] / total) * 70),
+                                   f"Dlaždice {st['done']}/{total}")
+        if snapshot is not None:
+            self.map_progressive.emit(st['row'], st['zoom'], snapshot, st['meta'])
+        if done:
+            self._finish(st)
+
+    def _finish(self, st):
+        with st['lock']:
+            if st['finished']:
+                return
+            st['finished'] = True
+        self.progress_updated.emit(st['row'], st['zoom'], 100, "Dokončeno")
+        self.map_generated.emit(st['row'], st['zoom'], st['canvas'].image, st['meta'])
+        with self._lock:
+            self._remaining -= 1
+            if self._remaining <= 0:
+                self._all_done.set()
 
     def stop(self):
-        """Zastavení vlákna."""
+        """Zastavení plánovače (čekající dlaždice se zahodí)."""
         self._is_running = False
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        self._all_done.set()
 
 
 class MultiZoomPreviewDialog(QDialog):
@@ -600,43 +615,31 @@ class MultiZoomPreviewDialog(QDialog):
         return [base_zoom - 1, base_zoom, base_zoom + 1]
 
     def start_initial_generation(self):
-        # Generování pro první řadu (pokud povolena)
-        if self.preview_config['row1_enabled']:
+        """Všechny náhledy (obě řady) přes jeden plánovač dlaždic – viz PreviewSchedulerThread."""
+        jobs = []
+        rows = ((0, 'row1', self.previews), (1, 'row2', self.extra_dpi_previews))
+        for row, prefix, previews in rows:
+            if not self.preview_config[f'{prefix}_enabled']:
+                continue
+            params_row = self.params.copy()
+            params_row['output_dpi'] = self.preview_config[f'{prefix}_dpi']
             for zoom in self.get_zooms_to_generate():
-                if preview := self.previews.get(zoom):
-                    params_row1 = self.params.copy()
-                    params_row1['output_dpi'] = self.preview_config['row1_dpi']
-                    
+                if zoom in previews:
                     # Zobrazit progress bar na začátku
-                    self.show_preview_progress(0, zoom, True)
-                    self.update_preview_progress(0, zoom, 0, "Čekání...")
-                    
-                    thread = MapGenerationThread(params_row1, zoom, self.parent(), self)
-                    thread.map_generated.connect(lambda z, img, meta, row=0: self.on_map_generated(z, img, meta, row))
-                    thread.error_occurred.connect(lambda z, err, row=0: self.on_map_error(z, err, row))
-                    thread.progress_updated.connect(lambda p, msg, row=0, z=zoom: self.update_preview_progress(row, z, p, msg))
-                    thread.finished.connect(lambda z=zoom: self.threads.pop(f"{z}_0", None))
-                    thread.start()
-                    self.threads[f"{zoom}_0"] = thread
-    
-        # Generování pro druhou řadu (pokud povolena)
-        if self.preview_config['row2_enabled']:
-            for zoom in self.get_zooms_to_generate():
-                if preview := self.extra_dpi_previews.get(zoom):
-                    params_row2 = self.params.copy()
-                    params_row2['output_dpi'] = self.preview_config['row2_dpi']
-                    
-                    # Zobrazit progress bar na začátku
-                    self.show_preview_progress(1, zoom, True)
-                    self.update_preview_progress(1, zoom, 0, "Čekání...")
-                    
-                    thread = MapGenerationThread(params_row2, zoom, self.parent(), self)
-                    thread.map_generated.connect(lambda z, img, meta, row=1: self.on_map_generated(z, img, meta, row))
-                    thread.error_occurred.connect(lambda z, err, row=1: self.on_map_error(z, err, row))
-                    thread.progress_updated.connect(lambda p, msg, row=1, z=zoom: self.update_preview_progress(row, z, p, msg))
-                    thread.finished.connect(lambda z=zoom: self.threads.pop(f"{z}_1", None))
-                    thread.start()
-                    self.threads[f"{zoom}_1"] = thread
+                    self.show_preview_progress(row, zoom, True)
+                    self.update_preview_progress(row, zoom, 0, "Čekání...")
+                    jobs.append((row, zoom, params_row))
+        if not jobs:
+            return
+
+        thread = PreviewSchedulerThread(jobs, self.parent(), priority_zoom=self.initial_zoom_to_select, parent=self)
+        thread.map_generated.connect(lambda row, z, img, meta: self.on_map_generated(z, img, meta, row))
+        thread.map_progressive.connect(lambda row, z, img, meta: self.on_map_progressive(z, img, meta, row))
+        thread.error_occurred.connect(lambda row, z, err: self.on_map_error(z, err, row))
+        thread.progress_updated.connect(self.update_preview_progress)
+        thread.finished.connect(lambda: self.threads.pop("scheduler", None))
+        thread.start()
+        self.threads["scheduler"] = thread
 
     def update_all_markers(self):
         for preview in self.previews.values():
@@ -706,6 +709,7 @@ class MultiZoomPreviewDialog(QDialog):
         current_previews = self.previews if row == 0 else self.extra_dpi_previews
         
         if preview := current_previews.get(zoom):
+            preview.is_final = True
             preview.base_image = img
             preview.meta = meta
             self.draw_marker_and_display(preview, img)
@@ -721,6 +725,24 @@ class MultiZoomPreviewDialog(QDialog):
                 self.on_preview_selected(zoom, 0)
                 self.initial_zoom_to_select = None
 
+    @Slot(int, object, dict)
+    def on_map_progressive(self, zoom, img, meta, row=0):
+        """Průběžný snímek náhledu – hned zobrazit a umožnit výběr, finální obraz přijde v on_map_generated."""
+        current_previews = self.previews if row == 0 else self.extra_dpi_previews
+        preview = current_previews.get(zoom)
+        if not preview or preview.is_final:
+            return
+        preview.base_image = img
+        preview.meta = meta
+        self.draw_marker_and_display(preview, img)
+        dpi_info = f"{meta.get('params', {}).get('output_dpi', 300)} DPI"
+        preview.set_title(f"<b>Zoom {zoom}</b><br><small>{dpi_info}</small><br><small>⏳ zpřesňuji…</small>")
+
+        if (row == 0 and self.initial_zoom_to_select and
+                zoom == self.initial_zoom_to_select):
+            self.on_preview_selected(zoom, 0)
+            self.initial_zoom_to_select = None
+
     def on_preview_selected(self, zoom, row):
         current_previews = self.previews if row == 0 else self.extra_dpi_previews
         preview = current_previews.get(zoom)
@@ -738,6 +760,11 @@ class MultiZoomPreviewDialog(QDialog):
         preview.select()
         self.selected_zoom = zoom
         self.selected_row = row
+
+        # Zbývající dlaždice vybraného zoomu dostanou v plánovači přednost
+        scheduler_thread = self.threads.get("scheduler")
+        if scheduler_thread is not None:
+            scheduler_thread.set_priority_zoom(zoom)
         
         self.btn_save.setEnabled(True)
         
@@ -815,6 +842,12 @@ class MultiZoomPreviewDialog(QDialog):
         params_to_save = preview.meta['params'].copy()
         params_to_save['marker_size'] = self.spin_marker_size.value()
         params_to_save['marker_style'] = 'cross' if self.combo_marker_style.currentIndex() == 1 else 'dot'
+        # Rozměry se zapíší do metadat rovnou při uložení (bez druhého dekódování a kódování)
+        params_to_save['extra_text_meta'] = {
+            "Output_Width_cm": f"{float(params_to_save.get('output_width_cm', 10)):.3f}",
+            "Output_Height_cm": f"{float(params_to_save.get('output_height_cm', 10)):.3f}",
+            "Output_DPI": str(int(params_to_save.get('output_dpi', 300))),
+        }
 
         self.save_progress_dialog = QProgressDialog("Generuji a ukládám mapu...", "Zrušit", 0, 100, self)
         self.save_progress_dialog.setWindowModality(Qt.WindowModal)
@@ -893,20 +926,7 @@ class MultiZoomPreviewDialog(QDialog):
 
     @Slot(str)
     def on_save_finished(self, path):
-        try:
-            current_previews = self.previews if self.selected_row == 0 else self.extra_dpi_previews
-            preview = current_previews.get(self.selected_zoom)
-            if preview and preview.meta:
-                params = preview.meta['params']
-                width_cm = float(params.get('output_width_cm', 10))
-                height_cm = float(params.get('output_height_cm', 10)) 
-                dpi = int(params.get('output_dpi', 300))
-                
-                self.add_size_metadata_to_png(path, width_cm, height_cm, dpi)
-            
-        except Exception as e:
-            self.parent().log_widget.add_log(f"❌ Chyba při přidávání metadat: {e}", "error")
-        
+        # Output_Width_cm / Output_Height_cm / Output_DPI zapsal už render (extra_text_meta)
         self.cleanup_save_operation()
         QMessageBox.information(self, "Uloženo", f"Mapa byla úspěšně uložena:\n{path}")
         self.parent().refresh_file_tree()
@@ -1610,8 +1630,6 @@ class FourLeafCounterWidget(QWidget):
         Vykreslí text s tmavým obrysem. Pokud je self._prefer_ui_text_style True,
         POUŽIJE VŽDY self.text_color_rgba a self.text_size_px bez ohledu na předané argumenty.
         """
-        from PIL import ImageFont
-    
         prefer = getattr(self, "_prefer_ui_text_style", True)
         if prefer:
             fill = getattr(self, "text_color_rgba", (255, 255, 255, 255))
@@ -1622,16 +1640,8 @@ class FourLeafCounterWidget(QWidget):
             if font_size_px is None:
                 font_size_px = getattr(self, "text_size_px", 64)
     
-        # volba písma (bezpečné fallbacky na macOS)
-        font = None
-        for cand in ("Menlo.ttf", "Menlo.ttc", "Helvetica.ttc", "Arial.ttf"):
-            try:
-                font = ImageFont.truetype(cand, font_size_px)
-                break
-            except Exception:
-                pass
-        if font is None:
-            font = ImageFont.load_default()
+        # volba písma (bezpečné fallbacky na macOS) – vyřešeno jednou, fonty cachované v registru
+        font = font_registry.get_chain_font("counter", font_size_px)
     
         # obrys
         ox = max(1, int(outline_width))
@@ -1971,22 +1981,10 @@ class MainWindow(QMainWindow):
             return False
     
         try:
-            from PIL import Image
-            with Image.open(str(p)) as img:
-                kv = {}
-                try:
-                    if hasattr(img, "text") and img.text:
-                        kv = dict(img.text)
-                except Exception:
-                    kv = {}
-    
-                for k, v in kv.items():
-                    if str(k).strip() == "AOI_POLYGON":
-                        return bool(str(v).strip())
+            info = get_location_index().get(p)
+            return bool(info and info.has_polygon)
         except Exception:
             return False
-    
-        return False
         
     # ✅ ÚPRAVA 2 — HELPER: ZAJIŠTĚNÍ SLOUPCE + PŘEKRESLENÍ
     # Soubor: main_window.py
@@ -2044,25 +2042,16 @@ class MainWindow(QMainWindow):
             return False
     
         try:
-            from PIL import Image
-            with Image.open(str(p)) as img:
-                kv = {}
-                try:
-                    if hasattr(img, "text") and img.text:
-                        kv = dict(img.text)
-                    elif "parameters" in img.info:
-                        kv = {"parameters": str(img.info.get("parameters", ""))}
-                except Exception:
-                    kv = {}
+            kv = read_png_text(str(p))  # jen chunky před IDAT, bez dekódování obrázku
     
-                def _norm(s: str) -> str:
-                    return str(s).strip().lower()
+            def _norm(s: str) -> str:
+                return str(s).strip().lower()
     
-                for k, v in kv.items():
-                    nk = _norm(k)
-                    if nk in ("anonymizovaná lokace", "anonymizovana lokace"):
-                        vv = _norm(v)
-                        return vv in ("ano", "yes", "true", "1")
+            for k, v in kv.items():
+                nk = _norm(k)
+                if nk in ("anonymizovaná lokace", "anonymizovana lokace"):
+                    vv = _norm(v)
+                    return vv in ("ano", "yes", "true", "1")
         except Exception:
             return False
     
@@ -2106,54 +2095,21 @@ class MainWindow(QMainWindow):
         icon_no = style.standardIcon(QStyle.SP_DialogCancelButton)
         empty_icon = QIcon()
     
-        def read_meta_map(png_path: str) -> dict:
-            try:
-                return self._read_png_text_meta(png_path) or {}
-            except Exception:
-                return {}
-    
-        def has_anon_flag(meta: dict) -> bool:
-            try:
-                for k in ("Anonymizovaná lokace", "Anonymizovana lokace"):
-                    if k in meta:
-                        v = str(meta.get(k) or "").strip().lower()
-                        return v in ("ano", "yes", "true", "1")
-            except Exception:
-                pass
-            return False
+        location_index = get_location_index()
     
-        def has_polygon(meta: dict) -> bool:
+        def read_map_info(png_path: str):
             try:
-                v = meta.get("AOI_POLYGON")
-                if v is None:
-                    for k, vv in meta.items():
-                        if str(k).strip().upper() == "AOI_POLYGON":
-                            v = vv
-                            break
-                return bool(str(v or "").strip())
+                return location_index.get(png_path)
             except Exception:
-                return False
+                return None
     
-        def parse_area_m2(meta: dict) -> str | None:
-            try:
-                raw = None
-                if "AOI_AREA_M2" in meta:
-                    raw = meta.get("AOI_AREA_M2")
-                else:
-                    for k, v in meta.items():
-                        if str(k).strip().upper() == "AOI_AREA_M2":
-                            raw = v
-                            break
-                if raw is None:
-                    return None
-                s = str(raw).strip()
-                try:
-                    val = float(s.replace(",", "."))
-                    return f"{val:.2f}"
-                except Exception:
-                    return s if s else None
-            except Exception:
+        def format_area_m2(info) -> str | None:
+            if info is None:
                 return None
+            if info.area_m2 is not None:
+                return f"{info.area_m2:.2f}"
+            raw = str(info.area_raw or "").strip()
+            return raw or None
     
         def guess_path(item: QTreeWidgetItem) -> Path | None:
             # preferuj uloženou cestu v UserRole
@@ -2193,9 +2149,9 @@ class MainWindow(QMainWindow):
                     process_item(item.child(i))
                 return
     
-            meta = read_meta_map(str(p))
-            is_anon = has_anon_flag(meta)
-            has_poly = has_polygon(meta)
+            info = read_map_info(str(p))
+            is_anon = bool(info and info.anonymized)
+            has_poly = bool(info and info.has_polygon)
     
             # Sloupec „Anonymizace“
             try:
@@ -2213,7 +2169,7 @@ class MainWindow(QMainWindow):
             # Sloupec „Polygon“ + plocha AOI_AREA_M2
             try:
                 if has_poly:
-                    area = parse_area_m2(meta)  # např. '468.58'
+                    area = format_area_m2(info)  # např. '468.58'
                     item.setIcon(col_poly, icon_yes)
                     if area:
                         item.setText(col_poly, f"Ano ({area} m²)")
@@ -2241,40 +2197,15 @@ class MainWindow(QMainWindow):
     def add_anonymized_location_flag(self, png_path: str, suppress_ui: bool = False) -> bool:
         """
         Připíše textový příznak 'Anonymizovaná lokace' do metadat PNG (tEXt).
-        Zachová stávající textová metadata i DPI.
+        Zachová stávající textová metadata i DPI, obraz se nepřekódovává.
         """
         try:
             p = Path(png_path)
             if p.suffix.lower() != ".png" or not p.exists():
                 return False
     
-            from PIL import Image
-            from PIL.PngImagePlugin import PngInfo
-    
-            with Image.open(str(p)) as img:
-                # existující textová metadata
-                existing_text = {}
-                try:
-                    if hasattr(img, "text") and img.text:
-                        existing_text = dict(img.text)
-                except Exception:
-                    existing_text = {}
-    
-                pnginfo = PngInfo()
-                for k, v in existing_text.items():
-                    if str(k).strip().lower() != "anonymizovaná lokace":
-                        try:
-                            pnginfo.add_text(str(k), str(v))
-                        except Exception:
-                            continue
-    
-                try:
-                    pnginfo.add_text("Anonymizovaná lokace", "Ano")
-                except Exception:
-                    pnginfo.add_text("Anonymizovana lokace", "Ano")
-    
-                dpi = img.info.get("dpi", (72, 72))
-                img.save(str(p), "PNG", pnginfo=pnginfo, dpi=dpi)
+            # jen výměna textového chunku – obrazová data, DPI i ostatní metadata zůstanou bajt po bajtu
+            update_png_text(p, {"Anonymizovaná lokace": "Ano"}, ignore_case=True)
     
             try:
                 if hasattr(self, "log_widget"):
@@ -2331,7 +2262,7 @@ class MainWindow(QMainWindow):
     def remove_anonymized_location_flag(self, png_path: str, suppress_ui: bool = False) -> bool:
         """
         Odstraní z PNG textové metadata s klíčem 'Anonymizovaná lokace' (případně bez diakritiky).
-        Zachová ostatní textová metadata i DPI.
+        Zachová ostatní textová metadata i DPI, obraz se nepřekódovává.
     
         Args:
             png_path: Cesta k PNG souboru.
@@ -2345,41 +2276,17 @@ class MainWindow(QMainWindow):
             if p.suffix.lower() != ".png" or not p.exists():
                 return False
     
-            from PIL import Image
-            from PIL.PngImagePlugin import PngInfo
-    
-            with Image.open(str(p)) as img:
-                # Načti existující textová metadata
-                existing_text = {}
-                try:
-                    if hasattr(img, "text") and img.text:
-                        existing_text = dict(img.text)
-                except Exception:
-                    existing_text = {}
-    
-                # Připrav nové PNG info bez našich klíčů
-                pnginfo = PngInfo()
-                removed = False
-                for k, v in existing_text.items():
-                    kl = str(k).strip().lower()
-                    if kl in ("anonymizovaná lokace", "anonymizovana lokace"):
-                        removed = True
-                        continue  # přeskočit – tím se příznak odstraní
-                    try:
-                        pnginfo.add_text(str(k), str(v))
-                    except Exception:
-                        continue
-    
-                # Zachovat DPI, pokud existuje
-                dpi = img.info.get("dpi", (72, 72))
-                img.save(str(p), "PNG", pnginfo=pnginfo, dpi=dpi)
+            # odebrání textových chunků; bez nalezeného klíče se soubor vůbec nepřepisuje
+            removed = update_png_text(
+                p, remove_keys=("Anonymizovaná lokace", "Anonymizovana lokace"), ignore_case=True
+            ) > 0
     
             try:
                 if hasattr(self, "log_widget"):
                     if removed:
                         self.log_widget.add_log(f"🗑️ Z metadat odstraněn příznak „Anonymizovaná lokace“: {p.name}", "info")
                     else:
-                        self.log_widget.add_log(f"ℹ️ Příznak „Anonymizovaná lokace“ nebyl v {p.name} nalezen (soubor přepsán beze změny příznaku).", "warning")
+                        self.log_widget.add_log(f"ℹ️ Příznak „Anonymizovaná lokace“ nebyl v {p.name} nalezen (soubor ponechán beze změny).", "warning")
             except Exception:
                 pass
     
@@ -4852,9 +4759,7 @@ class MainWindow(QMainWindow):
         """
         try:
             from pathlib import Path
-            from PIL import Image
-            from PIL.PngImagePlugin import PngInfo
-            import json, math, re, tempfile, os
+            import json, math, re
     
             p = Path(png_path)
             if p.suffix.lower() != ".png" or not p.exists():
@@ -4863,24 +4768,14 @@ class MainWindow(QMainWindow):
             # --- 1) Načtení polygonu z metadat (AOI_POLYGON) ---
             def _read_polygon_points(path: Path):
                 try:
-                    with Image.open(str(path)) as im:
-                        # Primárně img.text, případně fallback na info
-                        meta = {}
-                        try:
-                            if hasattr(im, "text") and im.text:
-                                meta = dict(im.text)
-                        except Exception:
-                            meta = {}
-                        if not meta and hasattr(im, "info") and im.info:
-                            meta = dict(im.info)
-                        raw = meta.get("AOI_POLYGON")
-                        if not raw:
-                            return None
-                        data = json.loads(raw)
-                        pts = data.get("points") or []
-                        if not isinstance(pts, list) or len(pts) < 3:
-                            return None
-                        return [(float(x), float(y)) for x, y in pts]
+                    raw = read_png_text(str(path)).get("AOI_POLYGON")
+                    if not raw:
+                        return None
+                    data = json.loads(raw)
+                    pts = data.get("points") or []
+                    if not isinstance(pts, list) or len(pts) < 3:
+                        return None
+                    return [(float(x), float(y)) for x, y in pts]
                 except Exception:
                     return None
     
@@ -4965,43 +4860,9 @@ class MainWindow(QMainWindow):
             area_str = f"{area_m2:.2f}"
     
             # --- 5) Zápis 'AOI_AREA_M2' do PNG text metadat ---
+            # (výměna textového chunku, obraz i ostatní chunky se kopírují beze změny, atomicky)
             try:
-                with Image.open(str(p)) as im:
-                    # Načti existující textová metadata
-                    existing = {}
-                    try:
-                        if hasattr(im, "text") and im.text:
-                            existing = dict(im.text)
-                    except Exception:
-                        existing = {}
-    
-                    pinfo = PngInfo()
-                    for k, v in existing.items():
-                        # přepiš klíč AOI_AREA_M2, ostatní zkopíruj
-                        if str(k).strip().upper() != "AOI_AREA_M2":
-                            try:
-                                pinfo.add_text(str(k), str(v))
-                            except Exception:
-                                pass
-                    pinfo.add_text("AOI_AREA_M2", area_str)
-    
-                    save_kwargs = {}
-                    dpi = im.info.get("dpi")
-                    if isinstance(dpi, tuple):
-                        save_kwargs["dpi"] = dpi
-    
-                    # Bezpečné přepsání přes dočasný soubor
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                        tmp_path = Path(tmp.name)
-                    try:
-                        im.save(tmp_path, format="PNG", pnginfo=pinfo, **save_kwargs)
-                        os.replace(tmp_path, p)
-                    finally:
-                        try:
-                            if tmp_path.exists():
-                                tmp_path.unlink(missing_ok=True)
-                        except Exception:
-                            pass
+                update_png_text(p, {"AOI_AREA_M2": area_str}, ignore_case=True)
             except Exception as e:
                 try:
                     if hasattr(self, "log_widget"):
@@ -5673,6 +5534,9 @@ class MainWindow(QMainWindow):
     
                     # 🔸 nově: volba anonymizace z GUI
                     params['anonymizovana_lokace'] = bool(self.checkbox_anonymni_lokace.isChecked())
+                    # Soubor se nahrazuje na místě → vždy PNG; cm/DPI/značka rovnou do metadat
+                    params['output_profile'] = output_encoder.png_profile(self._output_profile())
+                    params['extra_text_meta'] = self._output_params_text_meta()
     
                     local_thread = ProcessorThread(params)
     
@@ -5721,11 +5585,7 @@ class MainWindow(QMainWindow):
                         fail += 1
                         continue
     
-                    try:
-                        self.embed_output_params_into_png(out_path)
-                    except Exception as e:
-                        self.log_widget.add_log(f"⚠️ Metadata (cm/DPI) do PNG selhala pro {Path(out_path).name}: {e}", "warning")
-                        dlg.append_log(f"⚠️ Metadata PNG selhala: {e}")
+                    # Metadata cm/DPI/značky zapsal už render (extra_text_meta)
     
                     # Zachovat metadata ze snapshotu → anonymizační příznak kopíruj jen pokud checkbox není zaškrtnutý
                     try:
@@ -5835,6 +5695,9 @@ class MainWindow(QMainWindow):
     
             # 🔸 nově: volba anonymizace z GUI
             params['anonymizovana_lokace'] = bool(self.checkbox_anonymni_lokace.isChecked())
+            # Soubor se nahrazuje na místě → vždy PNG; cm/DPI/značka rovnou do metadat
+            params['output_profile'] = output_encoder.png_profile(self._output_profile())
+            params['extra_text_meta'] = self._output_params_text_meta()
     
             # Dialog průběhu (jako u hromadného přegenerování)
             from PySide6.QtWidgets import QApplication
@@ -5914,13 +5777,7 @@ class MainWindow(QMainWindow):
                 dlg.accept()
                 return
     
-            # Dopsat metadata a atomicky nahradit
-            try:
-                self.embed_output_params_into_png(out_path)
-            except Exception as e:
-                dlg.append_log(f"⚠️ Metadata PNG selhala: {e}")
-                if hasattr(self, 'log_widget'):
-                    self.log_widget.add_log(f"⚠️ Metadata (cm/DPI) do PNG selhala pro {Path(out_path).name}: {e}", "warning")
+            # Metadata cm/DPI/značky zapsal už render (extra_text_meta); zbývá atomicky nahradit
     
             # Zachovat metadata ze snapshotu → anonymizační příznak kopíruj jen pokud checkbox není zaškrtnutý
             try:
@@ -5961,14 +5818,11 @@ class MainWindow(QMainWindow):
         """
         Zkopíruje vybraná *textová* metadata ze zdroje (snapshot nebo src_png) do cílového PNG (dst_png),
         při zachování již existujících metadat v cíli. Přepíše/doplní pouze zadané klíče.
-        Pro klíče s diakritikou ukládá i iTXt a ASCII fallback jako tEXt.
+        Pro klíče s diakritikou ukládá i ASCII fallback. Cílové PNG se nepřekódovává.
         """
         try:
-            from PIL import Image
-            from PIL.PngImagePlugin import PngInfo
             from pathlib import Path
             import unicodedata as _ud
-            import os
     
             preserve_keys = keys or ["Anonymizovaná lokace", "Anonymizovana lokace", "AOI_AREA_M2"]
     
@@ -6009,8 +5863,8 @@ class MainWindow(QMainWindow):
     
             dst_meta = _collect_text_meta(dst_p)
     
-            # Sloučení: ponecháme vše z cíle a přepíšeme/ doplníme požadované klíče ze zdroje
-            merged = dict(dst_meta)
+            # Ponecháme vše z cíle a přepíšeme/ doplníme jen požadované klíče ze zdroje
+            updates = {}
             src_cf = _casefold_map(src_meta)
     
             for want in preserve_keys:
@@ -6023,36 +5877,23 @@ class MainWindow(QMainWindow):
                 value = src_meta.get(src_key, "")
                 if value is None:
                     value = ""
-                merged[src_key] = value
+                updates[src_key] = str(value)
                 ascii_key = _ascii_fallback(src_key)
                 if ascii_key != src_key and _is_latin1_printable(ascii_key):
-                    merged[ascii_key] = value
+                    updates[ascii_key] = str(value)
     
-            # Zápis — replikujeme VŠECHNA merged metadata (iTXt + tEXt kde lze)
+            if not updates or all(dst_meta.get(k) == v for k, v in updates.items()):
+                return True
+    
+            # Zápis — jen textové chunky; obraz, DPI i ICC profil cíle se kopírují beze změny
             try:
-                with Image.open(str(dst_p)) as im_dst:
-                    dpi = im_dst.info.get("dpi", (72, 72))
-                    icc = im_dst.info.get("icc_profile")
-                    pinfo = PngInfo()
-                    for k, v in merged.items():
-                        if not isinstance(v, str):
-                            v = str(v)
-                        try:
-                            if hasattr(pinfo, "add_itxt"):
-                                pinfo.add_itxt(str(k), v)
-                        except Exception:
-                            pass
-                        if _is_latin1_printable(k):
-                            try:
-                                pinfo.add_text(str(k), v)
-                            except Exception:
-                                pass
-                    tmp = dst_p.with_suffix(".meta.tmp.png")
-                    save_kwargs = {"pnginfo": pinfo, "dpi": dpi}
-                    if icc:
-                        save_kwargs["icc_profile"] = icc
-                    im_dst.save(str(tmp), "PNG", **save_kwargs)
-                os.replace(str(tmp), str(dst_p))
+                chunks = []
+                for k, v in updates.items():
+                    try:
+                        chunks.append(png_text_chunk(k, v))
+                    except ValueError:
+                        continue
+                update_png_text(dst_p, chunks=chunks)
             except Exception:
                 return False
     
@@ -6081,7 +5922,12 @@ class MainWindow(QMainWindow):
     def _read_png_text_meta(self, png_path):
         """
         Bezpečně načte textová metadata z PNG (tEXt, zTXt, iTXt) a vrátí je jako dict[str,str].
+        PNG se čte po chunkách jen do prvního IDAT (core.png_chunks); Pillow jen pro jiné formáty.
         """
+        try:
+            return read_png_text(str(png_path))
+        except Exception:
+            pass
         try:
             from PIL import Image
             meta = {}
@@ -8379,79 +8225,11 @@ class MainWindow(QMainWindow):
     def _heic_extract_gps_decimal(self, heic_path: str):
         """
         Vrátí tuple (lat, lon) v desetinných stupních z HEIC souboru, nebo None pokud GPS není dostupné.
-        Využívá pillow_heif + Pillow + piexif (pokud je k dispozici).
+        Čte jen hlavičky souboru přes core.photo_metadata (bez dekódování obrázku).
         Neprovádí žádné vedlejší efekty mimo čtení souboru.
         """
         try:
-            from PIL import Image
-            try:
-                import pillow_heif  # umožní Pillow otevřít HEIC
-                pillow_heif.register_heif_opener()
-            except Exception:
-                pass  # pokusíme se otevřít i bez registrace (pokud už je registrováno jinde)
-    
-            with Image.open(heic_path) as im:
-                exif_bytes = im.info.get("exif")
-                if not exif_bytes:
-                    return None
-    
-            # Přečíst EXIF jako dict (piexif je spolehlivý pro GPS parse)
-            try:
-                import piexif
-                exif_dict = piexif.load(exif_bytes)
-                gps_ifd = exif_dict.get("GPS", {})
-            except Exception:
-                gps_ifd = {}
-    
-            if not gps_ifd:
-                return None
-    
-            # Helpers
-            def _rat_to_float(rat):
-                # piexif vrací buď tuple (num, den) nebo objekt s .numerator/.denominator
-                try:
-                    if isinstance(rat, tuple):
-                        num, den = rat
-                        return float(num) / float(den) if den else 0.0
-                    return float(rat.numerator) / float(rat.denominator)
-                except Exception:
-                    return 0.0
-    
-            def _dms_to_deg(dms):
-                # očekává trojici racionálních čísel [deg, min, sec]
-                if not dms or len(dms) != 3:
-                    return None
-                d = _rat_to_float(dms[0])
-                m = _rat_to_float(dms[1])
-                s = _rat_to_float(dms[2])
-                return d + (m / 60.0) + (s / 3600.0)
-    
-            # Tagy podle EXIF specifikace
-            lat_ref = gps_ifd.get(1)   # 'N' nebo 'S' (ASCII)
-            lat_dms = gps_ifd.get(2)   # ((deg_num,deg_den), (min_num,min_den), (sec_num,sec_den))
-            lon_ref = gps_ifd.get(3)   # 'E' nebo 'W'
-            lon_dms = gps_ifd.get(4)
-    
-            if not (lat_ref and lat_dms and lon_ref and lon_dms):
-                return None
-    
-            # piexif vrací bytes pro ref, převedeme na str
-            if isinstance(lat_ref, (bytes, bytearray)):
-                lat_ref = lat_ref.decode(errors="ignore")
-            if isinstance(lon_ref, (bytes, bytearray)):
-                lon_ref = lon_ref.decode(errors="ignore")
-    
-            lat = _dms_to_deg(lat_dms)
-            lon = _dms_to_deg(lon_dms)
-            if lat is None or lon is None:
-                return None
-    
-            if lat_ref.upper().startswith("S"):
-                lat = -lat
-            if lon_ref.upper().startswith("W"):
-                lon = -lon
-    
-            return (lat, lon)
+            return read_gps(heic_path)
         except Exception:
             return None
 
@@ -8629,6 +8407,7 @@ class MainWindow(QMainWindow):
     
         self.input_manual_coords = QLineEdit("49,23173° S, 17,42791° V")
         self.input_manual_coords.textChanged.connect(self.test_coordinate_parsing)
+        self.input_manual_coords.textChanged.connect(self._on_tile_params_changed)
         coords_zoom_layout.addWidget(self.input_manual_coords, 1)
     
         self.btn_coords_from_heic = QPushButton("Z HEIC…")
@@ -8937,8 +8716,9 @@ class MainWindow(QMainWindow):
             error_occurred = Signal(str)
             progress_updated = Signal(int, str)
 
-            def __init__(self, lat, lon, zoom, marker_size, marker_style, tw, th, parent=None):
+            def __init__(self, lat, lon, zoom, marker_size, marker_style, tw, th, tile_params=None, parent=None):
                 super().__init__(parent)
+                self.tile_params = dict(tile_params or {})
                 self.lat = float(lat)
                 self.lon = float(lon)
                 self.zoom = int(zoom)
@@ -8952,8 +8732,12 @@ class MainWindow(QMainWindow):
                 return self.isInterruptionRequested()
 
             def run(self):
+                with foreground_render():
+                    self._load_map()
+
+            def _load_map(self):
                 try:
-                    import math, io, time, requests
+                    import math, time
                     from PIL import Image
                     from PIL import Image as PILImage
 
@@ -8998,7 +8782,8 @@ class MainWindow(QMainWindow):
                     ok = 0
                     err = 0
                     bytes_dl = 0
-                    headers = {'User-Agent': 'OSM Map Generator - Preview/1.3'}
+                    processor = MapProcessor({**self.tile_params, 'zoom': self.zoom})
+                    processor.get_tile_source()  # chybný offline zdroj → chyba náhledu, ne prázdná mozaika
                     self.progress_updated.emit(20, f"Stahuji {total} dlaždic…")
 
                     for tx in range(ext_left_tile, ext_right_tile + 1):
@@ -9013,16 +8798,14 @@ class MainWindow(QMainWindow):
                                     self.progress_updated.emit(pct, f"Stahování… {done}/{total}")
                                 continue
                             
-                            url = f"https://tile.openstreetmap.org/{self.zoom}/{xt}/{ty}.png"
                             try:
-                                r = requests.get(url, headers=headers, timeout=8)
-                                if r.status_code == 200 and r.content:
-                                    img = PILImage.open(io.BytesIO(r.content)).convert('RGB')
+                                img = processor.get_tile_image(xt, ty, self.zoom)
+                                if img is not None:
                                     px = (tx - ext_left_tile) * ts
                                     py = (ty - ext_top_tile) * ts
                                     full_image.paste(img, (px, py))
                                     ok += 1
-                                    bytes_dl += len(r.content or b"")
+                                    bytes_dl += img.width * img.height * 3
                                 else:
                                     err += 1
                             except Exception:
@@ -9079,7 +8862,8 @@ class MainWindow(QMainWindow):
         marker_size = self.get_marker_size_from_settings()
         marker_style = self.get_marker_style_from_settings()
         
-        self._map_thread = MapPreviewThread(lat, lon, zoom, marker_size, marker_style, target_w, target_h, parent=self)
+        self._map_thread = MapPreviewThread(lat, lon, zoom, marker_size, marker_style, target_w, target_h,
+                                            tile_params=self._tile_source_params(), parent=self)
         self._map_thread.progress_updated.connect(lambda p, msg: (self.map_progress_bar.setValue(p), self.map_progress_bar.setFormat(msg)))
         self._map_thread.map_loaded.connect(self.on_map_preview_loaded)
         self._map_thread.error_occurred.connect(self.on_map_preview_error)
@@ -9258,7 +9042,7 @@ class MainWindow(QMainWindow):
                 self.log_widget.add_log(f"🗺️ Náhled mapy: {tw}×{th}px • zoom Z{meta.get('zoom')} • marker {meta.get('marker_px')}px", "success")
                 self.log_widget.add_log(f" 📍 Lat/Lon: {meta.get('lat'):.6f}°, {meta.get('lon'):.6f}° • střed tile: x={fracx:.4f}, y={fracy:.4f}", "info")
                 self.log_widget.add_log(f" 🧩 Dlaždice: grid {tiles_x}×{tiles_y} (rozsah: x {l}→{r}, y {t}→{b}) • staženo {ok_tiles}/{total_tiles}, chyby {err_tiles}", "info")
-                self.log_widget.add_log(f" ⏱️ Čas: {elapsed} ms • {kb:.1f} KB", "info")
+                self.log_widget.add_log(f" ⏱️ Čas: {elapsed} ms • {kb:.1f} KB (dekódované dlaždice)", "info")
             except Exception:
                 self.log_widget.add_log("🗺️ Náhled mapy načten.", "success")
 
@@ -9518,18 +9302,7 @@ class MainWindow(QMainWindow):
 
     @Slot(str)
     def on_processing_finished(self, output_path):
-        # … stávající kód nahoře …
-    
-        # 1) Zapiš metadata (cm/DPI + marker) do PNG stejně jako u přegenerování
-        try:
-            self.embed_output_params_into_png(output_path)
-        except Exception as e:
-            if hasattr(self, 'log_widget'):
-                self.log_widget.add_log(
-                    f"⚠️ Metadata (cm/DPI) do PNG selhala pro {Path(output_path).name}: {e}", "warning"
-                )
-    
-        # 2) Pokračuj jako dříve
+        # Metadata cm/DPI/značky zapsal už render (extra_text_meta ze start_processing)
         self.processor_thread.quit()
         self.processor_thread.wait()
         self.btn_start_secondary.setEnabled(True)
@@ -9551,49 +9324,6 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             self.preview_result_image_with_delete()
             
-    def embed_output_params_into_png(self, output_path: str):
-        """Zapíše do PNG metadat výstupní parametry (cm, DPI) a také Marker_Style a Marker_Size_Px; pouze pro .png."""
-        try:
-            p = Path(output_path)
-            if p.suffix.lower() != ".png" or not p.exists():
-                return
-    
-            from PIL import Image
-            from PIL.PngImagePlugin import PngInfo
-    
-            width_cm = float(self.spin_width.value())
-            height_cm = float(self.spin_height.value())
-            dpi_val = int(self.spin_dpi.value())
-            marker_style = self.get_marker_style_from_settings()  # 'dot' | 'cross'
-            marker_size_px = int(self.get_marker_size_from_settings())
-    
-            with Image.open(p) as im:
-                if im.format != "PNG":
-                    return
-    
-                pnginfo = PngInfo()
-                existing_text = getattr(im, "text", {}) or {}
-                for k, v in existing_text.items():
-                    try:
-                        pnginfo.add_text(str(k), str(v))
-                    except Exception:
-                        pass
-    
-                # Původní metadata
-                pnginfo.add_text("Output_Width_cm", f"{width_cm:.2f}")
-                pnginfo.add_text("Output_Height_cm", f"{height_cm:.2f}")
-                pnginfo.add_text("Output_DPI", f"{dpi_val}")
-    
-                # NOVÉ: typ a velikost značky
-                pnginfo.add_text("Marker_Style", marker_style)
-                pnginfo.add_text("Marker_Size_Px", f"{marker_size_px}")
-    
-                tmp_path = p.with_suffix(".tmp.png")
-                im.save(tmp_path, format="PNG", pnginfo=pnginfo, dpi=(dpi_val, dpi_val))
-                os.replace(tmp_path, p)
-        except Exception as e:
-            raise
-
     def preview_result_image_with_delete(self):
         """NOVÁ FUNKCE: Náhled výsledku se smazáním a auto 'Přizpůsobit' po otevření"""
         if hasattr(self, 'last_output_path') and self.last_output_path:
@@ -9782,6 +9512,7 @@ class MainWindow(QMainWindow):
         self.spin_zoom = QSpinBox()
         self.spin_zoom.setRange(1, 19)
         self.spin_zoom.setValue(17)
+        self.spin_zoom.valueChanged.connect(self._on_tile_params_changed)
         self.spin_zoom.setSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
         bump_h(self.spin_zoom, 5)
         group_layout.addWidget(self.spin_zoom, 0, 1)
@@ -9929,22 +9660,20 @@ class MainWindow(QMainWindow):
         Detekce polygonu v PNG souboru podle parametru AOI_POLYGON v metadatech.
         """
         try:
-            from PIL import Image
+            # Metadata z indexu lokačních map (soubor se otevře jen při změně podpisu)
+            info = get_location_index().get(png_path)
+            if info is None:
+                return False, "Soubor neexistuje"
             
-            with Image.open(png_path) as img:
-                # Kontrola PNG metadat
-                info = img.info or {}
-                
-                # Kontrola konkrétního klíče AOI_POLYGON
-                if 'AOI_POLYGON' in info:
-                    value = info['AOI_POLYGON']
-                    # Kontrola, zda hodnota není prázdná
-                    if value and str(value).strip():
-                        return True, "Obsahuje polygon"
-                    else:
-                        return False, "AOI_POLYGON je prázdný"
-                
-                return False, "Neobsahuje polygon"
+            # Kontrola konkrétního klíče AOI_POLYGON
+            if info.polygon_raw is not None:
+                # Kontrola, zda hodnota není prázdná
+                if info.has_polygon:
+                    return True, "Obsahuje polygon"
+                else:
+                    return False, "AOI_POLYGON je prázdný"
+            
+            return False, "Neobsahuje polygon"
                 
         except Exception as e:
             return False, f"Chyba při kontrole: {str(e)[:50]}..."
@@ -10332,6 +10061,9 @@ class MainWindow(QMainWindow):
         self.spin_dpi.setRange(72, 600)
         self.spin_dpi.setValue(300)
         group_layout.addWidget(self.spin_dpi, 2, 1)
+        # rozměr a DPI mění okno dlaždic → prefetch i odhad ceny detailního tisku
+        for spin in (self.spin_width, self.spin_height, self.spin_dpi):
+            spin.valueChanged.connect(self._on_tile_params_changed)
         group.setLayout(group_layout)
         layout.addWidget(group)
     
@@ -10433,8 +10165,203 @@ class MainWindow(QMainWindow):
         group.setLayout(group_layout)
         layout.addWidget(group)
         
+        # Skupina - zdroj dlaždic (online OSM / offline balíček)
+        src_group = QGroupBox("🗺️ Zdroj dlaždic")
+        src_layout = QGridLayout()
+        
+        src_layout.addWidget(QLabel("Zdroj:"), 0, 0)
+        self.combo_tile_source = QComboBox()
+        self.combo_tile_source.addItem("HTTP (OpenStreetMap)", "http")
+        self.combo_tile_source.addItem("MBTiles soubor (offline)", "mbtiles")
+        self.combo_tile_source.addItem("Složka z/x/y (offline)", "dir")
+        src_layout.addWidget(self.combo_tile_source, 0, 1, 1, 2)
+        
+        src_layout.addWidget(QLabel("Cesta:"), 1, 0)
+        self.input_tile_source_path = QLineEdit()
+        self.input_tile_source_path.setPlaceholderText("Soubor .mbtiles nebo kořen složky s dlaždicemi")
+        src_layout.addWidget(self.input_tile_source_path, 1, 1)
+        self.btn_tile_source_browse = QPushButton("…")
+        self.btn_tile_source_browse.clicked.connect(self.browse_tile_source_path)
+        src_layout.addWidget(self.btn_tile_source_browse, 1, 2)
+        
+        self.check_tile_prefetch = QCheckBox("Předem načítat dlaždice (zoom ±1)")
+        self.check_tile_prefetch.setChecked(True)
+        self.check_tile_prefetch.setToolTip("Po ustálení souřadnic/zoomu se na pozadí zahřeje cache dlaždic,\n"
+                                            "takže generování i multi-zoom náhled startují bez čekání na síť.")
+        self.check_tile_prefetch.toggled.connect(self._schedule_tile_prefetch)
+        src_layout.addWidget(self.check_tile_prefetch, 2, 0, 1, 3)
+        
+        # Detail tisku: dlaždice z vyššího zoomu pro stejný výřez terénu, zmenšené na DPI výstupu
+        src_layout.addWidget(QLabel("Detail tisku:"), 3, 0)
+        self.combo_detail_zoom = QComboBox()
+        self.combo_detail_zoom.addItem("Zoom mapy (bez převzorkování)", 0)
+        self.combo_detail_zoom.addItem("Dlaždice zoom +1 (≈4× dlaždic)", 1)
+        self.combo_detail_zoom.addItem("Dlaždice zoom +2 (≈16× dlaždic)", 2)
+        self.combo_detail_zoom.setToolTip("Ostřejší tisk 300/600 DPI: mapa se složí z dlaždic vyššího zoomu\n"
+                                          "a zmenší na tiskové rozlišení. Popisky v mapě budou menší.")
+        self.combo_detail_zoom.currentIndexChanged.connect(self._schedule_detail_cost_update)
+        src_layout.addWidget(self.combo_detail_zoom, 3, 1, 1, 2)
+        self.label_detail_cost = QLabel("")
+        self.label_detail_cost.setStyleSheet("QLabel { color: #666; font-style: italic; }")
+        src_layout.addWidget(self.label_detail_cost, 4, 0, 1, 3)
+        
+        self.combo_tile_source.currentIndexChanged.connect(self._update_tile_source_controls)
+        self._update_tile_source_controls()
+        
+        src_group.setLayout(src_layout)
+        layout.addWidget(src_group)
+        
+        # Skupina - formát výstupu (PNG rychlé/archivní, ztrátové WebP/JPEG pro náhledy)
+        out_group = QGroupBox("💾 Formát výstupu")
+        out_layout = QGridLayout()
+        out_layout.addWidget(QLabel("Profil ukládání:"), 0, 0)
+        self.combo_output_profile = QComboBox()
+        for key, prof in output_encoder.ENCODER_PROFILES.items():
+            self.combo_output_profile.addItem(prof["label"], key)
+        self.combo_output_profile.setCurrentIndex(self.combo_output_profile.findData(output_encoder.DEFAULT_PROFILE))
+        self.combo_output_profile.setToolTip("Přegenerování existujících PNG na místě vždy ukládá PNG (ztrátové profily → standardní PNG).")
+        out_layout.addWidget(self.combo_output_profile, 0, 1)
+        self.check_metrics_report = QCheckBox("Ukládat report výkonu (<mapa>.metrics.json)")
+        self.check_metrics_report.setToolTip("Čas fází, latence a původ dlaždic, přenesené bajty a opakování.\n"
+                                             "Jednořádkový souhrn se do logu zapisuje vždy.")
+        out_layout.addWidget(self.check_metrics_report, 1, 0, 1, 2)
+        out_group.setLayout(out_layout)
+        layout.addWidget(out_group)
+        
         layout.addStretch()
         self.tabs.addTab(tab, "⚙️ Pokročilé")
+
+    def _update_tile_source_controls(self, *args):
+        """Cesta má smysl jen pro offline zdroje."""
+        offline = self.combo_tile_source.currentData() in ("mbtiles", "dir")
+        self.input_tile_source_path.setEnabled(offline)
+        self.btn_tile_source_browse.setEnabled(offline)
+
+    def browse_tile_source_path(self):
+        """Výběr MBTiles souboru / složky s dlaždicemi podle zvoleného zdroje."""
+        kind = self.combo_tile_source.currentData()
+        start = self.input_tile_source_path.text() or str(Path.home())
+        if kind == "mbtiles":
+            path, _ = QFileDialog.getOpenFileName(self, "Vyberte MBTiles soubor", start, "MBTiles (*.mbtiles);;Všechny soubory (*)")
+        else:
+            path = QFileDialog.getExistingDirectory(self, "Vyberte složku s dlaždicemi (z/x/y)", start)
+        if path:
+            self.input_tile_source_path.setText(path)
+
+    def _output_profile(self):
+        """Zvolený profil ukládání (viz core.output_encoder)."""
+        if not hasattr(self, "combo_output_profile"):
+            return output_encoder.DEFAULT_PROFILE
+        return self.combo_output_profile.currentData() or output_encoder.DEFAULT_PROFILE
+
+    def _output_params_text_meta(self):
+        """Výstupní parametry (cm, DPI, značka) jako textová metadata – zapíší se rovnou při uložení."""
+        return {
+            "Output_Width_cm": f"{float(self.spin_width.value()):.2f}",
+            "Output_Height_cm": f"{float(self.spin_height.value()):.2f}",
+            "Output_DPI": f"{int(self.spin_dpi.value())}",
+            "Marker_Style": self.get_marker_style_from_settings(),
+            "Marker_Size_Px": f"{int(self.get_marker_size_from_settings())}",
+        }
+
+    def _tile_source_params(self):
+        """Parametry zdroje dlaždic pro MapProcessor (render i náhled)."""
+        if not hasattr(self, "combo_tile_source"):
+            return {'tile_source': 'http', 'tile_source_path': ''}
+        return {
+            'tile_source': self.combo_tile_source.currentData() or 'http',
+            'tile_source_path': self.input_tile_source_path.text().strip(),
+        }
+
+    def _on_tile_params_changed(self, *_):
+        """Změna souřadnic / zoomu / rozměru / DPI: prefetch dlaždic + odhad ceny detailního tisku."""
+        self._schedule_tile_prefetch()
+        self._schedule_detail_cost_update()
+
+    def _schedule_detail_cost_update(self, *_):
+        """Odhad ceny až po ustálení vstupu – nový MapEngine a stat() dlaždic ne na každý stisk klávesy."""
+        timer = getattr(self, "_detail_cost_timer", None)
+        if timer is None:
+            timer = self._detail_cost_timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(self._update_detail_cost_label)
+        timer.start(400)
+
+    def _detail_zoom_offset(self):
+        if not hasattr(self, "combo_detail_zoom"):
+            return 0
+        return int(self.combo_detail_zoom.currentData() or 0)
+
+    def _update_detail_cost_label(self, *_):
+        """Odhad ceny detailního tisku (dlaždice navíc, kolik je v cache) ještě před spuštěním."""
+        if not hasattr(self, "label_detail_cost"):
+            return
+        offset = self._detail_zoom_offset()
+        if offset <= 0:
+            self.label_detail_cost.setText("")
+            return
+        try:
+            parsed = self.parse_coordinates(self.input_manual_coords.text().strip())
+            if not parsed:
+                self.label_detail_cost.setText("Odhad: zadejte souřadnice")
+                return
+            dpi = float(self.spin_dpi.value())
+            width_px = max(1, int(round(float(self.spin_width.value()) / 2.54 * dpi)))
+            height_px = max(1, int(round(float(self.spin_height.value()) / 2.54 * dpi)))
+            zoom = int(self.spin_zoom.value())
+            engine = MapEngine({**self._tile_source_params(), 'request_delay': self.spin_delay.value()})
+            tile_zoom = min(zoom + offset, engine.MAX_TILE_ZOOM)
+            if tile_zoom <= zoom:
+                self.label_detail_cost.setText(f"Zoom {zoom} je nejvyšší dostupný – bez převzorkování")
+                return
+            cost = engine.estimate_tile_cost(float(parsed[0]), float(parsed[1]), zoom, width_px, height_px, tile_zoom)
+            eta = f", ~{cost['est_seconds']:.0f} s" if cost['est_seconds'] is not None else ""
+            self.label_detail_cost.setText(
+                f"Odhad: {cost['tiles']} dlaždic Z{tile_zoom} (místo {cost['base_tiles']}), "
+                f"v cache {cost['cached']}, ke stažení {cost['to_download']}{eta}"
+            )
+        except Exception as e:
+            self.label_detail_cost.setText(f"Odhad nelze spočítat: {e}")
+
+    def _schedule_tile_prefetch(self, *_):
+        """
+        Spekulativní prefetch: po ustálení souřadnic/zoomu (debounce v TilePrefetcheru)
+        zahřeje cache dlaždic pro zoom ±1 a zoom náhledu. Každá další změna ruší předchozí běh.
+        """
+        prefetcher = getattr(self, "_tile_prefetcher", None)
+        try:
+            if not hasattr(self, "check_tile_prefetch") or not self.check_tile_prefetch.isChecked():
+                if prefetcher is not None:
+                    prefetcher.cancel()
+                return
+            parsed = self.parse_coordinates(self.input_manual_coords.text().strip())
+            if not parsed:
+                if prefetcher is not None:
+                    prefetcher.cancel()
+                return
+            lat, lon = float(parsed[0]), float(parsed[1])
+
+            zoom = int(self.spin_zoom.value())
+            zooms = [zoom] + [z for z in (zoom - 1, zoom + 1) if 1 <= z <= 19]
+            if hasattr(self, "spin_preview_zoom"):
+                pz = int(self.spin_preview_zoom.value())
+                if pz not in zooms:
+                    zooms.append(pz)
+
+            dpi = float(self.spin_dpi.value())
+            width_px = int(float(self.spin_width.value()) / 2.54 * dpi)
+            height_px = int(float(self.spin_height.value()) / 2.54 * dpi)
+
+            # Engine bez Qt: paměťová LRU i disková cache jsou sdílené s renderem a náhledem
+            engine = MapEngine({**self._tile_source_params(), 'request_delay': self.spin_delay.value()})
+            engine.get_tile_source()  # neplatný zdroj → výjimka, prefetch se zruší
+            if prefetcher is None:
+                prefetcher = self._tile_prefetcher = TilePrefetcher(engine.get_tile_image)
+            prefetcher.schedule(lat, lon, zooms, width_px, height_px, fetch_fn=engine.get_tile_image)
+        except Exception:
+            # Neplatný zdroj dlaždic apod. – prefetch je jen optimalizace
+            if prefetcher is not None:
+                prefetcher.cancel()
         
     # V metodě create_menu_bar() přidejte novou položku menu
     def create_menu_bar(self):
@@ -10948,8 +10875,9 @@ class MainWindow(QMainWindow):
             self.label_parsed_coords.setStyleSheet("QLabel { color: #666; font-style: italic; }")
             
     def _on_gps_param_changed(self, *_):
-        """Reakce na změnu parametrů – pouze označí náhled jako neaktuální (žádné automatické stahování)."""
+        """Reakce na změnu parametrů – označí náhled jako neaktuální a naplánuje prefetch dlaždic na pozadí."""
         self._flag_gps_preview_outdated()
+        self._on_tile_params_changed()
 
     
     def _flag_gps_preview_outdated(self):
@@ -11055,6 +10983,11 @@ class MainWindow(QMainWindow):
             'marker_style': self.get_marker_style_from_settings(),  # 'dot' | 'cross'
             # 🔸 NOVÉ: přepínač anonymizace z GUI, aby se propsal i při "Spustit generování"
             'anonymizovana_lokace': bool(self.checkbox_anonymni_lokace.isChecked()),
+            **self._tile_source_params(),
+            'output_profile': self._output_profile(),
+            'tile_prefetch': bool(self.check_tile_prefetch.isChecked()) if hasattr(self, 'check_tile_prefetch') else True,
+            'metrics_report': bool(self.check_metrics_report.isChecked()) if hasattr(self, 'check_metrics_report') else False,
+            'detail_zoom_offset': self._detail_zoom_offset(),
         }
 
     def start_processing(self):
@@ -11117,6 +11050,9 @@ class MainWindow(QMainWindow):
         # 5) Uložení konfigurace (beze změny – UI režim zůstává, override je jen pro tento běh)
         self.save_config()
     
+        # Metadata cm/DPI/značky zapíše rovnou render (jediné kódování PNG)
+        params['extra_text_meta'] = self._output_params_text_meta()
+
         # 6) Vytvoření a spuštění threadu (beze změny)
         self.processor_thread = ProcessorThread(params)
         self.processor_thread.finished.connect(self.on_processing_finished)
@@ -11272,6 +11208,24 @@ class MainWindow(QMainWindow):
                     self.spin_opacity.setValue(config['map_opacity'])
                 if 'request_delay' in config:
                     self.spin_delay.setValue(config['request_delay'])
+                if 'tile_source' in config and hasattr(self, 'combo_tile_source'):
+                    idx = self.combo_tile_source.findData(config['tile_source'])
+                    if idx >= 0:
+                        self.combo_tile_source.setCurrentIndex(idx)
+                if 'tile_source_path' in config and hasattr(self, 'input_tile_source_path'):
+                    self.input_tile_source_path.setText(config['tile_source_path'] or "")
+                if 'detail_zoom_offset' in config and hasattr(self, 'combo_detail_zoom'):
+                    idx = self.combo_detail_zoom.findData(int(config['detail_zoom_offset'] or 0))
+                    if idx >= 0:
+                        self.combo_detail_zoom.setCurrentIndex(idx)
+                if 'metrics_report' in config and hasattr(self, 'check_metrics_report'):
+                    self.check_metrics_report.setChecked(bool(config['metrics_report']))
+                if 'tile_prefetch' in config and hasattr(self, 'check_tile_prefetch'):
+                    self.check_tile_prefetch.setChecked(bool(config['tile_prefetch']))
+                if 'output_profile' in config and hasattr(self, 'combo_output_profile'):
+                    idx = self.combo_output_profile.findData(config['output_profile'])
+                    if idx >= 0:
+                        self.combo_output_profile.setCurrentIndex(idx)
                 if 'marker_size' in config:
                     self.spin_marker_size.setValue(config['marker_size'])
                 try:
@@ -11438,7 +11392,9 @@ class MainWindow(QMainWindow):
             # 4) Uložení konfigurace (váš původní mechanismus)
             self.save_config()
     
-            # 5) Zastavení běžícího zpracování
+            # 5) Zastavení běžícího zpracování (včetně prefetchu dlaždic)
+            if getattr(self, "_tile_prefetcher", None) is not None:
+                self._tile_prefetcher.shutdown()
             if self.processor_thread and self.processor_thread.isRunning():
                 self.processor_thread.stop()
                 self.processor_thread.quit()
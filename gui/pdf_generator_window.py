@@ -28,6 +28,8 @@ import time
 # Import hlavní funkce z PDF generátoru
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from pdf_generator import main as generate_pdf_main
+from core.photo_metadata import read_gps
+from core.photo_index import get_photo_index, parse_photo_id, PHOTO_EXTENSIONS
 
 from PySide6.QtWidgets import QRubberBand
 from PySide6.QtGui import QImage, QPainter
@@ -1625,10 +1627,10 @@ class _AnnotateWorker(QObject):
         self._rows_info = rows_info  # list[tuple[row:int, num:int]]
         self._source_root_str = source_root_str
 
-    def _get_taken_datetime(self, path):
+    def _get_taken_datetime(self, path, record=None):
         """
         Vrátí datetime pro anotaci položek.
-        1) Pokus o EXIF DateTimeOriginal (pokud dostupný).
+        1) EXIF DateTimeOriginal z indexu fotek (core.photo_index; jinak se soubor dočte).
         2) Jinak DATUM VYTVOŘENÍ SOUBORU (birthtime / getctime).
         3) Poslední fallback: mtime.
     
@@ -1642,32 +1644,13 @@ class _AnnotateWorker(QObject):
         if path is None:
             return None
     
-        # 1) EXIF (pokud k dispozici)
+        # 1) EXIF (z indexu)
         try:
-            try:
-                import pillow_heif  # type: ignore
-                try:
-                    pillow_heif.register_heif_opener()
-                except Exception:
-                    pass
-            except Exception:
-                pass
-    
-            from PIL import Image, ExifTags  # type: ignore
-            exif_tag_map = {v: k for k, v in ExifTags.TAGS.items()}
-            dt_tag = exif_tag_map.get("DateTimeOriginal")
-            with Image.open(str(path)) as im:
-                exif = im.getexif()
-                if exif and dt_tag in exif:
-                    raw = exif.get(dt_tag)
-                    try:
-                        return datetime.strptime(str(raw), "%Y:%m:%d %H:%M:%S")
-                    except Exception:
-                        for fmt in ("%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S"):
-                            try:
-                                return datetime.strptime(str(raw), fmt)
-                            except Exception:
-                                continue
+            if record is None:
+                record = get_photo_index().get(path)
+            dt = record.taken_datetime if record else None
+            if dt is not None:
+                return dt
         except Exception:
             pass
     
@@ -1688,44 +1671,58 @@ class _AnnotateWorker(QObject):
         except Exception:
             return None
 
-    def run(self):
-        import os
+    def _annotate(self, row, num, record, source_root, allow_search):
         from pathlib import Path
     
-        source_root = Path(self._source_root_str) if self._source_root_str else None
-        id_to_path = {}
-    
-        # jednorázově projdi kořenovou složku (nererekurzivně) pro rychlé mapování
-        if source_root and source_root.is_dir():
-            photo_ext = {'.jpg', '.jpeg', '.png', '.heic', '.heif', '.tiff', '.tif', '.bmp'}
+        path = Path(record.path) if record else None
+        if path is None and allow_search and source_root and source_root.is_dir():
+            # opatrný fallback: rekurzivní dohledání pouze pro chybějící kusy
             try:
-                for entry in os.scandir(source_root):
-                    if entry.is_file():
-                        ext = os.path.splitext(entry.name)[1].lower()
-                        if ext in photo_ext:
-                            head = entry.name.split('+')[0]
-                            if head.isdigit():
-                                id_to_path[int(head)] = Path(entry.path)
+                for candidate in source_root.rglob(f"{num}*"):
+                    if candidate.is_file():
+                        path = candidate
+                        break
             except Exception:
-                pass
+                path = None
+    
+        dt = self._get_taken_datetime(path, record) if path else None
+        # >>> ZMĚNA: plný čas – dny, hodiny, minuty, sekundy; bez mezery (podtržítko), ať je to jeden token
+        date_str = dt.strftime("%Y-%m-%d_%H:%M:%S") if dt else ""
+        self.progress.emit(row, date_str, str(path) if path else "")
+
+    def run(self):
+        from pathlib import Path
+    
+        source_root = Path(self._source_root_str) if self._source_root_str else None
+        if not (source_root and source_root.is_dir()):
+            for row, num in self._rows_info:
+                self._annotate(row, num, None, source_root, False)
+            self.finished.emit()
+            return
     
-        # zpracuj jednotlivé řádky
+        # kořenová složka (nerekurzivně) z indexu fotek:
+        # 1) hned to, co už index zná (teplá složka → všechny řádky okamžitě),
+        # 2) po doběhnutí aktualizace na pozadí (sdílené s update_missing_photos) jen řádky,
+        #    jejichž záznam se změnil nebo chyběl (PhotoIndex.wait – čeká se ve vlákně workeru).
+        index = get_photo_index()
+        try:
+            first = index.by_id(source_root)
+        except Exception:
+            first = {}
         for row, num in self._rows_info:
-            path = id_to_path.get(num)
-            if path is None and source_root and source_root.is_dir():
-                # opatrný fallback: rekurzivní dohledání pouze pro chybějící kusy
-                try:
-                    for candidate in source_root.rglob(f"{num}*"):
-                        if candidate.is_file():
-                            path = candidate
-                            break
-                except Exception:
-                    path = None
+            if num in first:
+                self._annotate(row, num, first[num], source_root, False)
     
-            dt = self._get_taken_datetime(path) if path else None
-            # >>> ZMĚNA: plný čas – dny, hodiny, minuty, sekundy; bez mezery (podtržítko), ať je to jeden token
-            date_str = dt.strftime("%Y-%m-%d_%H:%M:%S") if dt else ""
-            self.progress.emit(row, date_str, str(path) if path else "")
+        try:
+            index.wait(source_root)
+            fresh = index.by_id(source_root)
+        except Exception:
+            fresh = first
+        for row, num in self._rows_info:
+            record = fresh.get(num)
+            if num in first and record == first[num]:
+                continue
+            self._annotate(row, num, record, source_root, True)
     
         self.finished.emit()
 
@@ -3913,44 +3910,18 @@ class MissingPhotosWidget(QWidget):
     def extract_gps_from_file(self, file_path):
         """
         Extrahuje GPS souřadnice z EXIF dat souboru.
-        Optimalizováno pro HEIC pomocí pillow-heif a piexif, s fallbackem na exifread.
+        Primárně core.photo_metadata (jen hlavičky), fallback na exifread.
         """
         main_window = self.find_main_window()
 
-        # Metoda 1: Pillow + pillow-heif + piexif (nejspolehlivější)
+        # Metoda 1: hlavičky souboru (JPEG/HEIC/PNG/WebP) – bez dekódování obrázku
         try:
-            from PIL import Image
-            import piexif
-            try:
-                # Import je nutný pro automatickou registraci HEIF/HEIC podpory v Pillow
-                import pillow_heif
-                pillow_heif.register_heif_opener()
-            except ImportError:
-                if file_path.lower().endswith(('.heic', '.heif')) and main_window:
-                    main_window.update_log("⚠️ Pro HEIC je nutné nainstalovat: pip install pillow-heif")
-            
-            with Image.open(file_path) as img:
-                if "exif" in img.info:
-                    exif_dict = piexif.load(img.info["exif"])
-                    if "GPS" in exif_dict and exif_dict["GPS"]:
-                        gps_data = exif_dict["GPS"]
-                        lat_dms = gps_data.get(piexif.GPSIFD.GPSLatitude)
-                        lon_dms = gps_data.get(piexif.GPSIFD.GPSLongitude)
-                        lat_ref_b = gps_data.get(piexif.GPSIFD.GPSLatitudeRef)
-                        lon_ref_b = gps_data.get(piexif.GPSIFD.GPSLongitudeRef)
-
-                        if lat_dms and lon_dms and lat_ref_b and lon_ref_b:
-                            lat = self._piexif_dms_to_degrees(lat_dms)
-                            lon = self._piexif_dms_to_degrees(lon_dms)
-
-                            if lat_ref_b == b'S': lat = -lat
-                            if lon_ref_b == b'W': lon = -lon
-                            
-                            return (lat, lon)
+            gps = read_gps(file_path)
+            if gps is not None:
+                return gps
         except Exception as e:
             if main_window:
-                main_window.update_log(f"ℹ️ Pillow/piexif selhalo pro {os.path.basename(file_path)}: {e}")
-            pass
+                main_window.update_log(f"ℹ️ Čtení EXIF selhalo pro {os.path.basename(file_path)}: {e}")
 
         # Metoda 2: exifread (fallback pro ostatní formáty)
         try:
@@ -4769,21 +4740,19 @@ class MissingPhotosWidget(QWidget):
             return
     
         try:
-            # Získání všech fotek ze složky
-            files = os.listdir(folder_path)
-            photo_extensions = {'.jpg', '.jpeg', '.png', '.heic', '.heif', '.tiff', '.tif', '.bmp'}
+            # Získání všech fotek ze složky (ID stačí z názvu; metadata dočte index fotek na pozadí)
             photos_in_folder = set()
             invalid_files = []
     
-            for filename in files:
-                ext = os.path.splitext(filename)[1].lower()
-                if ext in photo_extensions:
-                    try:
-                        number_part = filename.split('+')[0]
-                        photo_number = int(number_part)
-                        photos_in_folder.add(photo_number)
-                    except (ValueError, IndexError):
-                        invalid_files.append(filename)
+            for filename in os.listdir(folder_path):
+                if os.path.splitext(filename)[1].lower() not in PHOTO_EXTENSIONS:
+                    continue
+                photo_number = parse_photo_id(filename)
+                if photo_number is None:
+                    invalid_files.append(filename)
+                else:
+                    photos_in_folder.add(photo_number)
+            get_photo_index().refresh_async(folder_path)
     
             # ✅ NOVÉ: Rozlišení režimů zobrazení
             if not json_numbers:  # Prázdný seznam = zobraz všechny fotky
@@ -44,6 +44,9 @@ from PySide6.QtWidgets import (
     QSplitter, QScrollArea, QMenu, QTextEdit, QAbstractItemView, QMenu, QLineEdit, QListWidget, QListWidgetItem, QInputDialog  # ← bez QAction
 )
 
+from core.photo_metadata import read_gps
+from core.photo_index import get_photo_index
+
 
 # --- QUIET MODE: tiché pozadí (bez log panelu a debug výpisů) ---
 QUIET_MODE = True
@@ -5963,7 +5966,8 @@ class WebPhotosWindow(QDialog):
         from PySide6.QtGui import QColor, QKeySequence, QAction, QShortcut, QGuiApplication
         import re as _re, json as _json, math as _math
     
-        # === 1) Sesbírat IDs a GPS fotek (jen ty, co mají GPS) ===
+        # === 1) Sesbírat IDs a GPS fotek (jen ty, co mají GPS; z indexu fotek) ===
+        photo_index = get_photo_index()
         photo_ids: list[int] = []
         photo_coords: list[tuple[int, tuple[float, float]]] = []
         latlon_map: dict[int, tuple[float, float]] = {}
@@ -5976,7 +5980,8 @@ class WebPhotosWindow(QDialog):
                 pid = int(s)
             except Exception:
                 continue
-            gps = self._extract_gps_from_file(str(p))
+            record = photo_index.get(p)
+            gps = record.gps if record else self._extract_gps_from_file(str(p))
             if gps:
                 photo_ids.append(pid)
                 photo_coords.append((pid, gps))
@@ -6851,40 +6856,15 @@ class WebPhotosWindow(QDialog):
     def _extract_gps_from_file(self, file_path: str):
         """
         Extrahuje GPS souřadnice z EXIF (přebráno z pdf_generator_window.py, zkrácená verze):
-        - Primárně Pillow + pillow-heif + piexif
+        - Primárně core.photo_metadata (jen hlavičky JPEG/HEIC/PNG/WebP)
         - Fallback: exifread
         Vrací (lat, lon) nebo None.
         """
-        # Metoda 1: Pillow + piexif (+ HEIC registrace)
+        # Metoda 1: hlavičky souboru (core.photo_metadata) – bez dekódování obrázku
         try:
-            from PIL import Image
-            try:
-                import pillow_heif
-                pillow_heif.register_heif_opener()
-            except Exception:
-                pass
-    
-            try:
-                import piexif
-                with Image.open(file_path) as img:
-                    if "exif" in img.info:
-                        exif_dict = piexif.load(img.info["exif"])
-                        gps = exif_dict.get("GPS")
-                        if gps:
-                            def _rat_to_float(x): return float(x[0]) / float(x[1]) if isinstance(x, tuple) and x[1] else float(x)
-                            def _dms_to_deg(dms):
-                                d, m, s = dms
-                                return _rat_to_float(d) + _rat_to_float(m) / 60 + _rat_to_float(s) / 3600
-    
-                            lat = _dms_to_deg(gps.get(piexif.GPSIFD.GPSLatitude))
-                            lon = _dms_to_deg(gps.get(piexif.GPSIFD.GPSLongitude))
-                            lat_ref = gps.get(piexif.GPSIFD.GPSLatitudeRef, b'N')
-                            lon_ref = gps.get(piexif.GPSIFD.GPSLongitudeRef, b'E')
-                            if lat_ref in (b'S', 'S'): lat = -lat
-                            if lon_ref in (b'W', 'W'): lon = -lon
-                            return (lat, lon)
-            except Exception:
-                pass
+            gps = read_gps(file_path)
+            if gps is not None:
+                return gps
         except Exception:
             pass
     
@@ -313,6 +313,13 @@ def main():
     app.setApplicationVersion("2.0")
     app.setOrganizationName("Ctyrlistkoteka.cz")
     
+    # Fonty pro vodoznak / počítadlo se vyhodnotí jednou při startu
+    try:
+        from core import font_registry
+        font_registry.preload()
+    except Exception:
+        pass
+    
     # Vytvoření a zobrazení hlavního okna
     window = MainWindow()
     window.show()
@@ -1,6 +1,6 @@
 import os
 import sys
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from PIL.ExifTags import TAGS, GPSTAGS
 import pillow_heif
 from reportlab.pdfgen import canvas
@@ -16,6 +16,13 @@ import concurrent.futures
 from functools import partial
 import threading
 
+from core import font_registry
+from core.photo_metadata import read_gps_and_time
+from core.photo_index import get_photo_index
+from core.location_index import get_location_index
+
+CLOVER_PHOTO_EXTENSIONS = {'.heic', '.jpg', '.jpeg', '.png'}
+
 # Registrace HEIF formátu pro PIL
 pillow_heif.register_heif_opener()
 
@@ -112,8 +119,9 @@ def draw_arc_text(canvas, text, center_x, center_y, radius, max_width, font_name
     #print(f"DEBUG: Text '{text}' vykreslen s posunem o 75° doleva + 1% dolů")
 
 def _safe_truetype(font_path: str, size: int):
+    # Sdílený registr: každý (cesta, velikost) se načte jen jednou za proces
     with FONT_LOCK:
-        return ImageFont.truetype(font_path, size)
+        return font_registry.get_font(font_path, size)
 
 def parse_gps_from_filename(filename):
     """
@@ -244,67 +252,23 @@ def create_radial_gradient_circle(width, height, center_x, center_y, radius_px):
     return overlay
 
 def extract_location_gps_center(location_image_path):
-    """Extrahuje GPS střed lokace z metadat obrázku lokace nebo z názvu souboru"""
+    """Extrahuje GPS střed lokace z metadat obrázku lokace (index lokačních map) nebo z názvu souboru"""
     try:
-        image = Image.open(location_image_path)
-        exifdata = image.getexif()
         filename = os.path.basename(location_image_path)
-        #print(f"Hledám GPS střed v: {filename}")
-
-        # 0) PNG tEXt metadata z MapProcessoru: GPS_Latitude, GPS_Longitude (textové hodnoty)
-        try:
-            text_meta = getattr(image, 'text', {}) or {}
-            info_meta = getattr(image, 'info', {}) or {}
-            lat_txt = text_meta.get('GPS_Latitude') or info_meta.get('GPS_Latitude')
-            lon_txt = text_meta.get('GPS_Longitude') or info_meta.get('GPS_Longitude')
-            if lat_txt is not None and lon_txt is not None:
-                lat_val = float(str(lat_txt).replace(',', '.'))
-                lon_val = float(str(lon_txt).replace(',', '.'))
-                gps_center = (lat_val, lon_val)
-                #print(f"GPS střed lokace z PNG meta {gps_center}")
-                #print(f"Finální GPS střed lokace: {gps_center}")
-                return gps_center
-            else:
-                print("PNG tEXt metadata GPS_Latitude/GPS_Longitude nenalezena")
-        except Exception as meta_err:
-            print(f"Chyba při čtení PNG text metadat: {meta_err}")
 
-        # 1) EXIF (HEIC/JPEG) – původní chování
-        gps_center = None
-        try:
-            gps_info = exifdata.get_ifd(34853)  # GPS Info IFD
-            if gps_info:
-                print(f"Nalezena GPS data lokace v EXIF: {gps_info}")
-                if 2 in gps_info and 4 in gps_info:  # GPSLatitude a GPSLongitude
-                    lat_dms = gps_info[2]  # GPSLatitude
-                    lon_dms = gps_info[4]  # GPSLongitude
-                    lat_ref = gps_info.get(1, 'N')  # GPSLatitudeRef
-                    lon_ref = gps_info.get(3, 'E')  # GPSLongitudeRef
-
-                    lat_decimal = float(lat_dms[0]) + float(lat_dms[1]) / 60 + float(lat_dms[2]) / 3600
-                    lon_decimal = float(lon_dms[0]) + float(lon_dms[1]) / 60 + float(lon_dms[2]) / 3600
-                    if lat_ref == 'S':
-                        lat_decimal = -lat_decimal
-                    if lon_ref == 'W':
-                        lon_decimal = -lon_decimal
-
-                    gps_center = (lat_decimal, lon_decimal)
-                    print(f"GPS střed lokace z EXIF: {gps_center}")
-                else:
-                    print("GPS souřadnice nenalezeny v GPS datech lokace")
-            else:
-                print("GPS data nenalezena v EXIF lokace")
-        except Exception as gps_error:
-            print(f"Chyba při čtení GPS dat lokace z EXIF: {gps_error}")
-
-        # 2) Fallback: název souboru (nový i původní formát)
-        if not gps_center:
-            print("GPS střed lokace nenalezen v EXIF/PNG metadatech, zkouším načíst z názvu souboru")
-            gps_center = parse_gps_from_filename(filename)
-            if gps_center:
-                print(f"GPS střed lokace úspěšně načten z názvu souboru: {gps_center}")
-            else:
-                print("GPS střed lokace se nepodařilo načíst ani z názvu souboru")
+        # 0) PNG tEXt GPS_Latitude/GPS_Longitude, u HEIC/JPEG EXIF GPS – z indexu lokačních map
+        info = get_location_index().get(location_image_path)
+        gps_center = info.gps_center if info else None
+        if gps_center:
+            return gps_center
+
+        # 1) Fallback: název souboru (nový i původní formát)
+        print("GPS střed lokace nenalezen v EXIF/PNG metadatech, zkouším načíst z názvu souboru")
+        gps_center = parse_gps_from_filename(filename)
+        if gps_center:
+            print(f"GPS střed lokace úspěšně načten z názvu souboru: {gps_center}")
+        else:
+            print("GPS střed lokace se nepodařilo načíst ani z názvu souboru")
 
         print(f"Finální GPS střed lokace: {gps_center}")
         return gps_center
@@ -500,63 +464,13 @@ def check_gps_within_bounds(clover_gps, location_bounds):
     return within_bounds
 
 def extract_gps_and_time(image_path):
-    """Extrahuje GPS souřadnice a čas vytvoření z HEIC souboru"""
+    """Extrahuje GPS souřadnice a čas vytvoření z hlaviček souboru (bez dekódování obrázku)"""
     try:
-        image = Image.open(image_path)
-        exifdata = image.getexif()
-        
-        gps_coords = None
-        creation_time = None
-        
-        #print(f"Zpracovávám metadata pro: {os.path.basename(image_path)}")
-        
-        # Extrakce času vytvoření - zkusí různé tagy
-        time_tags = [36867, 36868, 306]  # DateTimeOriginal, DateTimeDigitized, DateTime
-        for tag in time_tags:
-            if tag in exifdata:
-                creation_time = exifdata[tag]
-                #print(f"Nalezen čas v tagu {tag}: {creation_time}")
-                break
-        
+        gps_coords, creation_time = read_gps_and_time(image_path)
         if not creation_time:
             print("Čas vytvoření nenalezen v EXIF datech")
-        
-        # Extrakce GPS dat
-        try:
-            gps_info = exifdata.get_ifd(34853)  # GPS Info IFD
-            if gps_info:
-                #print(f"Nalezena GPS data: {gps_info}")
-                
-                # Získá GPS souřadnice
-                if 2 in gps_info and 4 in gps_info:  # GPSLatitude a GPSLongitude
-                    lat_dms = gps_info[2]  # GPSLatitude
-                    lon_dms = gps_info[4]  # GPSLongitude
-                    lat_ref = gps_info.get(1, 'N')  # GPSLatitudeRef
-                    lon_ref = gps_info.get(3, 'E')  # GPSLongitudeRef
-                    
-                    # Převod DMS na desetinné stupně - OPRAVA pro Fraction objekty
-                    if isinstance(lat_dms[0], tuple):
-                        lat_decimal = float(lat_dms[0]) + float(lat_dms[1])/60 + float(lat_dms[2])/3600
-                        lon_decimal = float(lon_dms[0]) + float(lon_dms[1])/60 + float(lon_dms[2])/3600
-                    else:
-                        # Pro Fraction objekty
-                        lat_decimal = float(lat_dms[0]) + float(lat_dms[1])/60 + float(lat_dms[2])/3600
-                        lon_decimal = float(lon_dms[0]) + float(lon_dms[1])/60 + float(lon_dms[2])/3600
-                    
-                    if lat_ref == 'S':
-                        lat_decimal = -lat_decimal
-                    if lon_ref == 'W':
-                        lon_decimal = -lon_decimal
-                    
-                    gps_coords = (lat_decimal, lon_decimal)
-                    #print(f"GPS souřadnice (desetinné): {gps_coords}")
-                else:
-                    print("GPS souřadnice nenalezeny v GPS datech")
-            else:
-                print("GPS data nenalezena v EXIF")
-        except Exception as gps_error:
-            print(f"Chyba při čtení GPS dat: {gps_error}")
-        
+        if gps_coords is None:
+            print("GPS data nenalezena v EXIF")
         return gps_coords, creation_time
         
     except Exception as e:
@@ -598,8 +512,12 @@ def load_clover_images_range(n, m, cesta_ctyrlistky, status_dict=None):
                 clover_metadata.append(metadata)
         return clover_images, clover_metadata
 
-    all_files = os.listdir(cesta_ctyrlistky)
-    print(f"Celkem souborů v adresáři: {len(all_files)}")
+    # Index fotek: ID z názvu, GPS a čas pořízení. PDF potřebuje úplná data, proto čeká
+    # na aktualizaci sdílenou s GUI (viz PhotoIndex.wait) v tomto (pracovním) vlákně.
+    photo_index = get_photo_index()
+    photo_index.wait(cesta_ctyrlistky)
+    records_by_id = photo_index.all_by_id(cesta_ctyrlistky, extensions=CLOVER_PHOTO_EXTENSIONS)
+    print(f"Celkem fotek čtyřlístků v adresáři: {len(records_by_id)}")
 
     for i in range(total_images):
         image_number = n + i
@@ -617,28 +535,25 @@ def load_clover_images_range(n, m, cesta_ctyrlistky, status_dict=None):
 
         # Hledání normálního souboru (včetně DAROVANY, ZTRACENY, BEZGPS)
         found = False
-        for filename in all_files:
-            if filename.startswith(f"{image_number}+") and filename.lower().endswith((".heic", ".jpg", ".jpeg", ".png")):
-                filepath = os.path.join(cesta_ctyrlistky, filename)
-                try:
-                    img = Image.open(filepath)
-                    clover_images.append(img)
-                    gps_coords, creation_time = extract_gps_and_time(filepath)
-                    
-                    metadata = {'number': image_number, 'gps': gps_coords, 'time': creation_time}
-                    
-                    # NOVÉ: Pro BEZGPS nastavit GPS na None (bude se zobrazovat s otazníky)
-                    if status_val == "BEZGPS":
-                        metadata['gps'] = None
-                    
-                    # Přidat status pro všechny stavy včetně BEZGPS
-                    if status_val:
-                        metadata['status'] = status_val
-                    clover_metadata.append(metadata)
-                    found = True
-                    break
-                except Exception as e:
-                    print(f"Chyba při načítání čtyřlístku {filename}: {e}")
+        for record in records_by_id.get(image_number, ()):
+            try:
+                img = Image.open(record.path)
+                clover_images.append(img)
+                
+                metadata = {'number': image_number, 'gps': record.gps, 'time': record.taken}
+                
+                # NOVÉ: Pro BEZGPS nastavit GPS na None (bude se zobrazovat s otazníky)
+                if status_val == "BEZGPS":
+                    metadata['gps'] = None
+                
+                # Přidat status pro všechny stavy včetně BEZGPS
+                if status_val:
+                    metadata['status'] = status_val
+                clover_metadata.append(metadata)
+                found = True
+                break
+            except Exception as e:
+                print(f"Chyba při načítání čtyřlístku {record.name}: {e}")
 
         if not found:
             print(f"Čtyřlístek s číslem {image_number} nenalezen, vytvářím prázdný obrázek")
@@ -945,10 +860,16 @@ pillow_heif.register_heif_opener()
 
 def read_polygon_metadata(image_obj):
     """
-    Načte metadata polygonu z PIL objektu obrázku.
+    Načte metadata polygonu z PIL objektu obrázku (u souboru z indexu lokačních map).
     Vrací dict nebo None.
     """
     try:
+        filename = getattr(image_obj, 'filename', None)
+        if filename:
+            info = get_location_index().get(filename)
+            if info is not None:
+                return info.polygon
+
         text_meta = getattr(image_obj, 'text', {}) or {}
         raw = text_meta.get('AOI_POLYGON')
         if not raw: